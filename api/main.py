@@ -1,9 +1,70 @@
 """FastAPI backend for FieldOps AI"""
-from fastapi import FastAPI
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, date, timedelta
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from config import API_TITLE, API_VERSION, API_PREFIX
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import select, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import API_TITLE, API_VERSION, API_PREFIX, API_WORKER_PROCESSES, PDF_CACHE_ENABLED
+from database.session import get_async_db, dispose_async_engine, session_scope
+from database.models import WorkOrder, InventoryItem, Timesheet, Invoice, STOCK_AVAILABLE, LOW_STOCK
+from api import schemas
+from utils.cache import invalidate
+
+def _classify_booking(text: str) -> dict:
+    from services.nlp_service import NLPBookingService
+    return NLPBookingService().process_booking_request(text)
+
+def _optimize_routes(plan_date: date, **options):
+    from services.scheduler import SchedulingService
+    with session_scope() as db:
+        return SchedulingService(db).optimize_routes(plan_date, **options)
+
+def _reoptimize_job(plan_date: date, job_id: int, **options):
+    from services.scheduler import SchedulingService
+    with session_scope() as db:
+        return SchedulingService(db).reoptimize_job(plan_date, job_id, **options)
+
+def _render_invoice(invoice_id: int) -> Optional[str]:
+    from services.invoice_generator import InvoiceGenerator
+    with session_scope() as db:
+        return InvoiceGenerator(db).generate_pdf(invoice_id)
 
-app = FastAPI(title=API_TITLE, version=API_VERSION)
+def _render_invoice_bytes(invoice_id: int) -> Optional[bytes]:
+    from services.invoice_generator import InvoiceGenerator
+    with session_scope() as db:
+        return InvoiceGenerator(db).render_pdf(invoice_id)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from services.rollups import start_background_refresh, stop_background_refresh
+    # OR-Tools solves and PDF rendering hold the GIL for seconds; keep them off the event loop.
+    # Spawned rather than forked: a fork taken while a request holds a SQLite connection
+    # leaves the child with the parent's lock state and fails with "disk I/O error".
+    app.state.workers = ProcessPoolExecutor(
+        max_workers=API_WORKER_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    # Analytics reads only query the rollups; keep them current from here
+    start_background_refresh()
+    try:
+        yield
+    finally:
+        stop_background_refresh()
+        app.state.workers.shutdown(wait=False, cancel_futures=True)
+        await dispose_async_engine()
+
+app = FastAPI(title=API_TITLE, version=API_VERSION, lifespan=lifespan)
+router = APIRouter(prefix=API_PREFIX)
 
 # CORS
 app.add_middleware(
@@ -14,6 +75,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def run_in_worker(fn, *args, **kwargs):
+    """Run a CPU-bound callable in the process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(app.state.workers, partial(fn, *args, **kwargs))
+
+async def get_or_404(db: AsyncSession, model, object_id: int):
+    obj = await db.get(model, object_id)
+    if obj is None:
+        raise HTTPException(status_code=404, detail=f"{model.__name__} {object_id} not found")
+    return obj
+
+async def run_inventory(db: AsyncSession, operation):
+    """Run operation(InventoryService) on the request's session; it commits pending changes along with its own"""
+    from services.inventory import InventoryService, InsufficientStock
+
+    try:
+        return await db.run_sync(lambda session: operation(InventoryService(session)))
+    except InsufficientStock as error:
+        raise HTTPException(status_code=409, detail={"message": str(error), "shortages": error.shortages})
+
 @app.get("/")
 def root():
     return {
@@ -22,19 +103,319 @@ def root():
         "status": "running"
     }
 
-@app.get("/api/v1/health")
+@router.get("/health")
 def health():
     return {"status": "healthy"}
 
-# TODO: Add more endpoints for:
-# - Booking intake
-# - Job scheduling
-# - Inventory management
-# - Timesheet tracking
-# - Invoice generation
-# - Analytics
+# Booking intake
+@router.post("/bookings", response_model=schemas.BookingOut, status_code=201)
+async def create_booking(request: schemas.BookingRequest, db: AsyncSession = Depends(get_async_db)):
+    # The learned classifier can take a while to load and run; keep it off the event loop
+    parsed = await run_in_worker(_classify_booking, request.text)
+    job = WorkOrder(
+        customer_id=request.customer_id,
+        job_type=parsed["job_type"],
+        description=request.text,
+        location=request.location or parsed["location"],
+        lat=request.lat,
+        lng=request.lng,
+        priority=parsed["priority"],
+        status="pending",
+        scheduled_date=request.scheduled_date
+    )
+    db.add(job)
+    await db.commit()
+    invalidate("jobs")
+    return {"classification": parsed, "job": job}
+
+@router.post("/bookings/batch", response_model=List[schemas.BatchBookingResult], status_code=201)
+async def create_bookings_batch(request: schemas.BatchBookingRequest, db: AsyncSession = Depends(get_async_db)):
+    """Classify many messages in the worker pool and bulk-insert their work orders"""
+    from services.booking_intake import (
+        INTAKE_CHUNK_SIZE, INTAKE_MAX_PENDING_CHUNKS, classify_chunk, chunked, normalize_message, work_order_rows
+    )
+
+    messages = [
+        normalize_message(message if isinstance(message, str) else message.model_dump())
+        for message in request.messages
+    ]
+    chunks = list(chunked(messages, INTAKE_CHUNK_SIZE))
+    # Backpressure: a large request keeps at most a few chunks in the shared pool at once
+    pending = asyncio.Semaphore(INTAKE_MAX_PENDING_CHUNKS)
+
+    async def classify(chunk):
+        async with pending:
+            return await run_in_worker(classify_chunk, [message["text"] for message in chunk])
+
+    classified = await asyncio.gather(*(classify(chunk) for chunk in chunks))
+
+    results = []
+    for chunk, chunk_results in zip(chunks, classified):
+        ids = (await db.scalars(
+            insert(WorkOrder).returning(WorkOrder.id, sort_by_parameter_order=True),
+            work_order_rows(chunk, chunk_results)
+        )).all()
+        for result, work_order_id in zip(chunk_results, ids):
+            results.append({"work_order_id": work_order_id, **result})
+    await db.commit()
+    invalidate("jobs")
+    return results
+
+# Jobs
+@router.get("/jobs", response_model=schemas.JobPage)
+async def list_jobs(
+    status: Optional[str] = None,
+    technician_id: Optional[int] = None,
+    scheduled_date: Optional[date] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(WorkOrder)
+    if status:
+        query = query.where(WorkOrder.status == status)
+    if technician_id is not None:
+        query = query.where(WorkOrder.assigned_technician_id == technician_id)
+    if scheduled_date:
+        start = datetime.combine(scheduled_date, datetime.min.time())
+        query = query.where(WorkOrder.scheduled_date >= start, WorkOrder.scheduled_date < start + timedelta(days=1))
+
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    rows = await db.scalars(query.order_by(WorkOrder.id).offset(offset).limit(limit))
+    return {"total": total, "offset": offset, "limit": limit, "items": rows.all()}
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobOut)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await get_or_404(db, WorkOrder, job_id)
+
+@router.post("/jobs", response_model=schemas.JobOut, status_code=201)
+async def create_job(request: schemas.JobCreate, db: AsyncSession = Depends(get_async_db)):
+    job = WorkOrder(status="pending", **request.model_dump())
+    db.add(job)
+    await db.commit()
+    invalidate("jobs")
+    return job
+
+@router.patch("/jobs/{job_id}", response_model=schemas.JobOut)
+async def update_job(job_id: int, request: schemas.JobUpdate, db: AsyncSession = Depends(get_async_db)):
+    job = await get_or_404(db, WorkOrder, job_id)
+    changes = request.model_dump(exclude_unset=True)
+    previous_status = job.status
+    for field, value in changes.items():
+        setattr(job, field, value)
+    status = changes.get("status")
+    if status == "completed" and previous_status != "completed":
+        # Reserved parts leave stock in the same transaction as the status change
+        await run_inventory(db, lambda inventory: inventory.consume([job_id]))
+    elif status == "cancelled" and previous_status != "cancelled":
+        await run_inventory(db, lambda inventory: inventory.release([job_id]))
+    else:
+        await db.commit()
+    await db.refresh(job)
+    invalidate("jobs")
+    return job
+
+@router.delete("/jobs/{job_id}", response_model=schemas.JobOut)
+async def cancel_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    job = await get_or_404(db, WorkOrder, job_id)
+    job.status = "cancelled"
+    job.assigned_technician_id = None
+    await run_inventory(db, lambda inventory: inventory.release([job_id]))
+    await db.refresh(job)
+    invalidate("jobs")
+    return job
+
+@router.post("/jobs/complete")
+async def complete_jobs(request: schemas.CompleteJobsRequest, db: AsyncSession = Depends(get_async_db)):
+    """Complete many jobs at once; their reserved parts leave stock with one UPDATE for the batch"""
+    return await run_inventory(db, lambda inventory: inventory.complete_jobs(request.job_ids))
+
+@router.post("/jobs/{job_id}/parts", status_code=201)
+async def reserve_parts(job_id: int, request: schemas.PartReservationRequest, db: AsyncSession = Depends(get_async_db)):
+    """Hold parts for a scheduled job; 409 with the shortages if stock can't cover all of them"""
+    job = await get_or_404(db, WorkOrder, job_id)
+    if job.status in ("completed", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status.value}")
+    parts = [(part.inventory_item_id, part.quantity) for part in request.parts]
+    return await run_inventory(db, lambda inventory: inventory.reserve(job_id, parts))
+
+# Scheduling
+@router.post("/schedule/optimize")
+async def optimize_schedule(request: schemas.OptimizeRequest):
+    options = request.model_dump(exclude={"date"}, exclude_none=True)
+    # scheduled_date is a DateTime column; match it with midnight of the requested day
+    plan_date = datetime.combine(request.date, datetime.min.time())
+    result = await run_in_worker(_optimize_routes, plan_date, **options)
+    if result and "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    # The solve committed in another process; drop this process's cached panels too
+    invalidate("jobs")
+    return result
+
+@router.post("/schedule/jobs/{job_id}/reoptimize")
+async def reoptimize_job(job_id: int, request: schemas.ReoptimizeRequest):
+    options = request.model_dump(exclude={"date"}, exclude_none=True)
+    plan_date = datetime.combine(request.date, datetime.min.time())
+    try:
+        result = await run_in_worker(_reoptimize_job, plan_date, job_id, **options)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if result and "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    invalidate("jobs")
+    return result
+
+# Inventory
+@router.get("/inventory", response_model=List[schemas.InventoryItemOut])
+async def list_inventory(category: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    query = select(InventoryItem).order_by(InventoryItem.name)
+    if category:
+        query = query.where(InventoryItem.category == category)
+    return (await db.scalars(query)).all()
+
+@router.get("/inventory/low-stock", response_model=List[schemas.InventoryItemOut])
+async def low_stock(db: AsyncSession = Depends(get_async_db)):
+    query = select(InventoryItem).where(InventoryItem.low_stock == True).order_by(STOCK_AVAILABLE)
+    return (await db.scalars(query)).all()
+
+@router.patch("/inventory/{item_id}", response_model=schemas.InventoryItemOut)
+async def update_inventory(item_id: int, request: schemas.InventoryUpdate, db: AsyncSession = Depends(get_async_db)):
+    item = await get_or_404(db, InventoryItem, item_id)
+    changes = request.model_dump(exclude_unset=True)
+    delta = changes.pop("quantity_delta", None)
+    for field, value in changes.items():
+        setattr(item, field, value)
+    if delta:
+        # Relative adjustment in SQL so concurrent requests don't overwrite each other
+        item.quantity = InventoryItem.quantity + delta
+    await db.flush()
+    # Recompute the low-stock flag from the saved quantity and reorder level
+    await db.execute(
+        update(InventoryItem).where(InventoryItem.id == item_id).values(low_stock=LOW_STOCK)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(item)
+    invalidate("inventory")
+    return item
+
+# Timesheets
+@router.get("/timesheets", response_model=List[schemas.TimesheetOut])
+async def list_timesheets(
+    technician_id: Optional[int] = None,
+    work_order_id: Optional[int] = None,
+    open_only: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(Timesheet).order_by(Timesheet.check_in_time.desc()).limit(limit)
+    if technician_id is not None:
+        query = query.where(Timesheet.technician_id == technician_id)
+    if work_order_id is not None:
+        query = query.where(Timesheet.work_order_id == work_order_id)
+    if open_only:
+        query = query.where(Timesheet.check_out_time.is_(None))
+    return (await db.scalars(query)).all()
+
+@router.post("/timesheets/check-in", response_model=schemas.TimesheetOut, status_code=201)
+async def check_in(request: schemas.CheckIn, db: AsyncSession = Depends(get_async_db)):
+    timesheet = Timesheet(
+        technician_id=request.technician_id,
+        work_order_id=request.work_order_id,
+        check_in_time=request.time or datetime.utcnow(),
+        check_in_lat=request.lat,
+        check_in_lng=request.lng
+    )
+    db.add(timesheet)
+    await db.commit()
+    invalidate("timesheets")
+    return timesheet
+
+@router.post("/timesheets/{timesheet_id}/check-out", response_model=schemas.TimesheetOut)
+async def check_out(timesheet_id: int, request: schemas.CheckOut, db: AsyncSession = Depends(get_async_db)):
+    timesheet = await get_or_404(db, Timesheet, timesheet_id)
+    if timesheet.check_out_time is not None:
+        raise HTTPException(status_code=409, detail="Already checked out")
+
+    timesheet.check_out_time = request.time or datetime.utcnow()
+    timesheet.check_out_lat = request.lat
+    timesheet.check_out_lng = request.lng
+    timesheet.hours_worked = round((timesheet.check_out_time - timesheet.check_in_time).total_seconds() / 3600, 2)
+    if timesheet.hours_worked < 0:
+        raise HTTPException(status_code=400, detail="Check-out precedes check-in")
+    await db.commit()
+    invalidate("timesheets")
+    return timesheet
+
+# Invoices
+@router.get("/invoices", response_model=schemas.InvoicePage)
+async def list_invoices(
+    status: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(Invoice)
+    if status:
+        query = query.where(Invoice.status == status)
+    if customer_id is not None:
+        query = query.where(Invoice.customer_id == customer_id)
+
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    rows = await db.scalars(query.order_by(Invoice.id.desc()).offset(offset).limit(limit))
+    return {"total": total, "offset": offset, "limit": limit, "items": rows.all()}
+
+@router.get("/invoices/{invoice_id}", response_model=schemas.InvoiceOut)
+async def get_invoice(invoice_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await get_or_404(db, Invoice, invoice_id)
+
+@router.post("/invoices/{invoice_id}/pdf")
+async def render_invoice(invoice_id: int, db: AsyncSession = Depends(get_async_db)):
+    await get_or_404(db, Invoice, invoice_id)
+    pdf_path = await run_in_worker(_render_invoice, invoice_id)
+    if not pdf_path:
+        raise HTTPException(status_code=500, detail="Invoice PDF generation failed")
+    invalidate("invoices")
+    return {"invoice_id": invoice_id, "pdf_path": pdf_path}
+
+@router.get("/invoices/{invoice_id}/pdf")
+async def download_invoice(invoice_id: int, fresh: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """The cached PDF, re-rendered only if the invoice changed; with fresh=true, one rendered in memory"""
+    invoice = await get_or_404(db, Invoice, invoice_id)
+    filename = f"invoice_{invoice.invoice_number}.pdf"
+    if not fresh:
+        pdf_path = await run_in_worker(_render_invoice, invoice_id) if PDF_CACHE_ENABLED else invoice.pdf_path
+        if pdf_path and Path(pdf_path).exists():
+            return FileResponse(pdf_path, media_type="application/pdf", filename=filename)
+
+    pdf = await run_in_worker(_render_invoice_bytes, invoice_id)
+    if pdf is None:
+        raise HTTPException(status_code=404, detail=f"Invoice {invoice_id} not found")
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Analytics (shares the dashboard's cached panel loaders; they use the sync session)
+@router.get("/analytics/kpis")
+async def analytics_kpis():
+    from services import dashboard_queries as panels
+    return await asyncio.to_thread(panels.kpis)
+
+@router.get("/analytics/cash-flow")
+async def analytics_cash_flow(days: int = Query(30, ge=1, le=365)):
+    from services import dashboard_queries as panels
+    return await asyncio.to_thread(panels.cash_flow_forecast, days)
+
+@router.get("/analytics/completion-trends")
+async def analytics_completion_trends():
+    from services import dashboard_queries as panels
+    return await asyncio.to_thread(panels.completion_trends)
+
+app.include_router(router)
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
-
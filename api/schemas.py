@@ -0,0 +1,194 @@
+"""Request and response models for the FieldOps AI API"""
+from datetime import datetime, date
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from database.models import JobStatus, Priority
+
+class ORMModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+# Bookings & jobs
+class BookingRequest(BaseModel):
+    text: str = Field(..., min_length=1)
+    customer_id: Optional[int] = None
+    location: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    scheduled_date: Optional[datetime] = None
+
+class BatchBookingRequest(BaseModel):
+    # Bare message strings or full booking objects
+    messages: List[Union[Annotated[str, Field(min_length=1)], BookingRequest]] = Field(..., min_length=1, max_length=10000)
+
+class BatchBookingResult(BaseModel):
+    work_order_id: int
+    job_type: str
+    priority: str
+    location: Optional[str] = None
+    postal_code: Optional[str] = None
+
+class JobCreate(BaseModel):
+    customer_id: Optional[int] = None
+    job_type: str
+    description: Optional[str] = None
+    location: str
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    priority: Priority = Priority.medium
+    scheduled_date: Optional[datetime] = None
+    scheduled_start_time: Optional[datetime] = None
+    scheduled_end_time: Optional[datetime] = None
+    estimated_duration: Optional[float] = None
+    estimated_cost: Optional[float] = None
+
+class JobUpdate(BaseModel):
+    assigned_technician_id: Optional[int] = None
+    job_type: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    status: Optional[JobStatus] = None
+    priority: Optional[Priority] = None
+    scheduled_date: Optional[datetime] = None
+    scheduled_start_time: Optional[datetime] = None
+    scheduled_end_time: Optional[datetime] = None
+    actual_start_time: Optional[datetime] = None
+    actual_end_time: Optional[datetime] = None
+    estimated_duration: Optional[float] = None
+    actual_duration: Optional[float] = None
+    estimated_cost: Optional[float] = None
+    actual_cost: Optional[float] = None
+
+class JobOut(ORMModel):
+    id: int
+    customer_id: Optional[int] = None
+    assigned_technician_id: Optional[int] = None
+    job_type: str
+    description: Optional[str] = None
+    location: str
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    status: str
+    priority: str
+    scheduled_date: Optional[datetime] = None
+    scheduled_start_time: Optional[datetime] = None
+    scheduled_end_time: Optional[datetime] = None
+    actual_start_time: Optional[datetime] = None
+    actual_end_time: Optional[datetime] = None
+    estimated_duration: Optional[float] = None
+    actual_duration: Optional[float] = None
+    estimated_cost: Optional[float] = None
+    actual_cost: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class BookingOut(BaseModel):
+    classification: dict
+    job: JobOut
+
+# Scheduling
+class OptimizeRequest(BaseModel):
+    date: date
+    method: Literal["vrp", "partitioned", "greedy"] = "vrp"
+    time_limit_seconds: Optional[int] = None
+    shift_hours: Optional[float] = None
+    regions: Optional[int] = None
+
+class ReoptimizeRequest(BaseModel):
+    date: date
+    action: Literal["insert", "remove", "cancel"] = "insert"
+    search_ms: Optional[int] = None
+
+# Inventory
+class InventoryItemOut(ORMModel):
+    id: int
+    name: str
+    sku: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    quantity: int
+    reserved: int = 0
+    unit_price: float
+    reorder_level: int
+    low_stock: bool = False
+    supplier: Optional[str] = None
+
+class InventoryUpdate(BaseModel):
+    quantity: Optional[int] = None
+    quantity_delta: Optional[int] = None
+    unit_price: Optional[float] = None
+    reorder_level: Optional[int] = None
+    supplier: Optional[str] = None
+
+class PartRequest(BaseModel):
+    inventory_item_id: int
+    quantity: int = Field(1, gt=0)
+
+class PartReservationRequest(BaseModel):
+    parts: List[PartRequest] = Field(..., min_length=1)
+
+class CompleteJobsRequest(BaseModel):
+    job_ids: List[int] = Field(..., min_length=1, max_length=10000)
+
+# Timesheets
+class CheckIn(BaseModel):
+    technician_id: int
+    work_order_id: Optional[int] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    time: Optional[datetime] = None
+
+class CheckOut(BaseModel):
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    time: Optional[datetime] = None
+
+class TimesheetOut(ORMModel):
+    id: int
+    technician_id: int
+    work_order_id: Optional[int] = None
+    check_in_time: datetime
+    check_in_lat: Optional[float] = None
+    check_in_lng: Optional[float] = None
+    check_out_time: Optional[datetime] = None
+    check_out_lat: Optional[float] = None
+    check_out_lng: Optional[float] = None
+    hours_worked: Optional[float] = None
+    is_verified: bool = False
+    has_anomaly: bool = False
+    anomaly_reason: Optional[str] = None
+
+# Invoices
+class InvoiceOut(ORMModel):
+    id: int
+    customer_id: Optional[int] = None
+    work_order_id: Optional[int] = None
+    invoice_number: str
+    invoice_date: Optional[datetime] = None
+    due_date: Optional[datetime] = None
+    labor_hours: float
+    labor_rate: float
+    labor_cost: float
+    materials_cost: float
+    other_charges: float
+    subtotal: float
+    tax_rate: float
+    tax_amount: float
+    total_amount: float
+    status: str
+    paid_date: Optional[datetime] = None
+    pdf_path: Optional[str] = None
+
+class Page(BaseModel):
+    total: int
+    offset: int
+    limit: int
+
+class JobPage(Page):
+    items: List[JobOut]
+
+class InvoicePage(Page):
+    items: List[InvoiceOut]
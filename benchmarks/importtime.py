@@ -0,0 +1,146 @@
+"""Import-time profile of the FieldOps entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each target and summarises the trace: total cold-import time plus the
+slowest packages (self time summed per top-level package, e.g. sqlalchemy)
+and the slowest individual modules.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime api.main --top 15 --output importtime.json
+    python -m benchmarks.importtime --baseline importtime.json --threshold 0.3
+
+Like benchmarks.runner, exits 1 when a target's median total is more than
+`threshold` slower than the baseline's.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.runner import compare
+
+ROOT = Path(__file__).parent.parent
+
+# What the dashboard, API and intake workers import before doing any work
+DEFAULT_TARGETS = [
+    "config",
+    "database.session",
+    "services.dashboard_queries",
+    "services.nlp_service",
+    "services.scheduler",
+    "services.invoice_generator",
+    "api.main"
+]
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of `import time: self [us] | cumulative | imported package` as seconds"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self": int(fields[0]) / 1e6,
+            "cumulative": int(fields[1]) / 1e6
+        })
+    return rows
+
+def profile(module: str) -> List[Dict]:
+    """importtime rows for a cold import of module in a new interpreter"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=dict(os.environ, PYTHONPATH=str(ROOT)),
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr.splitlines()[-1]}")
+    return parse_importtime(completed.stderr)
+
+def summarize(rows: List[Dict], top: int) -> Dict:
+    packages = defaultdict(float)
+    for row in rows:
+        packages[row["module"].split(".")[0]] += row["self"]
+    return {
+        # Top-level rows' cumulative times cover every import exactly once
+        "total": round(sum(row["cumulative"] for row in rows if row["depth"] == 0), 6),
+        "modules": len(rows),
+        "by_package": [
+            {"package": name, "seconds": round(seconds, 4)}
+            for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        "by_self": [
+            {"module": row["module"], "seconds": round(row["self"], 4)}
+            for row in sorted(rows, key=lambda row: -row["self"])[:top]
+        ]
+    }
+
+def run_profiles(targets: List[str], repeat: int, top: int) -> Dict[str, Dict]:
+    results = {}
+    for target in targets:
+        runs = [profile(target) for _ in range(repeat)]
+        totals = [summarize(rows, top)["total"] for rows in runs]
+        median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+        results[target] = dict(
+            summarize(median_run, top),
+            median=round(statistics.median(totals), 6),
+            runs=totals
+        )
+    return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Profile cold import time of FieldOps entry points")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="modules to import")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="slowest packages to list per target")
+    parser.add_argument("--output", default="importtime.json")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.3, help="allowed slowdown before failing (0.3 = 30%%)")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    results = run_profiles(args.targets, args.repeat, args.top)
+
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline.get("results", {}), args.threshold, args.min_delta)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "results": results
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+
+    for target, result in results.items():
+        change = f"  {result['change']:+.0%}" if "change" in result else ""
+        print(f"{target:<30} {result['median']:.3f}s  ({result['modules']} modules){change}")
+        for entry in result["by_package"]:
+            print(f"    {entry['seconds']:>8.3f}s  {entry['package']}")
+    print(f"\nResults written to {args.output}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"    {line}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
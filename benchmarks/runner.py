@@ -0,0 +1,301 @@
+"""Benchmark runner for the scheduler, analytics, NLP intake and invoice hot paths.
+
+Builds (or reuses) a seeded fixture database with the load generator, times
+each benchmark, writes the results to JSON and optionally compares them with
+a previous run. The scheduler and PDF benchmarks commit, so they run against
+a scratch copy of the fixture that is restored before each group; the fixture
+itself is checked to be unchanged afterwards.
+
+    python -m benchmarks.runner --size small --output bench.json
+    python -m benchmarks.runner --size small --baseline bench.json --threshold 0.25
+
+Exits 1 when any benchmark's median is more than `threshold` slower than the
+baseline's, so it can gate CI.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+# Fixtures are generated around a fixed day so every run plans the same jobs
+FIXTURE_TODAY = date(2026, 1, 5)
+
+# Load generator settings per fixture size
+SIZES = {
+    "small": {"technicians": 12, "days": 30, "jobs_per_technician": 3},
+    "medium": {"technicians": 60, "days": 120, "jobs_per_technician": 5},
+    "large": {"technicians": 400, "days": 365, "jobs_per_technician": 6}
+}
+
+BOOKING_TEMPLATES = [
+    "My furnace stopped working and there is no heat, please come {when}",
+    "Need a new air conditioner installed at our office in {where}",
+    "Can someone do a duct cleaning {when}? Postal code M5V 2T6",
+    "Breaker keeps tripping, looks like a wiring problem in {where}",
+    "Annual preventive maintenance and inspection for our heat pump, {when}",
+    "Emergency! AC not working and it's 35 degrees in {where}",
+    "Outlet in the kitchen is sparking, need an electrical repair {when}",
+    "Looking to schedule a furnace tune-up whenever, no rush"
+]
+WHEN = ["today", "tomorrow", "next week", "asap", "when available", "whenever"]
+WHERE = ["downtown Toronto", "Scarborough", "North York", "Etobicoke", "Toronto"]
+
+def booking_texts(count: int) -> List[str]:
+    return [
+        BOOKING_TEMPLATES[i % len(BOOKING_TEMPLATES)].format(when=WHEN[i % len(WHEN)], where=WHERE[i % len(WHERE)])
+        for i in range(count)
+    ]
+
+def measure(fn: Callable, repeat: int, items: int = 1) -> Dict:
+    """Time fn() `repeat` times; items is the work done per call for throughput"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    median = statistics.median(runs)
+    return {
+        "median": round(median, 6),
+        "min": round(min(runs), 6),
+        "mean": round(statistics.fmean(runs), 6),
+        "runs": [round(r, 6) for r in runs],
+        "items": items,
+        "items_per_second": round(items / median, 1) if median else None
+    }
+
+def build_fixture(size: str, seed: int) -> Path:
+    """Seeded fixture database for a size, generated once and reused"""
+    path = FIXTURE_DIR / f"{size}-{seed}-{FIXTURE_TODAY:%Y%m%d}.db"
+    if not path.exists():
+        FIXTURE_DIR.mkdir(exist_ok=True)
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+        options = SIZES[size]
+        subprocess.run([
+            sys.executable, "-m", "utils.load_generator",
+            "--technicians", str(options["technicians"]),
+            "--days", str(options["days"]),
+            "--jobs-per-technician", str(options["jobs_per_technician"]),
+            "--seed", str(seed),
+            "--today", FIXTURE_TODAY.isoformat()
+        ], env=env, check=True, cwd=Path(__file__).parent.parent)
+    return path
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class FixtureCopy:
+    """Scratch copy of a fixture database, restored from the fixture on demand.
+
+    Route optimization and PDF generation commit their own sessions, so
+    benchmarks run on the copy and every run starts from the same data.
+    """
+
+    def __init__(self, fixture: Path):
+        self.fixture = fixture
+        self.digest = file_digest(fixture)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / fixture.name
+        shutil.copyfile(fixture, self.path)
+
+    @property
+    def url(self) -> str:
+        return f"sqlite:///{self.path}"
+
+    def restore(self):
+        """Replace the copy with the fixture again; call with no session open"""
+        from database.session import engine
+        engine.dispose()
+        for suffix in ("-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+        shutil.copyfile(self.fixture, self.path)
+
+    def close(self):
+        self.directory.cleanup()
+        if file_digest(self.fixture) != self.digest:
+            raise RuntimeError(f"Benchmarks modified the fixture {self.fixture}; delete it to regenerate")
+
+def busiest_open_day() -> datetime:
+    """Scheduled date with the most routable open jobs in the current database"""
+    from sqlalchemy import func
+    from database.session import session_scope
+    from database.models import WorkOrder
+
+    with session_scope() as db:
+        row = db.query(WorkOrder.scheduled_date).filter(
+            WorkOrder.status.in_(["pending", "scheduled"]),
+            WorkOrder.lat.isnot(None),
+            WorkOrder.lng.isnot(None)
+        ).group_by(WorkOrder.scheduled_date).order_by(
+            func.count(WorkOrder.id).desc(), WorkOrder.scheduled_date
+        ).first()
+    if row is None or row[0] is None:
+        raise SystemExit("No open jobs with a scheduled date to plan; pass --plan-date")
+    return row[0]
+
+def run_benchmarks(repeat: int, vrp_seconds: int, nlp_requests: int, pdf_count: int,
+                   plan_date: datetime, restore: Callable[[], None] = lambda: None) -> Dict[str, Dict]:
+    """Time every benchmark; restore() resets the database before each group that writes"""
+    # Imported here so DATABASE_URL points at the fixture before the engine is built
+    from database.session import session_scope
+    from database.models import Invoice
+    from services.analytics import AnalyticsService
+    from services.invoice_generator import InvoiceGenerator
+    from services.nlp_service import NLPBookingService
+    from services.scheduler import SchedulingService
+
+    results = {}
+
+    restore()
+    with session_scope() as db:
+        # No travel cache, so matrix and solver timings don't depend on a warm cache file
+        scheduler = SchedulingService(db, use_travel_cache=False)
+        technicians, jobs = scheduler.load_day(plan_date)
+        results["create_distance_matrix"] = measure(
+            lambda: scheduler.create_distance_matrix(technicians, jobs), repeat, items=len(technicians) + len(jobs)
+        )
+        results["optimize_routes"] = measure(
+            lambda: scheduler.optimize_routes(plan_date, time_limit_seconds=vrp_seconds), repeat, items=len(jobs)
+        )
+
+    restore()
+    with session_scope() as db:
+        analytics = AnalyticsService(db)
+        results["calculate_kpis"] = measure(analytics.calculate_kpis, repeat)
+        results["generate_cash_flow_forecast"] = measure(lambda: analytics.generate_cash_flow_forecast(90), repeat, items=90)
+
+        nlp = NLPBookingService()
+        texts = booking_texts(nlp_requests)
+        results["nlp_process_booking_request"] = measure(
+            lambda: [nlp.process_booking_request(text) for text in texts], repeat, items=len(texts)
+        )
+
+    restore()
+    with session_scope() as db, tempfile.TemporaryDirectory() as output_dir:
+        invoice_ids = [row[0] for row in db.query(Invoice.id).order_by(Invoice.id).limit(pdf_count)]
+        generator = InvoiceGenerator(db)
+        generator.output_dir = Path(output_dir)
+        # Render every time for the rendering benchmarks, then time unchanged re-downloads
+        generator.use_cache = False
+        results["generate_pdf"] = measure(
+            lambda: [generator.generate_pdf(invoice_id) for invoice_id in invoice_ids], repeat, items=len(invoice_ids)
+        )
+        results["generate_pdfs"] = measure(
+            lambda: generator.generate_pdfs(invoice_ids), repeat, items=len(invoice_ids)
+        )
+        generator.use_cache = True
+        generator.generate_pdfs(invoice_ids, workers=1)
+        results["generate_pdf_cached"] = measure(
+            lambda: [generator.generate_pdf(invoice_id) for invoice_id in invoice_ids], repeat, items=len(invoice_ids)
+        )
+
+    return results
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+            min_delta: float = 0.0) -> List[str]:
+    """Benchmarks whose median slowed down by more than threshold (a fraction).
+
+    Slowdowns smaller than min_delta seconds are treated as timer noise.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("median"):
+            continue
+        change = result["median"] / previous["median"] - 1
+        result["change"] = round(change, 4)
+        if change > threshold and result["median"] - previous["median"] > min_delta:
+            regressions.append(f"{name}: {previous['median']:.4f}s -> {result['median']:.4f}s (+{change:.0%})")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time FieldOps hot paths and compare against a baseline")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", help="benchmark an existing database URL instead of a generated fixture "
+                                           "(route assignments and PDF paths in it are overwritten)")
+    parser.add_argument("--plan-date", type=date.fromisoformat,
+                        help="day to plan routes for (default: the day after the fixture's anchor date, or with "
+                             "--database the day with the most open jobs)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--vrp-seconds", type=int, default=2, help="solver time limit for optimize_routes")
+    parser.add_argument("--nlp-requests", type=int, default=5000)
+    parser.add_argument("--pdf-count", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    fixture: Optional[FixtureCopy] = None
+    if args.database:
+        os.environ["DATABASE_URL"] = args.database
+    else:
+        fixture = FixtureCopy(build_fixture(args.size, args.seed))
+        os.environ["DATABASE_URL"] = fixture.url
+
+    if args.plan_date:
+        plan_date = datetime.combine(args.plan_date, datetime.min.time())
+    elif args.database:
+        plan_date = busiest_open_day()
+    else:
+        plan_date = datetime.combine(FIXTURE_TODAY + timedelta(days=1), datetime.min.time())
+
+    try:
+        results = run_benchmarks(
+            args.repeat, args.vrp_seconds, args.nlp_requests, args.pdf_count, plan_date,
+            restore=fixture.restore if fixture else lambda: None
+        )
+    finally:
+        if fixture:
+            fixture.close()
+
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline.get("results", {}), args.threshold, args.min_delta)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "size": None if args.database else args.size,
+            "seed": args.seed,
+            "plan_date": plan_date.date().isoformat(),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+
+    for name, result in results.items():
+        change = f"  {result['change']:+.0%}" if "change" in result else ""
+        print(f"{name:<30} median {result['median']:.4f}s  ({result['items_per_second']} items/s){change}")
+    print(f"\nResults written to {args.output}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"    {line}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
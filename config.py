@@ -6,15 +6,95 @@ BASE_DIR = Path(__file__).parent
 
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BASE_DIR}/fieldops.db")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1).replace("postgresql://", "postgresql+asyncpg://", 1)
+)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # replace connections older than this
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),  # readers don't block the writer
+    "synchronous": "NORMAL",  # safe with WAL, avoids an fsync per commit
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -64000,  # 64 MB page cache
+    "temp_store": "MEMORY"
+}
 
 # API Settings
 API_TITLE = "FieldOps AI API"
 API_VERSION = "1.0.0"
 API_PREFIX = "/api/v1"
+API_WORKER_PROCESSES = int(os.getenv("API_WORKER_PROCESSES", "2"))  # OR-Tools and PDF rendering
+
+# Route Optimization
+VRP_TIME_LIMIT_SECONDS = int(os.getenv("VRP_TIME_LIMIT_SECONDS", "30"))
+VRP_FIRST_SOLUTION_STRATEGY = os.getenv("VRP_FIRST_SOLUTION_STRATEGY", "PATH_CHEAPEST_ARC")
+VRP_LOCAL_SEARCH_METAHEURISTIC = os.getenv("VRP_LOCAL_SEARCH_METAHEURISTIC", "GUIDED_LOCAL_SEARCH")
+SHIFT_START_HOUR = 8  # Technicians leave their home base at 08:00
+SHIFT_LENGTH_HOURS = 8.0
+AVERAGE_TRAVEL_SPEED_KMH = 40.0  # City driving average used to turn km into minutes
+DISTANCE_MATRIX_TILE_SIZE = 512  # Above this many locations the matrix is built in tiles
+VRP_CANDIDATE_TECHNICIANS = int(os.getenv("VRP_CANDIDATE_TECHNICIANS", "8"))  # Nearest techs a job may go to
+SPATIAL_INDEX_CELL_KM = 5.0
+VRP_PARTITION_JOBS = int(os.getenv("VRP_PARTITION_JOBS", "150"))  # Target jobs per region in partitioned mode
+VRP_PARTITION_WORKERS = int(os.getenv("VRP_PARTITION_WORKERS", str(os.cpu_count() or 1)))
+INCREMENTAL_SEARCH_MS = 100  # Local search budget for single-job re-optimization
+
+# Batch booking intake
+INTAKE_CHUNK_SIZE = int(os.getenv("INTAKE_CHUNK_SIZE", "500"))  # Messages per classification task / insert batch
+INTAKE_WORKERS = int(os.getenv("INTAKE_WORKERS", str(os.cpu_count() or 1)))
+INTAKE_MAX_PENDING_CHUNKS = int(os.getenv("INTAKE_MAX_PENDING_CHUNKS", "4"))  # Backpressure: chunks in flight
+
+# Batch invoice PDF rendering
+PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", "200"))  # Invoices per eager query / render task
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_MAX_PENDING_CHUNKS = int(os.getenv("PDF_MAX_PENDING_CHUNKS", "4"))
+PDF_TEMPLATE_CACHE = os.getenv("PDF_TEMPLATE_CACHE", "1") == "1"  # Build the static invoice layout once per process
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "1") == "1"  # Reuse PDFs whose invoice fields haven't changed
+PDF_CACHE_MAX_AGE_DAYS = float(os.getenv("PDF_CACHE_MAX_AGE_DAYS", "90"))  # Evict versions unused this long
+PDF_CACHE_MAX_MB = float(os.getenv("PDF_CACHE_MAX_MB", "2048"))
+PDF_CACHE_EVICT_SECONDS = float(os.getenv("PDF_CACHE_EVICT_SECONDS", "3600"))  # Single-invoice renders evict at most this often
+
+# Billing runs
+INVOICE_NUMBER_FORMAT = "INV-{:06d}"
+INVOICE_PAYMENT_TERMS_DAYS = 30
+DEFAULT_LABOR_RATE = 75.0  # For jobs without an assigned technician
+BILLING_BATCH_SIZE = int(os.getenv("BILLING_BATCH_SIZE", "5000"))  # Invoices per number block / insert
+
+# Accounting export
+EXPORT_DIR = BASE_DIR / "exports"
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))  # Rows per fetch / Parquet row group
+
+# Travel matrix cache (pairwise distances reused across optimize_routes calls)
+TRAVEL_CACHE_ENABLED = os.getenv("TRAVEL_CACHE_ENABLED", "1") == "1"
+TRAVEL_CACHE_PATH = Path(os.getenv("TRAVEL_CACHE_PATH", str(BASE_DIR / "travel_cache.npz")))
+TRAVEL_CACHE_MAX_LOCATIONS = int(os.getenv("TRAVEL_CACHE_MAX_LOCATIONS", "4000"))
+TRAVEL_CACHE_PRECISION = 5  # Decimal places (~1 m) used to key locations
+
+# Dashboard cache TTLs (seconds); writes also invalidate affected panels
+DASHBOARD_CACHE_TTL = {
+    "stats": 30,
+    "schedule": 30,
+    "crew": 120,
+    "inventory": 60,
+    "financials": 300,
+    "analytics": 300
+}
+
+# Background refresh of the daily analytics rollups (seconds); 0 leaves it to cron / python -m services.rollups
+ROLLUP_REFRESH_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "60"))
 
 # ML Models
-MODEL_DIR = BASE_DIR / "models"
-MODEL_DIR.mkdir(exist_ok=True)
+MODEL_DIR = BASE_DIR / "models"  # created by database.bootstrap or on first save, not at import
+JOB_CLASSIFIER = os.getenv("JOB_CLASSIFIER", "tfidf")  # tfidf, transformer or none; used only once trained
+JOB_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("JOB_CLASSIFIER_MIN_CONFIDENCE", "0.6"))  # below this, keywords decide
+JOB_CLASSIFIER_BATCH_SIZE = int(os.getenv("JOB_CLASSIFIER_BATCH_SIZE", "64"))
+
+# Startup
+AUTO_LOAD_DEMO_DATA = os.getenv("AUTO_LOAD_DEMO_DATA", "1") == "1"  # Dashboard seeds an empty database once per process
 
 # Sample Company Defaults
 DEFAULT_COMPANY = {
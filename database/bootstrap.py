@@ -0,0 +1,34 @@
+"""Explicit startup step: schema creation, working directories and demo data.
+
+Nothing here runs at import time; the dashboard calls prepare() once per
+server process and `python run_demo.py` calls it from the command line.
+"""
+from typing import Dict
+
+from config import MODEL_DIR
+from database.session import init_db, session_scope
+from database.models import Customer
+
+def prepare(load_demo: bool = False) -> Dict[str, bool]:
+    """Create tables and directories, and seed the demo company into an empty database"""
+    MODEL_DIR.mkdir(exist_ok=True)
+    init_db()
+
+    loaded = False
+    if load_demo:
+        with session_scope() as db:
+            load_demo = db.query(Customer.id).first() is None
+
+    if load_demo:
+        # Faker and the generator are only needed when seeding
+        from utils.data_generator import load_demo_data
+        from services.rollups import RollupService
+        load_demo_data()
+        rollups = RollupService()
+        try:
+            rollups.refresh()
+        finally:
+            rollups.close()
+        loaded = True
+
+    return {"schema": True, "demo_data": loaded}
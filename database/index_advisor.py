@@ -0,0 +1,129 @@
+"""Index advisor: EXPLAIN the hot service queries and flag full table scans.
+
+Run with `python -m database.index_advisor`; exits non-zero when a checked
+query scans a table it should reach through an index, so it can gate CI.
+
+The statements are not copies: each check calls the real scheduler,
+dashboard, analytics, inventory and rollup code and records every SELECT
+it sends, then EXPLAINs those with the same parameters. Services skip some
+queries on empty tables, so run it against a populated database.
+"""
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Tuple
+import re
+import sys
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database.session import SessionLocal, Base, init_db
+
+# SQLite reports "SCAN <table>", PostgreSQL "Seq Scan on <table>"
+FULL_SCAN = re.compile(r"^(?:SCAN|.*Seq Scan on) (?!CONSTANT ROW)(\w+)(?!.*USING (?:COVERING )?INDEX)")
+
+# Reference tables the dashboard lists in full, and the rollups, which are one row per day
+SCANNABLE_TABLES = {
+    "technicians", "inventory_items", "rollup_watermarks",
+    "daily_job_rollups", "daily_revenue_rollups", "daily_parts_rollups"
+}
+
+def service_calls(today: date) -> List[Tuple[str, Callable[[Session], object]]]:
+    """The service read paths to check, each a call on a session"""
+    from services.analytics import AnalyticsService
+    from services.dashboard_queries import DashboardQueries
+    from services.inventory import InventoryService
+    from services.rollups import RollupService
+    from services.scheduler import SchedulingService
+    
+    day = datetime.combine(today, datetime.min.time())
+    scheduler = lambda db: SchedulingService(db, use_travel_cache=False)
+    return [
+        ("scheduler: jobs and crew for a day", lambda db: scheduler(db).load_day(day)),
+        ("scheduler: nearest technicians", lambda db: scheduler(db).nearest_technicians(43.65, -79.38)),
+        ("dashboard: quick stats", lambda db: DashboardQueries(db).quick_stats(today)),
+        ("dashboard: schedule by technician", lambda db: DashboardQueries(db).jobs_by_technician(day)),
+        ("dashboard: active jobs per technician", lambda db: DashboardQueries(db).active_job_counts()),
+        ("dashboard: low-stock count", lambda db: DashboardQueries(db).low_stock_count()),
+        ("dashboard: invoice status counts", lambda db: DashboardQueries(db).invoice_status_counts()),
+        ("analytics: KPIs", lambda db: AnalyticsService(db).calculate_kpis(forecast=[])),
+        ("analytics: completion trends", lambda db: AnalyticsService(db).get_job_completion_trends()),
+        ("inventory: low-stock items", lambda db: InventoryService(db).low_stock_items()),
+        ("rollups: incremental refresh", lambda db: RollupService(db).refresh()),
+    ]
+
+@contextmanager
+def recording(db: Session) -> Iterator[List[Tuple[str, object]]]:
+    """Collect (sql, parameters) for every SELECT the session sends inside the block"""
+    statements = []
+    engine = db.get_bind()
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+def explain(db: Session, sql: str, parameters) -> List[str]:
+    """Plan lines for a compiled statement on the session's dialect"""
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    rows = db.connection().exec_driver_sql(prefix + sql, parameters).all()
+    return [row[-1] if sqlite else row[0] for row in rows]
+
+def find_full_scans(plan: List[str]) -> List[str]:
+    """Tables the plan reads end to end; subqueries and small reference tables are not reported"""
+    scans = (match.group(1) for line in plan if (match := FULL_SCAN.match(line.strip())))
+    return [table for table in scans if table in Base.metadata.tables and table not in SCANNABLE_TABLES]
+
+def run(today: date = None) -> Dict[str, List[Dict]]:
+    """Run every service call and EXPLAIN what it sent.
+    
+    Returns {call: [{"sql": ..., "plan": [...], "full_scans": [...]}]}. Each
+    call runs in its own session; commits only flush and everything is rolled
+    back, so the check leaves the database as it found it.
+    """
+    report = {}
+    for name, call in service_calls(today or date.today()):
+        db = SessionLocal()
+        db.commit = db.flush
+        try:
+            with recording(db) as statements:
+                call(db)
+            seen = set()
+            report[name] = []
+            for sql, parameters in statements:
+                if sql in seen:
+                    continue
+                seen.add(sql)
+                plan = explain(db, sql, parameters)
+                report[name].append({"sql": sql, "plan": plan, "full_scans": find_full_scans(plan)})
+        finally:
+            db.rollback()
+            db.close()
+    return report
+
+def main() -> int:
+    init_db()
+    report = run()
+    flagged = checked = 0
+    
+    for name, results in report.items():
+        print(name)
+        for result in results:
+            status = "FULL SCAN " + ", ".join(result["full_scans"]) if result["full_scans"] else "ok"
+            print(f"  {status:<30} {' '.join(result['sql'].split())[:100]}")
+            for line in result["plan"]:
+                print(f"      {line}")
+            flagged += bool(result["full_scans"])
+            checked += 1
+    
+    print(f"\n{flagged} of {checked} queries scan a full table")
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Add composite indexes for hot filter columns
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Tables are created by init_db(); this revision only adds the indexes the
+scheduler, dashboard and analytics queries filter on. if_not_exists keeps it
+safe to run against databases where init_db() already created them.
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_work_orders_status_scheduled_date", "work_orders", ["status", "scheduled_date"]),
+    ("ix_work_orders_technician_status", "work_orders", ["assigned_technician_id", "status"]),
+    ("ix_work_orders_updated_at", "work_orders", ["updated_at"]),
+    ("ix_invoices_status_paid_date", "invoices", ["status", "paid_date"]),
+    ("ix_invoices_created_at", "invoices", ["created_at"]),
+    ("ix_timesheets_verified_check_in", "timesheets", ["is_verified", "check_in_time"]),
+    ("ix_timesheets_technician_check_in", "timesheets", ["technician_id", "check_in_time"]),
+    ("ix_job_parts_work_order_id", "job_parts", ["work_order_id"]),
+    ("ix_job_parts_created_at", "job_parts", ["created_at"]),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,58 @@
+"""Add part reservations and the indexed low-stock flag
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+inventory_items gains reserved (units held for scheduled jobs) and low_stock,
+backfilled from quantity - reserved <= reorder_level. init_db() may already
+have created part_reservations, so each step checks before it runs.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("inventory_items")}
+
+    with op.batch_alter_table("inventory_items") as batch:
+        if "reserved" not in columns:
+            batch.add_column(sa.Column("reserved", sa.Integer, nullable=False, server_default="0"))
+        if "low_stock" not in columns:
+            batch.add_column(sa.Column("low_stock", sa.Boolean, nullable=False, server_default=sa.false()))
+
+    items = sa.table(
+        "inventory_items",
+        sa.column("quantity", sa.Integer),
+        sa.column("reserved", sa.Integer),
+        sa.column("reorder_level", sa.Integer),
+        sa.column("low_stock", sa.Boolean)
+    )
+    op.execute(items.update().values(
+        low_stock=sa.func.coalesce(items.c.quantity, 0) - items.c.reserved <= sa.func.coalesce(items.c.reorder_level, 0)
+    ))
+    op.create_index("ix_inventory_items_low_stock", "inventory_items", ["low_stock"], if_not_exists=True)
+
+    if "part_reservations" not in inspector.get_table_names():
+        op.create_table(
+            "part_reservations",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("work_order_id", sa.Integer, sa.ForeignKey("work_orders.id")),
+            sa.Column("inventory_item_id", sa.Integer, sa.ForeignKey("inventory_items.id"), nullable=False),
+            sa.Column("quantity", sa.Integer, nullable=False),
+            sa.Column("created_at", sa.DateTime)
+        )
+    op.create_index("ix_part_reservations_id", "part_reservations", ["id"], if_not_exists=True)
+    op.create_index("ix_part_reservations_work_order_id", "part_reservations", ["work_order_id"], if_not_exists=True)
+
+def downgrade():
+    op.drop_table("part_reservations")
+    op.drop_index("ix_inventory_items_low_stock", table_name="inventory_items", if_exists=True)
+    with op.batch_alter_table("inventory_items") as batch:
+        batch.drop_column("low_stock")
+        batch.drop_column("reserved")
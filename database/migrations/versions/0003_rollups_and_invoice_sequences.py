@@ -0,0 +1,78 @@
+"""Add the daily analytics rollups and invoice number sequences
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Creates daily_job_rollups, daily_revenue_rollups, daily_parts_rollups and
+their rollup_watermarks, plus invoice_sequences. init_db() may already have
+created any of them, so each table is checked before it is created. The
+rollups start empty; run python -m services.rollups --full to fill them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TABLES = [
+    "daily_job_rollups",
+    "daily_revenue_rollups",
+    "daily_parts_rollups",
+    "rollup_watermarks",
+    "invoice_sequences",
+]
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "daily_job_rollups" not in existing:
+        op.create_table(
+            "daily_job_rollups",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("day", sa.Date, nullable=False),
+            sa.Column("technician_id", sa.Integer, sa.ForeignKey("technicians.id")),
+            sa.Column("job_type", sa.String),
+            sa.Column("jobs_completed", sa.Integer),
+            sa.Column("actual_hours", sa.Float)
+        )
+    op.create_index("ix_daily_job_rollups_id", "daily_job_rollups", ["id"], if_not_exists=True)
+    op.create_index("ix_daily_job_rollups_day", "daily_job_rollups", ["day"], if_not_exists=True)
+
+    if "daily_revenue_rollups" not in existing:
+        op.create_table(
+            "daily_revenue_rollups",
+            sa.Column("day", sa.Date, primary_key=True),
+            sa.Column("invoices_billed", sa.Integer),
+            sa.Column("revenue_billed", sa.Float),
+            sa.Column("invoices_paid", sa.Integer),
+            sa.Column("revenue_paid", sa.Float)
+        )
+
+    if "daily_parts_rollups" not in existing:
+        op.create_table(
+            "daily_parts_rollups",
+            sa.Column("day", sa.Date, primary_key=True),
+            sa.Column("quantity_used", sa.Integer),
+            sa.Column("parts_cost", sa.Float)
+        )
+
+    if "rollup_watermarks" not in existing:
+        op.create_table(
+            "rollup_watermarks",
+            sa.Column("name", sa.String, primary_key=True),
+            sa.Column("refreshed_at", sa.DateTime, nullable=False)
+        )
+
+    if "invoice_sequences" not in existing:
+        op.create_table(
+            "invoice_sequences",
+            sa.Column("name", sa.String, primary_key=True),
+            sa.Column("next_value", sa.Integer, nullable=False)
+        )
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_table(table)
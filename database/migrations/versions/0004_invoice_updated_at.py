@@ -0,0 +1,48 @@
+"""Track invoice changes with updated_at
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+The revenue rollup used created_at and paid_date to find changed invoices,
+which missed payments recorded with an earlier paid_date and any status or
+amount correction. Existing rows are backfilled with the later of the two,
+capped at the time of the migration so future-dated payments are not picked
+up again on every refresh.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("invoices")}
+    if "updated_at" not in columns:
+        with op.batch_alter_table("invoices") as batch:
+            batch.add_column(sa.Column("updated_at", sa.DateTime))
+
+    invoices = sa.table(
+        "invoices",
+        sa.column("created_at", sa.DateTime),
+        sa.column("paid_date", sa.DateTime),
+        sa.column("updated_at", sa.DateTime)
+    )
+    latest = sa.case(
+        (invoices.c.paid_date > invoices.c.created_at, invoices.c.paid_date),
+        else_=invoices.c.created_at
+    )
+    now = sa.literal(datetime.utcnow(), sa.DateTime)
+    op.execute(invoices.update().where(invoices.c.updated_at.is_(None)).values(
+        updated_at=sa.case((latest > now, now), else_=latest)
+    ))
+    op.create_index("ix_invoices_updated_at", "invoices", ["updated_at"], if_not_exists=True)
+
+def downgrade():
+    op.drop_index("ix_invoices_updated_at", table_name="invoices", if_exists=True)
+    with op.batch_alter_table("invoices") as batch:
+        batch.drop_column("updated_at")
@@ -0,0 +1,47 @@
+"""Track timesheet changes with updated_at
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+The accounting export used created_at and check_out_time to find changed
+timesheets, so edits made after check-out (verification, anomaly flags,
+corrected hours) were never exported again. Existing rows are backfilled
+with the later of the two, capped at the time of the migration.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("timesheets")}
+    if "updated_at" not in columns:
+        with op.batch_alter_table("timesheets") as batch:
+            batch.add_column(sa.Column("updated_at", sa.DateTime))
+
+    timesheets = sa.table(
+        "timesheets",
+        sa.column("created_at", sa.DateTime),
+        sa.column("check_out_time", sa.DateTime),
+        sa.column("updated_at", sa.DateTime)
+    )
+    latest = sa.case(
+        (timesheets.c.check_out_time > timesheets.c.created_at, timesheets.c.check_out_time),
+        else_=timesheets.c.created_at
+    )
+    now = sa.literal(datetime.utcnow(), sa.DateTime)
+    op.execute(timesheets.update().where(timesheets.c.updated_at.is_(None)).values(
+        updated_at=sa.case((latest > now, now), else_=latest)
+    ))
+    op.create_index("ix_timesheets_updated_at", "timesheets", ["updated_at"], if_not_exists=True)
+
+def downgrade():
+    op.drop_index("ix_timesheets_updated_at", table_name="timesheets", if_exists=True)
+    with op.batch_alter_table("timesheets") as batch:
+        batch.drop_column("updated_at")
@@ -1,5 +1,5 @@
 """SQLAlchemy database models for FieldOps AI"""
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, Index, Enum as SQLEnum, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database.session import Base
@@ -60,6 +60,10 @@ class Technician(Base):
 
 class WorkOrder(Base):
     __tablename__ = "work_orders"
+    __table_args__ = (
+        Index("ix_work_orders_status_scheduled_date", "status", "scheduled_date"),
+        Index("ix_work_orders_technician_status", "assigned_technician_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
@@ -88,7 +92,7 @@ class WorkOrder(Base):
     actual_cost = Column(Float)
     
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     customer = relationship("Customer", back_populates="work_orders")
     technician = relationship("Technician", back_populates="work_orders")
@@ -104,32 +108,61 @@ class InventoryItem(Base):
     sku = Column(String, unique=True)
     category = Column(String)
     description = Column(Text)
-    quantity = Column(Integer, default=0)
+    quantity = Column(Integer, default=0)  # on hand
+    reserved = Column(Integer, default=0, nullable=False)  # held for scheduled jobs
     unit_price = Column(Float, default=0.0)
     reorder_level = Column(Integer, default=10)
+    low_stock = Column(Boolean, default=False, nullable=False, index=True)  # quantity - reserved <= reorder_level
     supplier = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     job_parts = relationship("JobPart", back_populates="inventory_item")
+    reservations = relationship("PartReservation", back_populates="inventory_item")
+
+# SQL expressions for stock levels, shared by every writer of InventoryItem.low_stock
+STOCK_ON_HAND = func.coalesce(InventoryItem.quantity, 0)
+STOCK_AVAILABLE = STOCK_ON_HAND - InventoryItem.reserved
+
+def is_low_stock(on_hand, reserved):
+    """SQL: whether an item holding this stock is at or below its reorder level"""
+    return on_hand - reserved <= func.coalesce(InventoryItem.reorder_level, 0)
+
+LOW_STOCK = is_low_stock(STOCK_ON_HAND, InventoryItem.reserved)
 
 class JobPart(Base):
     __tablename__ = "job_parts"
     
     id = Column(Integer, primary_key=True, index=True)
-    work_order_id = Column(Integer, ForeignKey("work_orders.id"))
+    work_order_id = Column(Integer, ForeignKey("work_orders.id"), index=True)
     inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"))
     
     quantity_used = Column(Integer, default=1)
     unit_cost = Column(Float)
     total_cost = Column(Float)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     work_order = relationship("WorkOrder", back_populates="parts_used")
     inventory_item = relationship("InventoryItem", back_populates="job_parts")
 
+class PartReservation(Base):
+    """Parts held for a scheduled job until it is completed or cancelled"""
+    __tablename__ = "part_reservations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    work_order_id = Column(Integer, ForeignKey("work_orders.id"), index=True)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    inventory_item = relationship("InventoryItem", back_populates="reservations")
+
 class Timesheet(Base):
     __tablename__ = "timesheets"
+    __table_args__ = (
+        Index("ix_timesheets_verified_check_in", "is_verified", "check_in_time"),
+        Index("ix_timesheets_technician_check_in", "technician_id", "check_in_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     technician_id = Column(Integer, ForeignKey("technicians.id"))
@@ -149,12 +182,16 @@ class Timesheet(Base):
     anomaly_reason = Column(String)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     technician = relationship("Technician", back_populates="timesheets")
     work_order = relationship("WorkOrder", back_populates="timesheets")
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_status_paid_date", "status", "paid_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
@@ -180,8 +217,52 @@ class Invoice(Base):
     paid_date = Column(DateTime)
     
     pdf_path = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     customer = relationship("Customer", back_populates="invoices")
     work_order = relationship("WorkOrder", back_populates="invoice")
 
+class DailyJobRollup(Base):
+    """Completed jobs per scheduled day, technician and job type"""
+    __tablename__ = "daily_job_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    technician_id = Column(Integer, ForeignKey("technicians.id"))
+    job_type = Column(String)
+    
+    jobs_completed = Column(Integer, default=0)
+    actual_hours = Column(Float, default=0.0)
+
+class DailyRevenueRollup(Base):
+    """Invoice totals per invoice day (paid = subset of billed that is paid)"""
+    __tablename__ = "daily_revenue_rollups"
+    
+    day = Column(Date, primary_key=True)
+    invoices_billed = Column(Integer, default=0)
+    revenue_billed = Column(Float, default=0.0)
+    invoices_paid = Column(Integer, default=0)
+    revenue_paid = Column(Float, default=0.0)
+
+class DailyPartsRollup(Base):
+    """Parts consumption per day"""
+    __tablename__ = "daily_parts_rollups"
+    
+    day = Column(Date, primary_key=True)
+    quantity_used = Column(Integer, default=0)
+    parts_cost = Column(Float, default=0.0)
+
+class RollupWatermark(Base):
+    """Last refresh time per rollup, used to find days touched since"""
+    __tablename__ = "rollup_watermarks"
+    
+    name = Column(String, primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)
+
+class InvoiceSequence(Base):
+    """Next invoice number per series; billing runs take numbers from it in blocks"""
+    __tablename__ = "invoice_sequences"
+    
+    name = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False)
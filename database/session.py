@@ -1,12 +1,98 @@
 """Database session management"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from config import DATABASE_URL
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, SQLITE_PRAGMAS
+)
+
+def engine_options(url: str) -> dict:
+    """Pool settings for a database URL.
+
+    File-backed SQLite gets the same QueuePool sizing as a server database;
+    in-memory SQLite and aiosqlite keep SQLAlchemy's default pool.
+    """
+    if "sqlite" not in url:
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING
+        }
+    if ":memory:" in url or url.rstrip("/").endswith("sqlite:") or "aiosqlite" in url:
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT
+    }
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    **engine_options(DATABASE_URL)
+)
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Unit of work: one session, committed on success, rolled back on error, always closed.
+
+    Services take the yielded session instead of opening their own, so
+    several service calls in one request share a session and connection.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    """Pooled async sessionmaker for the API, created on first use.
+
+    Deferred so the dashboard and scripts do not need an async driver installed.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+        if _async_engine.dialect.name == "sqlite":
+            event.listen(_async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_sessionmaker
+
+async def get_async_db():
+    """FastAPI dependency yielding one AsyncSession per request"""
+    async with get_async_sessionmaker()() as session:
+        yield session
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
 def init_db():
     """Initialize database tables"""
     # Import models to ensure they're registered with Base
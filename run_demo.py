@@ -6,7 +6,7 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from database.session import init_db
+from database.bootstrap import prepare
 from utils.data_generator import load_demo_data
 
 def main():
@@ -15,7 +15,7 @@ def main():
     
     # Initialize database
     print("\nCreating database...")
-    init_db()
+    prepare()
     print("Database initialized")
     
     # Load demo data
@@ -0,0 +1,221 @@
+"""Streaming export of invoices, job parts and timesheets for accounting sync.
+
+Rows are read with yield_per (a server-side cursor on PostgreSQL) and written
+batch by batch: CSV and JSONL line by line, Parquet one row group per batch,
+so memory stays flat however large the tables are. Files are written under a
+temporary name and renamed when complete.
+
+Incremental exports pick up rows created or changed since the last
+successful export to the same directory, tracked in <output>/.export_state.json.
+Rows bulk-imported with timestamps older than that need a --full export:
+
+    python -m services.accounting_export --format csv --output exports/
+    python -m services.accounting_export --format parquet --output exports/ --full
+"""
+import argparse
+import csv
+import enum
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select
+from sqlalchemy.orm import Session
+
+from config import EXPORT_DIR, EXPORT_BATCH_SIZE
+from database.session import SessionLocal
+from database.models import Invoice, JobPart, Timesheet
+
+STATE_FILE = ".export_state.json"
+
+# Table -> (model, rows changed since a watermark). Invoices and timesheets
+# are edited after they are created (payments, corrections, check-outs), so
+# they go by updated_at, as in the analytics rollups; job parts never change.
+EXPORTS = {
+    "invoices": (Invoice, lambda since: Invoice.updated_at > since),
+    "job_parts": (JobPart, lambda since: JobPart.created_at > since),
+    "timesheets": (Timesheet, lambda since: Timesheet.updated_at > since)
+}
+
+def plain(value):
+    """Enum members as their values; everything else unchanged"""
+    return value.value if isinstance(value, enum.Enum) else value
+
+class CSVExportWriter:
+    extension = "csv"
+    
+    def __init__(self, path: Path, columns: Sequence):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.name for column in columns])
+    
+    def write(self, rows: List[Sequence]):
+        self.writer.writerows(
+            ["" if value is None else value.isoformat() if isinstance(value, datetime) else plain(value) for value in row]
+            for row in rows
+        )
+    
+    def close(self):
+        self.file.close()
+
+class JSONLExportWriter:
+    extension = "jsonl"
+    
+    def __init__(self, path: Path, columns: Sequence):
+        self.file = open(path, "w")
+        self.names = [column.name for column in columns]
+    
+    def write(self, rows: List[Sequence]):
+        self.file.writelines(
+            json.dumps(dict(zip(self.names, map(plain, row))), default=lambda value: value.isoformat()) + "\n"
+            for row in rows
+        )
+    
+    def close(self):
+        self.file.close()
+
+class ParquetExportWriter:
+    """One Parquet row group per batch"""
+    
+    extension = "parquet"
+    
+    def __init__(self, path: Path, columns: Sequence):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        def arrow_type(column_type):
+            if isinstance(column_type, Boolean):
+                return pa.bool_()
+            if isinstance(column_type, Integer):
+                return pa.int64()
+            if isinstance(column_type, Float):
+                return pa.float64()
+            if isinstance(column_type, DateTime):
+                return pa.timestamp("us")
+            if isinstance(column_type, Date):
+                return pa.date32()
+            return pa.string()
+        
+        self.pa = pa
+        self.schema = pa.schema([(column.name, arrow_type(column.type)) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="snappy")
+    
+    def write(self, rows: List[Sequence]):
+        arrays = [
+            self.pa.array([plain(row[i]) for row in rows], type=field.type)
+            for i, field in enumerate(self.schema)
+        ]
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+    
+    def close(self):
+        self.writer.close()
+
+WRITERS = {"csv": CSVExportWriter, "jsonl": JSONLExportWriter, "parquet": ParquetExportWriter}
+
+class AccountingExporter:
+    """Stream accounting tables to files, fully or since the last export"""
+    
+    def __init__(self, output_dir: Path = EXPORT_DIR, db: Optional[Session] = None,
+                 batch_size: int = EXPORT_BATCH_SIZE):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
+        self.output_dir = Path(output_dir)
+        self.batch_size = batch_size
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    @property
+    def state_path(self) -> Path:
+        return self.output_dir / STATE_FILE
+    
+    def watermarks(self) -> Dict[str, datetime]:
+        if not self.state_path.exists():
+            return {}
+        state = json.loads(self.state_path.read_text())
+        return {table: datetime.fromisoformat(mark) for table, mark in state.items()}
+    
+    def _save_watermarks(self, watermarks: Dict[str, datetime]):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({table: mark.isoformat() for table, mark in watermarks.items()}, indent=2))
+        tmp_path.replace(self.state_path)
+    
+    def export_table(self, table: str, fmt: str, since: Optional[datetime] = None, stamp: str = "") -> Dict:
+        """Stream one table to <output>/<table>[-<stamp>].<ext>; returns rows written and the path"""
+        model, changed_since = EXPORTS[table]
+        columns = list(model.__table__.columns)
+        stmt = select(*columns).order_by(model.id).execution_options(yield_per=self.batch_size)
+        if since is not None:
+            stmt = stmt.where(changed_since(since))
+        
+        writer_class = WRITERS[fmt]
+        path = self.output_dir / f"{table}{'-' + stamp if stamp else ''}.{writer_class.extension}"
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        rows = 0
+        try:
+            writer = writer_class(tmp_path, columns)
+            try:
+                for batch in self.db.execute(stmt).partitions():
+                    writer.write(batch)
+                    rows += len(batch)
+            finally:
+                writer.close()
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return {"rows": rows, "path": str(path)}
+    
+    def export(self, fmt: str = "csv", tables: Iterable[str] = EXPORTS, full: bool = False,
+               since: Optional[datetime] = None) -> Dict[str, Dict]:
+        """Export tables; incremental from each table's watermark unless full or since is given.
+        
+        Watermarks advance only after every table has been written, so a
+        failed run is simply repeated by the next one.
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        watermarks = self.watermarks()
+        # Timestamps are written with utcnow; take the mark before reading
+        started = datetime.utcnow()
+        stamp = started.strftime("%Y%m%dT%H%M%S")
+        
+        results = {}
+        for table in tables:
+            table_since = None if full else since or watermarks.get(table)
+            begun = time.perf_counter()
+            results[table] = self.export_table(table, fmt, table_since, stamp)
+            results[table]["since"] = table_since.isoformat() if table_since else None
+            results[table]["seconds"] = round(time.perf_counter() - begun, 3)
+            watermarks[table] = started
+        self.db.rollback()
+        
+        self._save_watermarks(watermarks)
+        return results
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export invoices, job parts and timesheets for accounting")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--output", default=str(EXPORT_DIR), help="directory for export files and watermarks")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORTS), default=list(EXPORTS))
+    parser.add_argument("--full", action="store_true", help="export every row, ignoring watermarks")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="export rows changed after this time (UTC)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    
+    exporter = AccountingExporter(args.output, batch_size=args.batch_size)
+    try:
+        results = exporter.export(args.format, args.tables, full=args.full, since=args.since)
+    finally:
+        exporter.close()
+    
+    for table, result in results.items():
+        since = f" since {result['since']}" if result["since"] else ""
+        print(f"{table:<12} {result['rows']:>10} rows{since} -> {result['path']} ({result['seconds']}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
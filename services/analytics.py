@@ -1,135 +1,156 @@
 """Analytics and forecasting service"""
 from datetime import datetime, timedelta
-from typing import Dict, List
-from collections import defaultdict
+from typing import Dict, List, Optional
 
+from sqlalchemy import func, exists
+from sqlalchemy.orm import Session
+
+from config import SHIFT_LENGTH_HOURS
 from database.session import SessionLocal
-from database.models import WorkOrder, Invoice, Timesheet, JobPart
+from database.models import WorkOrder, Invoice, Timesheet, JobPart, Technician
+from services.rollups import RollupService
+
+# Gaps longer than this between visits are breaks or end of day, not travel
+MAX_TRAVEL_GAP_MINUTES = 180
 
 class AnalyticsService:
     """Analytics and KPI calculations"""
     
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Optional[Session] = None):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
     
-    def calculate_kpis(self) -> Dict:
-        """Calculate key performance indicators"""
-        try:
-            kpis = {}
-            
-            # Average travel time (mock calculation)
-            timesheets = self.db.query(Timesheet).filter(
-                Timesheet.is_verified == True
-            ).all()
-            
-            if timesheets:
-                avg_travel = 25.0  # Mock: 25 minutes average
-                kpis['avg_travel_time'] = avg_travel
-            
-            # Jobs per day (last 30 days)
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            completed_jobs = self.db.query(WorkOrder).filter(
-                WorkOrder.status == "completed",
-                WorkOrder.scheduled_date >= thirty_days_ago
-            ).count()
-            
-            kpis['jobs_per_day'] = completed_jobs / 30.0
-            
-            # Profit per job
-            invoices = self.db.query(Invoice).filter(
-                Invoice.status == "paid"
-            ).all()
-            
-            if invoices:
-                total_revenue = sum([inv.total_amount for inv in invoices])
-                total_cost = sum([inv.labor_cost + inv.materials_cost for inv in invoices])
-                profit = total_revenue - total_cost
-                kpis['profit_per_job'] = profit / len(invoices) if invoices else 0
-            else:
-                kpis['profit_per_job'] = 0
-            
-            # Material cost variance (mock)
-            kpis['material_variance'] = 5.2  # 5.2% variance
-            
-            # Technician utilization (mock)
-            kpis['utilization'] = 78.5  # 78.5% utilization
-            
-            # 30-day cash balance (from forecast)
-            forecast = self.generate_cash_flow_forecast(30)
-            if forecast:
-                last_balance = forecast[-1]['predicted_balance']
-                kpis['cash_balance_30d'] = last_balance
-            else:
-                kpis['cash_balance_30d'] = 0
-            
-            return kpis
-            
-        finally:
+    def close(self):
+        if self.owns_session:
             self.db.close()
     
+    def _minutes_between(self, start, end):
+        """Dialect-appropriate SQL expression for (end - start) in minutes"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            return (func.julianday(end) - func.julianday(start)) * 1440.0
+        return func.extract("epoch", end - start) / 60.0
+    
+    def _avg_travel_minutes(self, since: datetime) -> Optional[float]:
+        """Average gap between a technician's check-out and their next check-in the same day"""
+        previous_checkout = func.lag(Timesheet.check_out_time).over(
+            partition_by=(Timesheet.technician_id, func.date(Timesheet.check_in_time)),
+            order_by=Timesheet.check_in_time
+        )
+        visits = self.db.query(
+            Timesheet.check_in_time.label("check_in_time"),
+            previous_checkout.label("previous_checkout")
+        ).filter(
+            Timesheet.is_verified == True,
+            Timesheet.check_in_time >= since
+        ).subquery()
+        
+        gap = self._minutes_between(visits.c.previous_checkout, visits.c.check_in_time)
+        return self.db.query(func.avg(gap)).filter(
+            visits.c.previous_checkout.isnot(None),
+            gap.between(0, MAX_TRAVEL_GAP_MINUTES)
+        ).scalar()
+    
+    def _utilization(self, since: datetime, until: datetime) -> float:
+        """Hours on the clock as a share of active technicians' available shift hours"""
+        hours_worked = self.db.query(func.coalesce(func.sum(Timesheet.hours_worked), 0.0)).filter(
+            Timesheet.check_in_time >= since,
+            Timesheet.check_in_time < until
+        ).scalar()
+        active_technicians = self.db.query(func.count(Technician.id)).filter(
+            Technician.is_active == True
+        ).scalar()
+        
+        workdays = sum(1 for i in range((until - since).days) if (since + timedelta(days=i)).weekday() < 5)
+        available = (active_technicians or 0) * workdays * SHIFT_LENGTH_HOURS
+        return round(100.0 * hours_worked / available, 1) if available else 0.0
+    
+    def calculate_kpis(self, forecast: Optional[List[Dict]] = None) -> Dict:
+        """Calculate key performance indicators (pass forecast to reuse one already computed)"""
+        kpis = {}
+        now = datetime.now()
+        thirty_days_ago = now - timedelta(days=30)
+        
+        # Average travel time between consecutive verified visits
+        has_verified = self.db.query(
+            exists().where(Timesheet.is_verified == True)
+        ).scalar()
+        
+        if has_verified:
+            avg_travel = self._avg_travel_minutes(thirty_days_ago)
+            kpis['avg_travel_time'] = round(avg_travel, 1) if avg_travel is not None else 0.0
+        
+        # Jobs per day (last 30 days)
+        completed_jobs = self.db.query(func.count(WorkOrder.id)).filter(
+            WorkOrder.status == "completed",
+            WorkOrder.scheduled_date >= thirty_days_ago
+        ).scalar()
+        
+        kpis['jobs_per_day'] = completed_jobs / 30.0
+        
+        # Profit per job
+        paid_count, total_revenue, total_cost = self.db.query(
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0.0),
+            func.coalesce(func.sum(Invoice.labor_cost + Invoice.materials_cost), 0.0)
+        ).filter(
+            Invoice.status == "paid"
+        ).one()
+        
+        if paid_count:
+            kpis['profit_per_job'] = (total_revenue - total_cost) / paid_count
+        else:
+            kpis['profit_per_job'] = 0
+        
+        # Material cost variance (mock)
+        kpis['material_variance'] = 5.2  # 5.2% variance
+        
+        # Technician utilization (last 30 days)
+        kpis['utilization'] = self._utilization(thirty_days_ago, now)
+        
+        # 30-day cash balance (from forecast)
+        if forecast is None:
+            forecast = self.generate_cash_flow_forecast(30)
+        if forecast:
+            last_balance = forecast[-1]['predicted_balance']
+            kpis['cash_balance_30d'] = last_balance
+        else:
+            kpis['cash_balance_30d'] = 0
+        
+        return kpis
+    
     def generate_cash_flow_forecast(self, days: int = 30) -> List[Dict]:
         """Generate cash flow forecast using simple projection"""
-        try:
-            # Get historical data
-            invoices = self.db.query(Invoice).all()
-            
-            # Calculate average daily revenue and expenses
-            paid_invoices = [inv for inv in invoices if inv.status == "paid"]
-            total_revenue = sum([inv.total_amount for inv in paid_invoices])
-            
-            # Simple forecast: assume current trend continues
-            daily_revenue = total_revenue / 30.0 if len(paid_invoices) > 0 else 500.0
-            daily_expenses = daily_revenue * 0.6  # Assume 60% expenses
-            
-            # Current balance (mock)
-            current_balance = 15000.0
-            
-            forecast = []
-            for i in range(days):
-                date = datetime.now() + timedelta(days=i)
-                current_balance = current_balance + daily_revenue - daily_expenses
-                
-                # Add some variance
-                variance = (i % 7) * 50  # Weekly pattern
-                current_balance += variance
-                
-                forecast.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "predicted_balance": round(current_balance, 2)
-                })
-            
-            return forecast
-            
-        finally:
-            self.db.close()
+        # Get historical data
+        paid_count, total_revenue = self.db.query(
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0.0)
+        ).filter(
+            Invoice.status == "paid"
+        ).one()
+        
+        # Simple forecast: assume current trend continues
+        daily_revenue = total_revenue / 30.0 if paid_count > 0 else 500.0
+        daily_expenses = daily_revenue * 0.6  # Assume 60% expenses
+        
+        # Current balance (mock)
+        current_balance = 15000.0
+        
+        forecast = []
+        for i in range(days):
+            date = datetime.now() + timedelta(days=i)
+            current_balance = current_balance + daily_revenue - daily_expenses
+            
+            # Add some variance
+            variance = (i % 7) * 50  # Weekly pattern
+            current_balance += variance
+            
+            forecast.append({
+                "date": date.strftime("%Y-%m-%d"),
+                "predicted_balance": round(current_balance, 2)
+            })
+        
+        return forecast
     
-    def get_job_completion_trends(self) -> List[Dict]:
-        """Get job completion trends for last 30 days"""
-        try:
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            completed_jobs = self.db.query(WorkOrder).filter(
-                WorkOrder.status == "completed",
-                WorkOrder.scheduled_date >= thirty_days_ago
-            ).all()
-            
-            # Group by date
-            daily_counts = defaultdict(int)
-            for job in completed_jobs:
-                if job.scheduled_date:
-                    date_key = job.scheduled_date.strftime("%Y-%m-%d")
-                    daily_counts[date_key] += 1
-            
-            # Fill in missing dates with 0
-            trends = []
-            for i in range(30):
-                date = (datetime.now() - timedelta(days=29-i)).strftime("%Y-%m-%d")
-                trends.append({
-                    "date": date,
-                    "completed_jobs": daily_counts.get(date, 0)
-                })
-            
-            return trends
-            
-        finally:
-            self.db.close()
-
+    def get_job_completion_trends(self, days: int = 30) -> List[Dict]:
+        """Get job completion trends for the last `days` days from the daily rollup (as of its last refresh)"""
+        return RollupService(self.db).job_completion_trends(days)
@@ -0,0 +1,195 @@
+"""Billing runs: invoice every completed, uninvoiced work order in a date range.
+
+The eligible jobs are read with their technician's rate, and timesheet hours
+and parts cost are each aggregated in a single GROUP BY over those jobs.
+Invoice numbers are taken from InvoiceSequence one block per batch and the
+invoices are bulk-inserted, all in one transaction.
+
+    python -m services.billing --start 2026-10-01 --end 2026-11-01
+"""
+import argparse
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from config import INVOICE_NUMBER_FORMAT, INVOICE_PAYMENT_TERMS_DAYS, DEFAULT_LABOR_RATE, BILLING_BATCH_SIZE
+from database.session import SessionLocal
+from database.models import WorkOrder, Technician, Timesheet, JobPart, Invoice, InvoiceSequence
+from utils.cache import invalidate
+
+SEQUENCE = "invoice"
+
+# Same default as the invoices table: 13% HST for Ontario
+TAX_RATE = Invoice.__table__.c.tax_rate.default.arg
+
+def _money(amount: float) -> float:
+    return round(amount, 2)
+
+class BillingService:
+    """Create invoices for completed work orders in bulk"""
+    
+    def __init__(self, db: Optional[Session] = None):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    def allocate_numbers(self, count: int) -> int:
+        """Reserve `count` consecutive invoice numbers; returns the first.
+        
+        The increment happens in SQL inside the caller's transaction, so
+        concurrent runs get disjoint blocks and a rolled-back run leaves no gap.
+        """
+        if self.db.get(InvoiceSequence, SEQUENCE) is None:
+            # First run: continue after the highest number already issued (demo or imported data)
+            issued = (re.search(r"\d+$", number or "") for (number,) in self.db.query(Invoice.invoice_number).yield_per(10000))
+            start = max((int(match.group()) for match in issued if match), default=0) + 1
+            self.db.add(InvoiceSequence(name=SEQUENCE, next_value=start))
+            self.db.flush()
+        
+        next_value = self.db.execute(
+            update(InvoiceSequence)
+            .where(InvoiceSequence.name == SEQUENCE)
+            .values(next_value=InvoiceSequence.next_value + count)
+            .returning(InvoiceSequence.next_value)
+        ).scalar_one()
+        return next_value - count
+    
+    def billable_jobs(self, start: datetime, end: datetime) -> List[Tuple]:
+        """Completed, uninvoiced jobs scheduled in [start, end) with their billing inputs.
+        
+        Rows are (job_id, customer_id, actual_duration, estimated_duration,
+        hourly_rate, timesheet_hours, parts_cost). Hours and parts are each one
+        GROUP BY over the eligible jobs, merged here rather than joined as
+        derived tables, which SQLite would rescan for every job.
+        """
+        eligible = select(WorkOrder.id).where(
+            WorkOrder.status == "completed",
+            WorkOrder.scheduled_date >= start,
+            WorkOrder.scheduled_date < end,
+            ~exists().where(Invoice.work_order_id == WorkOrder.id)
+        )
+        
+        jobs = self.db.execute(
+            select(
+                WorkOrder.id, WorkOrder.customer_id, WorkOrder.actual_duration, WorkOrder.estimated_duration,
+                Technician.hourly_rate
+            )
+            .outerjoin(Technician, Technician.id == WorkOrder.assigned_technician_id)
+            .where(WorkOrder.id.in_(eligible))
+            .order_by(WorkOrder.id)
+        ).all()
+        hours = dict(self.db.execute(
+            select(Timesheet.work_order_id, func.sum(Timesheet.hours_worked))
+            .where(Timesheet.work_order_id.in_(eligible))
+            .group_by(Timesheet.work_order_id)
+        ).all())
+        materials = dict(self.db.execute(
+            select(JobPart.work_order_id, func.sum(JobPart.total_cost))
+            .where(JobPart.work_order_id.in_(eligible))
+            .group_by(JobPart.work_order_id)
+        ).all())
+        return [(*job, hours.get(job[0]), materials.get(job[0])) for job in jobs]
+    
+    def invoice_rows(self, jobs, first_number: int, invoice_date: datetime, tax_rate: float) -> List[Dict]:
+        rows = []
+        due_date = invoice_date + timedelta(days=INVOICE_PAYMENT_TERMS_DAYS)
+        # invoice_date may be backdated; created_at stays the real insert time so rollups and exports see the rows
+        created_at = datetime.utcnow()
+        for offset, (job_id, customer_id, actual_duration, estimated_duration, hourly_rate, hours, cost) in enumerate(jobs):
+            # Timesheets are the record of time on site; fall back to the job's own duration
+            labor_hours = hours if hours is not None else actual_duration or estimated_duration or 0.0
+            labor_rate = hourly_rate if hourly_rate is not None else DEFAULT_LABOR_RATE
+            labor_cost = _money(labor_hours * labor_rate)
+            materials_cost = _money(cost or 0.0)
+            subtotal = _money(labor_cost + materials_cost)
+            tax_amount = _money(subtotal * tax_rate)
+            rows.append({
+                "customer_id": customer_id,
+                "work_order_id": job_id,
+                "invoice_number": INVOICE_NUMBER_FORMAT.format(first_number + offset),
+                "invoice_date": invoice_date,
+                "due_date": due_date,
+                "labor_hours": round(labor_hours, 2),
+                "labor_rate": labor_rate,
+                "labor_cost": labor_cost,
+                "materials_cost": materials_cost,
+                "other_charges": 0.0,
+                "subtotal": subtotal,
+                "tax_rate": tax_rate,
+                "tax_amount": tax_amount,
+                "total_amount": _money(subtotal + tax_amount),
+                "status": "pending",
+                "created_at": created_at
+            })
+        return rows
+    
+    def run(self, start: date, end: date, invoice_date: Optional[datetime] = None, tax_rate: float = TAX_RATE,
+            batch_size: int = BILLING_BATCH_SIZE, dry_run: bool = False) -> Dict:
+        """Invoice every completed, uninvoiced job scheduled from start up to (not including) end.
+        
+        Runs as one transaction: either every invoice is created or none are.
+        With dry_run the invoices are computed and summarised but not saved.
+        """
+        started = time.perf_counter()
+        invoice_date = invoice_date or datetime.utcnow()
+        try:
+            jobs = self.billable_jobs(datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()))
+            
+            numbers = []  # first and last of each block
+            total = 0.0
+            for i in range(0, len(jobs), batch_size):
+                batch = jobs[i:i + batch_size]
+                first_number = self.allocate_numbers(len(batch))
+                rows = self.invoice_rows(batch, first_number, invoice_date, tax_rate)
+                if not dry_run:
+                    self.db.execute(insert(Invoice), rows)
+                numbers.extend((rows[0]["invoice_number"], rows[-1]["invoice_number"]))
+                total += sum(row["total_amount"] for row in rows)
+            
+            if dry_run:
+                self.db.rollback()
+            else:
+                self.db.commit()
+                if jobs:
+                    invalidate("invoices")
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        return {
+            "jobs": len(jobs),
+            "invoices_created": 0 if dry_run else len(jobs),
+            "first_invoice_number": numbers[0] if numbers else None,
+            "last_invoice_number": numbers[-1] if numbers else None,
+            "total_billed": _money(total),
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Invoice completed, uninvoiced work orders in a date range")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first scheduled date (inclusive)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="last scheduled date (exclusive)")
+    parser.add_argument("--batch-size", type=int, default=BILLING_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="compute and summarise without saving")
+    args = parser.parse_args(argv)
+    
+    service = BillingService()
+    try:
+        report = service.run(args.start, args.end, batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        service.close()
+    
+    for key, value in report.items():
+        print(f"{key:<22} {value}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Batch booking intake: classify message streams in parallel and bulk-insert work orders.
+
+Messages come from any iterable (a JSONL file, a queue drained by a
+generator, an API request body) and are pulled lazily in chunks. Chunks are
+classified in a process pool with at most INTAKE_MAX_PENDING_CHUNKS in
+flight, so a storm-day surge is read only as fast as it can be classified
+and written, and memory stays bounded by chunk_size * max_pending.
+
+    python -m services.booking_intake messages.jsonl --output results.jsonl
+"""
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from config import INTAKE_CHUNK_SIZE, INTAKE_WORKERS, INTAKE_MAX_PENDING_CHUNKS
+from database.session import SessionLocal
+from database.models import WorkOrder
+from utils.cache import invalidate
+
+MESSAGE_FIELDS = ("customer_id", "location", "lat", "lng", "scheduled_date")
+
+_service = None
+
+def classify_chunk(texts: List[str]) -> List[Dict]:
+    """Classify a chunk of messages with this process's NLPBookingService"""
+    global _service
+    if _service is None:
+        from services.nlp_service import NLPBookingService
+        _service = NLPBookingService()
+    return _service.process_booking_requests(texts)
+
+def normalize_message(message: Union[str, Dict]) -> Dict:
+    """Accept a bare string or a dict with "text" plus optional booking fields"""
+    if isinstance(message, str):
+        return {"text": message}
+    normalized = {"text": message["text"]}
+    for field in MESSAGE_FIELDS:
+        if message.get(field) is not None:
+            normalized[field] = message[field]
+    if isinstance(normalized.get("scheduled_date"), str):
+        normalized["scheduled_date"] = datetime.fromisoformat(normalized["scheduled_date"])
+    return normalized
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """Lazily read messages from a JSONL file (one string or object per line)"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def work_order_rows(messages: List[Dict], results: List[Dict]) -> List[Dict]:
+    """WorkOrder insert parameters for classified messages"""
+    now = datetime.utcnow()
+    return [
+        {
+            "customer_id": message.get("customer_id"),
+            "job_type": result["job_type"],
+            "description": message["text"],
+            "location": message.get("location") or result["location"],
+            "lat": message.get("lat"),
+            "lng": message.get("lng"),
+            "status": "pending",
+            "priority": result["priority"],
+            "scheduled_date": message.get("scheduled_date"),
+            "created_at": now,
+            "updated_at": now
+        }
+        for message, result in zip(messages, results)
+    ]
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+class BatchBookingIntake:
+    """Streaming, parallel counterpart to NLPBookingService.process_booking_request"""
+    
+    def __init__(self, db: Optional[Session] = None, workers: int = INTAKE_WORKERS,
+                 chunk_size: int = INTAKE_CHUNK_SIZE, max_pending: int = INTAKE_MAX_PENDING_CHUNKS,
+                 persist: bool = True):
+        self.owns_session = db is None and persist
+        self.db = db if db is not None or not persist else SessionLocal()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_pending = max(max_pending, 1)
+        self.persist = persist
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    def _persist(self, messages: List[Dict], results: List[Dict]) -> List[Dict]:
+        """Bulk-insert one chunk of work orders; returns results with work_order_id set"""
+        if self.persist:
+            ids = self.db.scalars(
+                insert(WorkOrder).returning(WorkOrder.id, sort_by_parameter_order=True),
+                work_order_rows(messages, results)
+            ).all()
+            self.db.commit()
+            invalidate("jobs")
+            for result, work_order_id in zip(results, ids):
+                result["work_order_id"] = work_order_id
+        return results
+    
+    def process(self, messages: Iterable[Union[str, Dict]]) -> Iterator[Dict]:
+        """Yield one structured result per message, in input order.
+        
+        The input is consumed lazily; with workers > 1 no more than
+        max_pending chunks are read ahead of the results being yielded.
+        """
+        chunks = chunked(map(normalize_message, messages), self.chunk_size)
+        
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield from self._persist(chunk, classify_chunk([m["text"] for m in chunk]))
+            return
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(classify_chunk, [m["text"] for m in chunk])))
+                if len(pending) >= self.max_pending:
+                    chunk, future = pending.popleft()
+                    yield from self._persist(chunk, future.result())
+            
+            while pending:
+                chunk, future = pending.popleft()
+                yield from self._persist(chunk, future.result())
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Classify a JSONL stream of booking messages and create work orders")
+    parser.add_argument("path", help="JSONL file: one message string or {\"text\": ...} object per line")
+    parser.add_argument("--output", help="write one JSON result per line here")
+    parser.add_argument("--workers", type=int, default=INTAKE_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=INTAKE_CHUNK_SIZE)
+    parser.add_argument("--max-pending", type=int, default=INTAKE_MAX_PENDING_CHUNKS)
+    parser.add_argument("--dry-run", action="store_true", help="classify only, don't insert work orders")
+    args = parser.parse_args(argv)
+    
+    intake = BatchBookingIntake(
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        max_pending=args.max_pending,
+        persist=not args.dry_run
+    )
+    output = open(args.output, "w") if args.output else None
+    count = 0
+    job_types = {}
+    try:
+        for result in intake.process(read_jsonl(args.path)):
+            count += 1
+            job_types[result["job_type"]] = job_types.get(result["job_type"], 0) + 1
+            if output:
+                output.write(json.dumps(result) + "\n")
+    finally:
+        intake.close()
+        if output:
+            output.close()
+    
+    print(f"Processed {count} messages" + ("" if args.dry_run else f", created {count} work orders"))
+    for job_type, n in sorted(job_types.items(), key=lambda item: -item[1]):
+        print(f"    {n:>8}  {job_type}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Query layer for dashboard panels"""
+from datetime import datetime, date as date_type, timedelta
+from typing import Dict, List, Tuple
+from collections import defaultdict
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session, selectinload
+
+from config import DASHBOARD_CACHE_TTL
+from database.session import session_scope
+from database.models import WorkOrder, Technician, Invoice, InventoryItem
+from services.analytics import AnalyticsService
+from services.rollups import RollupService
+from utils.cache import cached
+
+ACTIVE_STATUSES = ["scheduled", "in_progress"]
+
+class DashboardQueries:
+    """Bulk, eager-loaded reads and SQL aggregates for the dashboard"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def quick_stats(self, today: date_type) -> Dict:
+        """Header metrics in one round-trip per table"""
+        day_start = datetime.combine(today, datetime.min.time())
+        
+        active_jobs = self.db.query(func.count(WorkOrder.id)).filter(
+            WorkOrder.status.in_(ACTIVE_STATUSES)
+        ).scalar()
+        technicians = self.db.query(func.count(Technician.id)).scalar()
+        pending_invoices, today_revenue = self.db.query(
+            func.count(case((Invoice.status == "pending", Invoice.id))),
+            func.coalesce(func.sum(case(
+                ((Invoice.status == "paid") & (Invoice.paid_date >= day_start) &
+                 (Invoice.paid_date < day_start + timedelta(days=1)), Invoice.total_amount),
+                else_=0.0
+            )), 0.0)
+        ).one()
+        
+        return {
+            "active_jobs": active_jobs or 0,
+            "technicians": technicians or 0,
+            "pending_invoices": pending_invoices or 0,
+            "today_revenue": today_revenue or 0.0
+        }
+    
+    def technicians(self) -> List[Technician]:
+        return self.db.query(Technician).order_by(Technician.id).all()
+    
+    def jobs_by_technician(self, selected_date: date_type) -> Tuple[int, List[Tuple[Technician, List[WorkOrder]]]]:
+        """Active jobs for a date grouped by technician, customers eager-loaded"""
+        jobs = self.db.query(WorkOrder).options(
+            selectinload(WorkOrder.customer),
+            selectinload(WorkOrder.technician)
+        ).filter(
+            WorkOrder.scheduled_date == selected_date,
+            WorkOrder.status.in_(ACTIVE_STATUSES)
+        ).order_by(WorkOrder.assigned_technician_id, WorkOrder.id).all()
+        
+        grouped = defaultdict(list)
+        technicians = {}
+        for job in jobs:
+            if job.technician is not None:
+                grouped[job.assigned_technician_id].append(job)
+                technicians[job.assigned_technician_id] = job.technician
+        
+        return len(jobs), [(technicians[tech_id], grouped[tech_id]) for tech_id in sorted(grouped)]
+    
+    def active_job_counts(self) -> Dict[int, int]:
+        """Active job count per technician id"""
+        rows = self.db.query(WorkOrder.assigned_technician_id, func.count(WorkOrder.id)).filter(
+            WorkOrder.status.in_(ACTIVE_STATUSES),
+            WorkOrder.assigned_technician_id.isnot(None)
+        ).group_by(WorkOrder.assigned_technician_id).all()
+        return dict(rows)
+    
+    def inventory(self) -> List[InventoryItem]:
+        return self.db.query(InventoryItem).order_by(InventoryItem.id).all()
+    
+    def low_stock_count(self) -> int:
+        return self.db.query(func.count(InventoryItem.id)).filter(InventoryItem.low_stock.is_(True)).scalar() or 0
+    
+    def monthly_revenue(self) -> List[Dict]:
+        """Paid invoice totals per invoice month (months with no payments show 0), as of the last rollup refresh"""
+        return RollupService(self.db).monthly_revenue()
+    
+    def invoice_status_counts(self) -> Dict[str, int]:
+        rows = self.db.query(Invoice.status, func.count(Invoice.id)).group_by(Invoice.status).all()
+        return {getattr(status, "value", status): count for status, count in rows}
+
+# Cached panel loaders: each runs in its own unit of work and returns plain data,
+# so results can be shared across Streamlit reruns and API requests.
+
+@cached(DASHBOARD_CACHE_TTL["stats"], tags=("jobs", "technicians", "invoices"))
+def quick_stats(today: date_type) -> Dict:
+    with session_scope() as db:
+        return DashboardQueries(db).quick_stats(today)
+
+@cached(DASHBOARD_CACHE_TTL["schedule"], tags=("jobs", "technicians", "customers"))
+def schedule_panel(selected_date: date_type) -> Tuple[int, List[Dict]]:
+    """Job count and per-technician job rows for a date"""
+    with session_scope() as db:
+        count, grouped = DashboardQueries(db).jobs_by_technician(selected_date)
+        return count, [
+            {
+                "technician": tech.name,
+                "jobs": [
+                    {
+                        "id": job.id,
+                        "job_type": job.job_type,
+                        "location": job.location,
+                        "status": getattr(job.status, "value", job.status),
+                        "estimated_duration": job.estimated_duration,
+                        "customer": job.customer.name if job.customer else None
+                    }
+                    for job in jobs
+                ]
+            }
+            for tech, jobs in grouped
+        ]
+
+@cached(DASHBOARD_CACHE_TTL["crew"], tags=("jobs", "technicians"))
+def crew_panel() -> List[Dict]:
+    with session_scope() as db:
+        queries = DashboardQueries(db)
+        active_counts = queries.active_job_counts()
+        return [
+            {
+                "Name": tech.name,
+                "Specialty": tech.specialty,
+                "Active Jobs": active_counts.get(tech.id, 0),
+                "Rating": tech.rating if tech.rating is not None else 4.5
+            }
+            for tech in queries.technicians()
+        ]
+
+@cached(DASHBOARD_CACHE_TTL["inventory"], tags=("inventory",))
+def inventory_panel() -> Tuple[List[Dict], int]:
+    """Inventory rows and the number of items at or below reorder level"""
+    with session_scope() as db:
+        queries = DashboardQueries(db)
+        rows = [
+            {
+                "Part Name": item.name,
+                "Category": item.category,
+                "Current Stock": item.quantity,
+                "Reserved": item.reserved,
+                "Reorder Level": item.reorder_level,
+                "Status": "🔴 Low Stock" if item.low_stock else "✅ OK"
+            }
+            for item in queries.inventory()
+        ]
+        return rows, queries.low_stock_count()
+
+@cached(DASHBOARD_CACHE_TTL["financials"], tags=("invoices",))
+def financials_panel() -> Tuple[List[Dict], Dict[str, int]]:
+    """Monthly paid revenue and invoice status counts"""
+    with session_scope() as db:
+        queries = DashboardQueries(db)
+        return queries.monthly_revenue(), queries.invoice_status_counts()
+
+@cached(DASHBOARD_CACHE_TTL["financials"], tags=("invoices",))
+def cash_flow_forecast(days: int = 30) -> List[Dict]:
+    with session_scope() as db:
+        return AnalyticsService(db).generate_cash_flow_forecast(days)
+
+@cached(DASHBOARD_CACHE_TTL["analytics"], tags=("jobs", "invoices", "timesheets"))
+def kpis() -> Dict:
+    with session_scope() as db:
+        return AnalyticsService(db).calculate_kpis(forecast=cash_flow_forecast(30))
+
+@cached(DASHBOARD_CACHE_TTL["analytics"], tags=("jobs",))
+def completion_trends() -> List[Dict]:
+    with session_scope() as db:
+        return AnalyticsService(db).get_job_completion_trends()
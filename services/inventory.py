@@ -0,0 +1,233 @@
+"""Part reservations and stock movements for work orders.
+
+Parts are reserved for a scheduled job by whoever plans its work (POST
+/jobs/{id}/parts; work orders carry no parts list, so the scheduler cannot),
+held against quantity - reserved, taken out of stock when the job is completed
+(recorded as JobParts) and released whenever it is cancelled, by the API or by
+the scheduler. Every call, however many jobs and parts it covers, moves
+each affected item with a single UPDATE: per-item amounts go in a CASE and the
+stock check is part of the WHERE clause, so concurrent calls cannot oversell.
+The items are first locked in id order (SELECT ... FOR UPDATE on PostgreSQL;
+SQLite serialises writers anyway) so batches sharing items queue rather than
+deadlock.
+
+The same UPDATEs keep InventoryItem.low_stock current, so the low-stock list
+is an index lookup instead of a scan of the catalogue.
+
+    python -m services.inventory low-stock
+    python -m services.inventory complete 101 102 103
+"""
+import argparse
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from database.session import SessionLocal
+from database.models import (
+    WorkOrder, InventoryItem, JobPart, PartReservation, STOCK_ON_HAND, STOCK_AVAILABLE, is_low_stock
+)
+from utils.cache import invalidate
+
+class InsufficientStock(ValueError):
+    """Items that cannot cover a reservation or completion; nothing was changed"""
+    
+    def __init__(self, shortages: Dict[int, int]):
+        self.shortages = shortages  # item id -> units missing
+        super().__init__("Insufficient stock: " + ", ".join(
+            f"item {item_id} short by {units}" for item_id, units in sorted(shortages.items())
+        ))
+
+def merge_parts(parts: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Total quantity per item id"""
+    totals = defaultdict(int)
+    for item_id, quantity in parts:
+        if quantity <= 0:
+            raise ValueError(f"Quantity for item {item_id} must be positive")
+        totals[item_id] += quantity
+    return dict(totals)
+
+class InventoryService:
+    """Reserve, consume and release parts for work orders"""
+    
+    def __init__(self, db: Optional[Session] = None):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    def _move(self, amounts: Dict[int, int], on_hand: int, reserved: int, stock) -> Dict[int, Tuple]:
+        """Add amount * on_hand to each item's quantity and amount * reserved to its reserved units.
+        
+        Only items whose `stock` covers their amount are changed; if any is
+        short, raises InsufficientStock and the caller rolls back. Returns
+        item id -> (unit_price, low_stock) as of after the update.
+        """
+        if not amounts:
+            return {}
+        item_ids = sorted(amounts)
+        self.db.execute(
+            select(InventoryItem.id).where(InventoryItem.id.in_(item_ids)).order_by(InventoryItem.id).with_for_update()
+        )
+        
+        amount = case(amounts, value=InventoryItem.id, else_=0)
+        new_on_hand = STOCK_ON_HAND + on_hand * amount
+        new_reserved = InventoryItem.reserved + reserved * amount
+        updated = {
+            item_id: (unit_price, is_low)
+            for item_id, unit_price, is_low in self.db.execute(
+                update(InventoryItem)
+                .where(InventoryItem.id.in_(item_ids), stock >= amount)
+                .values(quantity=new_on_hand, reserved=new_reserved, low_stock=is_low_stock(new_on_hand, new_reserved))
+                .returning(InventoryItem.id, InventoryItem.unit_price, InventoryItem.low_stock)
+                .execution_options(synchronize_session=False)
+            )
+        }
+        
+        if len(updated) < len(item_ids):
+            missing = [item_id for item_id in item_ids if item_id not in updated]
+            in_stock = dict(self.db.execute(select(InventoryItem.id, stock).where(InventoryItem.id.in_(missing))).all())
+            raise InsufficientStock({item_id: amounts[item_id] - in_stock.get(item_id, 0) for item_id in missing})
+        return updated
+    
+    def _claim_reservations(self, work_order_ids: List[int]) -> List[Tuple[int, int, int]]:
+        """Delete and return the (work_order_id, inventory_item_id, quantity) held for the given jobs.
+        
+        Deleting is the claim: a concurrent call for the same jobs waits on
+        these rows and then finds nothing, so parts are never taken twice.
+        """
+        return sorted(self.db.execute(
+            delete(PartReservation)
+            .where(PartReservation.work_order_id.in_(work_order_ids))
+            .returning(PartReservation.work_order_id, PartReservation.inventory_item_id, PartReservation.quantity)
+            .execution_options(synchronize_session=False)
+        ).all())
+    
+    def reserve(self, work_order_id: int, parts: Iterable[Tuple[int, int]]) -> Dict:
+        """Hold (inventory_item_id, quantity) parts for a scheduled job; all or nothing"""
+        amounts = merge_parts(parts)
+        try:
+            updated = self._move(amounts, on_hand=0, reserved=1, stock=STOCK_AVAILABLE)
+            if amounts:
+                now = datetime.utcnow()
+                self.db.execute(insert(PartReservation), [
+                    {"work_order_id": work_order_id, "inventory_item_id": item_id, "quantity": quantity, "created_at": now}
+                    for item_id, quantity in amounts.items()
+                ])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        invalidate("inventory")
+        return {
+            "work_order_id": work_order_id,
+            "items": len(amounts),
+            "units": sum(amounts.values()),
+            "low_stock": sorted(item_id for item_id, (_, is_low) in updated.items() if is_low)
+        }
+    
+    def release(self, work_order_ids: List[int]) -> Dict:
+        """Return the parts held for cancelled jobs to available stock"""
+        try:
+            held = self._claim_reservations(work_order_ids)
+            amounts = merge_parts((item_id, quantity) for _, item_id, quantity in held)
+            self._move(amounts, on_hand=0, reserved=-1, stock=InventoryItem.reserved)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if held:
+            invalidate("inventory")
+        return {"jobs": len(work_order_ids), "items": len(amounts), "units": sum(amounts.values())}
+    
+    def consume(self, work_order_ids: List[int]) -> Dict:
+        """Take the parts held for completed jobs out of stock and record them as JobParts.
+        
+        Commits together with anything else pending in the session (e.g. the
+        jobs' status change), so stock only moves if the completion is saved.
+        """
+        try:
+            held = self._claim_reservations(work_order_ids)
+            amounts = merge_parts((item_id, quantity) for _, item_id, quantity in held)
+            updated = self._move(amounts, on_hand=-1, reserved=-1, stock=STOCK_ON_HAND)
+            if held:
+                now = datetime.utcnow()
+                self.db.execute(insert(JobPart), [
+                    {
+                        "work_order_id": work_order_id,
+                        "inventory_item_id": item_id,
+                        "quantity_used": quantity,
+                        "unit_cost": updated[item_id][0],
+                        "total_cost": round((updated[item_id][0] or 0.0) * quantity, 2),
+                        "created_at": now
+                    }
+                    for work_order_id, item_id, quantity in held
+                ])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if held:
+            invalidate("inventory")
+        return {
+            "jobs": len(work_order_ids),
+            "parts": len(held),
+            "items": len(amounts),
+            "units": sum(amounts.values()),
+            "low_stock": sorted(item_id for item_id, (_, is_low) in updated.items() if is_low)
+        }
+    
+    def complete_jobs(self, work_order_ids: List[int]) -> Dict:
+        """Mark jobs completed and consume their parts in one transaction"""
+        work_order_ids = list(dict.fromkeys(work_order_ids))
+        completed = self.db.execute(
+            update(WorkOrder)
+            .where(WorkOrder.id.in_(work_order_ids), WorkOrder.status.notin_(["completed", "cancelled"]))
+            .values(status="completed", updated_at=datetime.utcnow())
+            .returning(WorkOrder.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        report = self.consume(sorted(completed))
+        report["skipped"] = len(work_order_ids) - len(completed)
+        invalidate("jobs")
+        return report
+    
+    def low_stock_items(self) -> List[InventoryItem]:
+        """Items at or below their reorder level, least available first"""
+        return self.db.query(InventoryItem).filter(InventoryItem.low_stock.is_(True)).order_by(STOCK_AVAILABLE).all()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inventory reservations and stock levels")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("low-stock", help="list items at or below their reorder level")
+    complete = commands.add_parser("complete", help="mark jobs completed and take their reserved parts from stock")
+    complete.add_argument("job_ids", type=int, nargs="+")
+    release = commands.add_parser("release", help="return the parts reserved for jobs to stock")
+    release.add_argument("job_ids", type=int, nargs="+")
+    args = parser.parse_args(argv)
+    
+    service = InventoryService()
+    try:
+        if args.command == "low-stock":
+            for item in service.low_stock_items():
+                print(f"{item.id:>6}  {item.sku or '':<12} {item.quantity - item.reserved:>5} / {item.reorder_level:<5} {item.name}")
+            return 0
+        try:
+            report = service.complete_jobs(args.job_ids) if args.command == "complete" else service.release(args.job_ids)
+        except InsufficientStock as error:
+            print(error)
+            return 1
+    finally:
+        service.close()
+    
+    for key, value in report.items():
+        print(f"{key:<10} {value}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
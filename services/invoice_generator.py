@@ -1,155 +1,538 @@
-"""Auto-invoice generator with PDF export"""
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
+"""Auto-invoice generator with PDF export
+
+generate_pdf() renders one invoice to disk and render_pdf() to bytes in
+memory. The static layout is built once per process (InvoiceTemplate) and
+placed on each page as a form XObject; only per-invoice fields are drawn for
+each PDF. generate_pdfs() renders a month-end batch: invoices and customers
+are read in chunks with one eager query each, rendered across a process
+pool, written atomically, and Invoice.pdf_path is set for the whole batch in
+one bulk UPDATE.
+
+PDFs are cached by content: each is stored under a hash of the fields it
+shows (PDFCache), so an unchanged invoice is served from disk without
+rendering or writing to the database, and old versions are evicted by age
+and total size: after every batch, and from single renders (the API) at most
+once per PDF_CACHE_EVICT_SECONDS in each process.
+
+    python -m services.invoice_generator --all --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
-import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
 
+from config import (
+    PDF_WORKERS, PDF_CHUNK_SIZE, PDF_MAX_PENDING_CHUNKS, PDF_TEMPLATE_CACHE,
+    PDF_CACHE_ENABLED, PDF_CACHE_MAX_AGE_DAYS, PDF_CACHE_MAX_MB, PDF_CACHE_EVICT_SECONDS
+)
 from database.session import SessionLocal
 from database.models import Invoice, WorkOrder, Customer
+from utils.cache import invalidate
+
+def invoice_document(invoice: Invoice) -> Dict:
+    """Everything the PDF shows, as plain values that can be sent to a worker process"""
+    customer = invoice.customer
+    return {
+        "invoice_id": invoice.id,
+        "invoice_number": invoice.invoice_number,
+        "invoice_date": invoice.invoice_date.strftime('%Y-%m-%d') if invoice.invoice_date else 'N/A',
+        "due_date": invoice.due_date.strftime('%Y-%m-%d') if invoice.due_date else 'N/A',
+        "status": invoice.status.upper(),
+        "customer": {
+            "name": customer.name,
+            "address": customer.address,
+            "city": customer.city,
+            "province": customer.province,
+            "postal_code": customer.postal_code
+        } if customer else None,
+        "labor_hours": invoice.labor_hours,
+        "labor_rate": invoice.labor_rate,
+        "labor_cost": invoice.labor_cost,
+        "materials_cost": invoice.materials_cost,
+        "other_charges": invoice.other_charges,
+        "subtotal": invoice.subtotal,
+        "tax_rate": invoice.tax_rate,
+        "tax_amount": invoice.tax_amount,
+        "total_amount": invoice.total_amount
+    }
+
+# Part of every cache key; bump when the PDF layout changes so cached files are re-rendered
+LAYOUT_VERSION = 1
+
+def pdf_filename(invoice_number: str) -> str:
+    return f"invoice_{invoice_number}.pdf"
+
+def document_digest(document: Dict) -> str:
+    """Hash of everything an invoice's PDF shows"""
+    payload = json.dumps([LAYOUT_VERSION, document], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Cache directory -> time.monotonic() of this process's last eviction there
+_last_eviction = {}
+
+class PDFCache:
+    """Content-addressed PDF files: <directory>/<2 hex chars>/<sha256>.pdf
+    
+    A file's mtime is its last use, so eviction drops the least recently
+    used versions first. Eviction only ever deletes cache files; an evicted
+    invoice is simply rendered again on its next request.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+    
+    def path_for(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.pdf"
+    
+    def lookup(self, digest: str) -> Optional[Path]:
+        """The cached file for digest, marked as used, or None"""
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+    
+    def put(self, document: Dict, digest: str) -> str:
+        path = self.path_for(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return write_pdf(document, path)
+    
+    def evict(self, max_age_days: float = PDF_CACHE_MAX_AGE_DAYS, max_mb: float = PDF_CACHE_MAX_MB) -> Dict:
+        """Delete files unused for max_age_days, then the oldest until the cache fits in max_mb"""
+        cutoff = time.time() - max_age_days * 86400
+        files = []
+        for path in self.directory.glob("??/*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        
+        total = sum(size for _, size, _ in files)
+        budget = max_mb * 1024 * 1024
+        removed = freed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= budget:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+            freed += size
+        return {"files": len(files) - removed, "bytes": total, "evicted": removed, "freed_bytes": freed}
+    
+    def evict_if_due(self, interval: float = PDF_CACHE_EVICT_SECONDS) -> Optional[Dict]:
+        """evict() with the configured limits, unless this process already did within interval seconds"""
+        now = time.monotonic()
+        last = _last_eviction.get(self.directory)
+        if last is not None and now - last < interval:
+            return None
+        _last_eviction[self.directory] = now
+        return self.evict()
+
+class InvoiceTemplate:
+    """The parts of the invoice that never change, drawn as a PDF form XObject.
+    
+    The text and path operators are built once on a scratch canvas and kept
+    for the process. draw() defines them as a form XObject the first time it
+    runs on a canvas and then places that form on the page with doForm(), so
+    every page of the document references one copy of the static layer.
+    The operators refer to fonts by the document's internal names (/F1,
+    /F2...), which reportlab assigns in order of first use; draw() registers
+    FONTS in the same order to match.
+    """
+    
+    FONTS = ("Helvetica", "Helvetica-Bold")
+    FORM = "InvoiceStatic"
+    
+    def __init__(self, c=None):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.pdfgen import canvas
+        
+        c = c or canvas.Canvas(BytesIO(), pagesize=letter)
+        self.register_fonts(c)
+        width, height = letter
+        text = c.beginText()
+        
+        # Header
+        text.setFont("Helvetica-Bold", 20)
+        text.setTextOrigin(1*inch, height - 1*inch)
+        text.textOut("INVOICE")
+        
+        # Company info
+        text.setFont("Helvetica", 10)
+        for offset, line in ((1.3, "Toronto HVAC Solutions"), (1.45, "123 Service Road"),
+                             (1.6, "Toronto, ON M1A 1A1"), (1.75, "Phone: (416) 555-0123")):
+            text.setTextOrigin(1*inch, height - offset*inch)
+            text.textOut(line)
+        
+        # Bill To
+        text.setFont("Helvetica-Bold", 12)
+        text.setTextOrigin(1*inch, height - 2.5*inch)
+        text.textOut("Bill To:")
+        
+        # Items table header
+        text.setFont("Helvetica-Bold", 10)
+        for x, label in ((1, "Description"), (4, "Quantity"), (5, "Rate"), (6.5, "Amount")):
+            text.setTextOrigin(x*inch, height - 4*inch)
+            text.textOut(label)
+        
+        # Footer
+        text.setFont("Helvetica", 8)
+        text.setTextOrigin(1*inch, 1*inch)
+        text.textOut("Thank you for your business!")
+        
+        rule = c.beginPath()
+        rule.moveTo(1*inch, height - 4*inch - 20)
+        rule.lineTo(7.5*inch, height - 4*inch - 20)
+        
+        self.text = text
+        self.rule = rule
+    
+    def register_fonts(self, c):
+        for name in self.FONTS:
+            c.setFont(name, 10)
+    
+    def draw(self, c):
+        """Place the static layer on the current page, defining the form on first use"""
+        if not c.hasForm(self.FORM):
+            self.register_fonts(c)
+            c.beginForm(self.FORM)
+            c.drawText(self.text)
+            c.drawPath(self.rule, stroke=1, fill=0)
+            c.endForm()
+        c.doForm(self.FORM)
+
+_template = None
+
+def invoice_template() -> InvoiceTemplate:
+    """This process's static layer, built on first use"""
+    global _template
+    if _template is None:
+        _template = InvoiceTemplate()
+    return _template
+
+def render_pdf(document: Dict, use_template: bool = PDF_TEMPLATE_CACHE) -> bytes:
+    """Render an invoice document to PDF bytes in memory.
+    
+    With use_template the static layout comes from this process's cached
+    InvoiceTemplate; otherwise it is rebuilt for this document.
+    """
+    # reportlab is only loaded by processes that render
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+    
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    
+    # Header, company info, table header and footer
+    if use_template:
+        invoice_template().draw(c)
+    else:
+        InvoiceTemplate(c).draw(c)
+    
+    # Invoice details
+    x_right = width - 1*inch
+    y_top = height - 1*inch
+    
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(x_right - 100, y_top, f"Invoice #{document['invoice_number']}")
+    
+    c.setFont("Helvetica", 10)
+    y = y_top - 20
+    c.drawString(x_right - 100, y, f"Date: {document['invoice_date']}")
+    y -= 15
+    c.drawString(x_right - 100, y, f"Due Date: {document['due_date']}")
+    y -= 15
+    c.drawString(x_right - 100, y, f"Status: {document['status']}")
+    
+    # Bill To
+    customer = document["customer"]
+    y = height - 2.5*inch - 20
+    c.drawString(1*inch, y, customer["name"] if customer else "N/A")
+    y -= 15
+    if customer:
+        if customer["address"]:
+            c.drawString(1*inch, y, customer["address"])
+            y -= 15
+        if customer["city"]:
+            city_line = f"{customer['city']}, {customer['province'] or ''} {customer['postal_code'] or ''}".strip()
+            c.drawString(1*inch, y, city_line)
+    
+    # Items table, below the template's header row and rule
+    y = height - 4*inch - 40
+    
+    # Labor
+    c.drawString(1*inch, y, "Labor")
+    c.drawString(4*inch, y, f"{document['labor_hours']:.2f} hrs")
+    c.drawString(5*inch, y, f"${document['labor_rate']:.2f}")
+    c.drawString(6.5*inch, y, f"${document['labor_cost']:.2f}")
+    y -= 20
+    
+    # Materials
+    if document["materials_cost"] > 0:
+        c.drawString(1*inch, y, "Materials")
+        c.drawString(4*inch, y, "-")
+        c.drawString(5*inch, y, "-")
+        c.drawString(6.5*inch, y, f"${document['materials_cost']:.2f}")
+        y -= 20
+    
+    # Other charges
+    if document["other_charges"] > 0:
+        c.drawString(1*inch, y, "Other Charges")
+        c.drawString(4*inch, y, "-")
+        c.drawString(5*inch, y, "-")
+        c.drawString(6.5*inch, y, f"${document['other_charges']:.2f}")
+        y -= 20
+    
+    # Totals
+    y -= 10
+    c.line(1*inch, y, 7.5*inch, y)
+    y -= 20
+    
+    c.drawString(6*inch, y, "Subtotal:")
+    c.drawString(6.5*inch, y, f"${document['subtotal']:.2f}")
+    y -= 20
+    
+    c.drawString(6*inch, y, f"Tax ({document['tax_rate']*100:.0f}%):")
+    c.drawString(6.5*inch, y, f"${document['tax_amount']:.2f}")
+    y -= 20
+    
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(6*inch, y, "Total:")
+    c.drawString(6.5*inch, y, f"${document['total_amount']:.2f}")
+    
+    c.save()
+    return buffer.getvalue()
+
+def write_pdf(document: Dict, filepath: Path, use_template: bool = PDF_TEMPLATE_CACHE) -> str:
+    """Render an invoice document to filepath atomically; returns the path"""
+    pdf = render_pdf(document, use_template)
+    
+    # Write beside the target and rename, so readers never see a half-written PDF
+    tmp_path = filepath.with_name(f".{filepath.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(pdf)
+        tmp_path.replace(filepath)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return str(filepath)
+
+def render_chunk(jobs: List[Tuple[Dict, str]]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """Render (document, path) pairs; (invoice_id, path, error) per invoice, never raises"""
+    rendered = []
+    for document, filepath in jobs:
+        try:
+            Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+            path = write_pdf(document, Path(filepath))
+            rendered.append((document["invoice_id"], path, None))
+        except Exception as e:
+            rendered.append((document["invoice_id"], None, f"{type(e).__name__}: {e}"))
+    return rendered
 
 class InvoiceGenerator:
     """Generate PDF invoices"""
     
-    def __init__(self):
+    def __init__(self, db: Optional[Session] = None):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
         self.output_dir = Path("invoices")
         self.output_dir.mkdir(exist_ok=True)
+        self.use_cache = PDF_CACHE_ENABLED
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    @property
+    def cache(self) -> PDFCache:
+        return PDFCache(self.output_dir / "cache")
+    
+    def _target(self, document: Dict) -> Tuple[Path, bool]:
+        """Where a document's PDF belongs, and whether an up-to-date file is already there"""
+        if not self.use_cache:
+            return self.output_dir / pdf_filename(document["invoice_number"]), False
+        digest = document_digest(document)
+        cached = self.cache.lookup(digest)
+        return (cached, True) if cached else (self.cache.path_for(digest), False)
     
     def generate_pdf(self, invoice_id: int) -> str:
         """Generate PDF invoice"""
-        db = SessionLocal()
+        db = self.db
         try:
-            invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = db.query(Invoice).options(joinedload(Invoice.customer)).filter(Invoice.id == invoice_id).first()
             if not invoice:
                 return None
             
-            customer = invoice.customer
-            work_order = invoice.work_order
-            
-            # Generate filename
-            filename = f"invoice_{invoice.invoice_number}.pdf"
-            filepath = self.output_dir / filename
-            
-            # Create PDF
-            c = canvas.Canvas(str(filepath), pagesize=letter)
-            width, height = letter
-            
-            # Header
-            c.setFont("Helvetica-Bold", 20)
-            c.drawString(1*inch, height - 1*inch, "INVOICE")
-            
-            # Company info
-            c.setFont("Helvetica", 10)
-            c.drawString(1*inch, height - 1.3*inch, "Toronto HVAC Solutions")
-            c.drawString(1*inch, height - 1.45*inch, "123 Service Road")
-            c.drawString(1*inch, height - 1.6*inch, "Toronto, ON M1A 1A1")
-            c.drawString(1*inch, height - 1.75*inch, "Phone: (416) 555-0123")
-            
-            # Invoice details
-            x_right = width - 1*inch
-            y_top = height - 1*inch
-            
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(x_right - 100, y_top, f"Invoice #{invoice.invoice_number}")
-            
-            c.setFont("Helvetica", 10)
-            y = y_top - 20
-            c.drawString(x_right - 100, y, f"Date: {invoice.invoice_date.strftime('%Y-%m-%d') if invoice.invoice_date else 'N/A'}")
-            y -= 15
-            c.drawString(x_right - 100, y, f"Due Date: {invoice.due_date.strftime('%Y-%m-%d') if invoice.due_date else 'N/A'}")
-            y -= 15
-            c.drawString(x_right - 100, y, f"Status: {invoice.status.upper()}")
-            
-            # Bill To
-            y = height - 2.5*inch
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(1*inch, y, "Bill To:")
-            y -= 20
-            c.setFont("Helvetica", 10)
-            c.drawString(1*inch, y, customer.name if customer else "N/A")
-            y -= 15
-            if customer:
-                if customer.address:
-                    c.drawString(1*inch, y, customer.address)
-                    y -= 15
-                if customer.city:
-                    city_line = f"{customer.city}, {customer.province or ''} {customer.postal_code or ''}".strip()
-                    c.drawString(1*inch, y, city_line)
-            
-            # Items table
-            y = height - 4*inch
-            
-            # Table header
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(1*inch, y, "Description")
-            c.drawString(4*inch, y, "Quantity")
-            c.drawString(5*inch, y, "Rate")
-            c.drawString(6.5*inch, y, "Amount")
-            
-            y -= 20
-            c.setFont("Helvetica", 10)
-            c.line(1*inch, y, 7.5*inch, y)
-            y -= 20
-            
-            # Labor
-            c.drawString(1*inch, y, "Labor")
-            c.drawString(4*inch, y, f"{invoice.labor_hours:.2f} hrs")
-            c.drawString(5*inch, y, f"${invoice.labor_rate:.2f}")
-            c.drawString(6.5*inch, y, f"${invoice.labor_cost:.2f}")
-            y -= 20
-            
-            # Materials
-            if invoice.materials_cost > 0:
-                c.drawString(1*inch, y, "Materials")
-                c.drawString(4*inch, y, "-")
-                c.drawString(5*inch, y, "-")
-                c.drawString(6.5*inch, y, f"${invoice.materials_cost:.2f}")
-                y -= 20
-            
-            # Other charges
-            if invoice.other_charges > 0:
-                c.drawString(1*inch, y, "Other Charges")
-                c.drawString(4*inch, y, "-")
-                c.drawString(5*inch, y, "-")
-                c.drawString(6.5*inch, y, f"${invoice.other_charges:.2f}")
-                y -= 20
-            
-            # Totals
-            y -= 10
-            c.line(1*inch, y, 7.5*inch, y)
-            y -= 20
-            
-            c.drawString(6*inch, y, "Subtotal:")
-            c.drawString(6.5*inch, y, f"${invoice.subtotal:.2f}")
-            y -= 20
-            
-            c.drawString(6*inch, y, f"Tax ({invoice.tax_rate*100:.0f}%):")
-            c.drawString(6.5*inch, y, f"${invoice.tax_amount:.2f}")
-            y -= 20
-            
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(6*inch, y, "Total:")
-            c.drawString(6.5*inch, y, f"${invoice.total_amount:.2f}")
+            document = invoice_document(invoice)
+            target, cached = self._target(document)
+            if not cached:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                write_pdf(document, target)
+                if self.use_cache:
+                    self.cache.evict_if_due()
+            filepath = str(target)
             
-            # Footer
-            y = 1*inch
-            c.setFont("Helvetica", 8)
-            c.drawString(1*inch, y, "Thank you for your business!")
-            
-            c.save()
-            
-            # Update invoice with PDF path
-            invoice.pdf_path = str(filepath)
-            db.commit()
-            
-            return str(filepath)
+            # Update invoice with PDF path, unless it already points at this version
+            if invoice.pdf_path != filepath:
+                invoice.pdf_path = filepath
+                db.commit()
+                invalidate("invoices")
             
+            return filepath
+        
         except Exception as e:
             db.rollback()
             print(f"Error generating invoice: {e}")
             return None
-        finally:
-            db.close()
+    
+    def render_pdf(self, invoice_id: int) -> Optional[bytes]:
+        """PDF bytes for an invoice, rendered in memory; nothing is written or saved"""
+        invoice = self.db.query(Invoice).options(joinedload(Invoice.customer)).filter(Invoice.id == invoice_id).first()
+        if not invoice:
+            return None
+        return render_pdf(invoice_document(invoice))
+    
+    def _documents(self, invoice_ids: Optional[Iterable[int]], chunk_size: int) -> Iterable[List[Tuple[Dict, Optional[str]]]]:
+        """Chunks of (document, saved pdf_path), each chunk read with one eager query"""
+        if invoice_ids is None:
+            ids = [row[0] for row in self.db.query(Invoice.id).order_by(Invoice.id)]
+        else:
+            ids = list(invoice_ids)
+        
+        for start in range(0, len(ids), chunk_size):
+            invoices = self.db.query(Invoice).options(joinedload(Invoice.customer)).filter(
+                Invoice.id.in_(ids[start:start + chunk_size])
+            ).order_by(Invoice.id).all()
+            yield [(invoice_document(invoice), invoice.pdf_path) for invoice in invoices]
+            # Nothing is needed after rendering; keep the identity map from growing with the batch
+            self.db.expunge_all()
+    
+    def generate_pdfs(self, invoice_ids: Optional[Iterable[int]] = None, workers: int = PDF_WORKERS,
+                      chunk_size: int = PDF_CHUNK_SIZE, max_pending: int = PDF_MAX_PENDING_CHUNKS,
+                      max_age_days: float = PDF_CACHE_MAX_AGE_DAYS, max_mb: float = PDF_CACHE_MAX_MB) -> Dict:
+        """Render many invoices (all of them when invoice_ids is None) and record their paths.
+        
+        Invoices whose cached PDF is current are not re-rendered. Returns a
+        report with counts, elapsed seconds, throughput and the (invoice_id,
+        error) of every invoice that failed to render. Changed paths are saved
+        in one bulk UPDATE; failed invoices keep their old path. The cache is
+        then evicted down to max_age_days / max_mb (report["cache"]).
+        """
+        started = time.perf_counter()
+        results = []
+        saved_paths = {}
+        cache_hits = []
+        
+        def jobs():
+            """Render jobs per chunk; cache hits go straight to results"""
+            for chunk in self._documents(invoice_ids, chunk_size):
+                to_render = []
+                for document, pdf_path in chunk:
+                    saved_paths[document["invoice_id"]] = pdf_path
+                    target, cached = self._target(document)
+                    if cached:
+                        cache_hits.append(document["invoice_id"])
+                        results.append((document["invoice_id"], str(target), None))
+                    else:
+                        to_render.append((document, str(target)))
+                if to_render:
+                    yield to_render
+        
+        if workers <= 1:
+            for chunk in jobs():
+                results.extend(render_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in jobs():
+                    pending.append(pool.submit(render_chunk, chunk))
+                    if len(pending) >= max(max_pending, 1):
+                        results.extend(pending.popleft().result())
+                while pending:
+                    results.extend(pending.popleft().result())
+        
+        changed = [
+            {"id": invoice_id, "pdf_path": path}
+            for invoice_id, path, error in results if path and saved_paths.get(invoice_id) != path
+        ]
+        if changed:
+            self.db.execute(update(Invoice), changed)
+            self.db.commit()
+            invalidate("invoices")
+        
+        failed = [(invoice_id, error) for invoice_id, path, error in results if error]
+        rendered = len(results) - len(failed) - len(cache_hits)
+        elapsed = time.perf_counter() - started
+        evicted = self.cache.evict(max_age_days, max_mb) if self.use_cache else None
+        return {
+            "invoices": len(results),
+            "rendered": rendered,
+            "cached": len(cache_hits),
+            "updated": len(changed),
+            "failed": failed,
+            "seconds": round(elapsed, 3),
+            "invoices_per_second": round((len(results) - len(failed)) / elapsed, 1) if elapsed else None,
+            "cache": evicted
+        }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render invoice PDFs in bulk")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--all", action="store_true", help="render every invoice")
+    target.add_argument("--ids", type=int, nargs="+", help="render these invoice ids")
+    target.add_argument("--evict", action="store_true", help="only evict old cached PDFs")
+    parser.add_argument("--output-dir", default="invoices")
+    parser.add_argument("--workers", type=int, default=PDF_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=PDF_CHUNK_SIZE)
+    parser.add_argument("--no-cache", action="store_true", help="re-render every invoice to invoice_<number>.pdf")
+    parser.add_argument("--max-age-days", type=float, default=PDF_CACHE_MAX_AGE_DAYS)
+    parser.add_argument("--max-mb", type=float, default=PDF_CACHE_MAX_MB)
+    args = parser.parse_args(argv)
+    
+    generator = InvoiceGenerator()
+    generator.output_dir = Path(args.output_dir)
+    generator.output_dir.mkdir(parents=True, exist_ok=True)
+    generator.use_cache = generator.use_cache and not args.no_cache
+    report = None
+    evicted = None
+    try:
+        if args.evict:
+            evicted = generator.cache.evict(args.max_age_days, args.max_mb)
+        else:
+            report = generator.generate_pdfs(
+                None if args.all else args.ids, workers=args.workers, chunk_size=args.chunk_size,
+                max_age_days=args.max_age_days, max_mb=args.max_mb
+            )
+            evicted = report["cache"]
+    finally:
+        generator.close()
+    
+    if report:
+        print(f"Rendered {report['rendered']} of {report['invoices']} invoices ({report['cached']} unchanged, "
+              f"served from cache) in {report['seconds']}s ({report['invoices_per_second']} invoices/s)")
+        for invoice_id, error in report["failed"]:
+            print(f"    invoice {invoice_id}: {error}")
+    
+    if evicted:
+        print(f"PDF cache: {evicted['files']} files, {evicted['bytes'] / 1e6:.1f} MB; "
+              f"evicted {evicted['evicted']} ({evicted['freed_bytes'] / 1e6:.1f} MB)")
+    return 1 if report and report["failed"] else 0
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Learned job-type classifiers for booking intake.
+
+Two backends share one interface, predict(texts) -> [(job_type, confidence)]:
+
+- "tfidf": word/bigram TF-IDF + logistic regression trained from historical
+  WorkOrder.description -> job_type (python -m services.job_classifier train)
+- "transformer": a fine-tuned Hugging Face sequence classifier saved under
+  MODEL_DIR/job_classifier_transformer (labels from its config.id2label)
+
+scikit-learn, transformers and torch are imported only when a model is
+loaded or trained, and each process loads its model once via
+get_job_classifier(). NLPBookingService falls back to keywords when no model
+is trained or a prediction's confidence is below JOB_CLASSIFIER_MIN_CONFIDENCE.
+"""
+import argparse
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import MODEL_DIR, JOB_CLASSIFIER, JOB_CLASSIFIER_BATCH_SIZE
+from database.session import SessionLocal
+from database.models import WorkOrder
+
+MODEL_PATHS = {
+    "tfidf": MODEL_DIR / "job_classifier_tfidf.joblib",
+    "transformer": MODEL_DIR / "job_classifier_transformer"
+}
+
+class TfidfJobClassifier:
+    """TF-IDF features with a multinomial logistic regression"""
+    
+    kind = "tfidf"
+    
+    def __init__(self, pipeline=None):
+        self.pipeline = pipeline
+    
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> "TfidfJobClassifier":
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+        
+        self.pipeline = make_pipeline(
+            TfidfVectorizer(lowercase=True, ngram_range=(1, 2), min_df=2, sublinear_tf=True),
+            LogisticRegression(max_iter=1000, C=4.0)
+        )
+        self.pipeline.fit(list(texts), list(labels))
+        return self
+    
+    def predict(self, texts: Sequence[str], batch_size: int = JOB_CLASSIFIER_BATCH_SIZE) -> List[Tuple[str, float]]:
+        classes = self.pipeline.classes_
+        predictions = []
+        for start in range(0, len(texts), batch_size):
+            probabilities = self.pipeline.predict_proba(list(texts[start:start + batch_size]))
+            best = probabilities.argmax(axis=1)
+            predictions.extend((str(classes[i]), float(row[i])) for row, i in zip(probabilities, best))
+        return predictions
+    
+    def save(self, path: Path = MODEL_PATHS["tfidf"]):
+        import joblib
+        
+        # Write then rename so a process loading the model never sees a partial file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        joblib.dump(self.pipeline, tmp_path)
+        tmp_path.replace(path)
+    
+    @classmethod
+    def load(cls, path: Path = MODEL_PATHS["tfidf"]) -> "TfidfJobClassifier":
+        import joblib
+        
+        return cls(joblib.load(path))
+
+class TransformerJobClassifier:
+    """Fine-tuned transformer sequence classifier, run on CPU without gradients"""
+    
+    kind = "transformer"
+    
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+    
+    def predict(self, texts: Sequence[str], batch_size: int = JOB_CLASSIFIER_BATCH_SIZE) -> List[Tuple[str, float]]:
+        import torch
+        
+        labels = self.model.config.id2label
+        predictions = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                inputs = self.tokenizer(
+                    list(texts[start:start + batch_size]),
+                    padding=True, truncation=True, max_length=128, return_tensors="pt"
+                )
+                probabilities = self.model(**inputs).logits.softmax(dim=-1)
+                confidence, best = probabilities.max(dim=-1)
+                predictions.extend((labels[int(i)], float(c)) for c, i in zip(confidence, best))
+        return predictions
+    
+    @classmethod
+    def load(cls, path: Path = MODEL_PATHS["transformer"]) -> "TransformerJobClassifier":
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        
+        model = AutoModelForSequenceClassification.from_pretrained(path)
+        model.eval()
+        return cls(AutoTokenizer.from_pretrained(path), model)
+
+CLASSIFIERS = {"tfidf": TfidfJobClassifier, "transformer": TransformerJobClassifier}
+
+_classifiers: Dict[str, Optional[object]] = {}
+_classifiers_lock = threading.Lock()
+
+def get_job_classifier(kind: str = JOB_CLASSIFIER):
+    """This process's classifier of `kind`, loaded on first use; None if disabled or untrained"""
+    if kind not in CLASSIFIERS:
+        return None
+    if kind not in _classifiers:
+        with _classifiers_lock:
+            if kind not in _classifiers:
+                path = MODEL_PATHS[kind]
+                _classifiers[kind] = CLASSIFIERS[kind].load(path) if path.exists() else None
+    return _classifiers[kind]
+
+def reset_job_classifier():
+    """Forget loaded models so the next get_job_classifier() reloads from disk"""
+    with _classifiers_lock:
+        _classifiers.clear()
+
+def training_data(db: Session) -> Tuple[List[str], List[str]]:
+    rows = db.query(WorkOrder.description, WorkOrder.job_type).filter(
+        WorkOrder.description.isnot(None),
+        WorkOrder.description != ""
+    ).yield_per(10000)
+    texts, labels = [], []
+    for description, job_type in rows:
+        texts.append(description)
+        labels.append(job_type)
+    return texts, labels
+
+def train_from_database(db: Optional[Session] = None, holdout: float = 0.2, seed: int = 0) -> Dict:
+    """Fit the TF-IDF classifier on historical work orders, report holdout accuracy and save it"""
+    from sklearn.model_selection import train_test_split
+    
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        texts, labels = training_data(db)
+    finally:
+        if owns_session:
+            db.close()
+    
+    if len(set(labels)) < 2:
+        raise ValueError("Need work orders with at least two job types to train a classifier")
+    
+    report = {"examples": len(texts), "job_types": len(set(labels))}
+    if holdout and len(texts) >= 50:
+        train_texts, test_texts, train_labels, test_labels = train_test_split(
+            texts, labels, test_size=holdout, random_state=seed
+        )
+        evaluation = TfidfJobClassifier().fit(train_texts, train_labels)
+        predicted = [job_type for job_type, _ in evaluation.predict(test_texts)]
+        report["holdout_accuracy"] = round(sum(p == t for p, t in zip(predicted, test_labels)) / len(test_labels), 4)
+    
+    TfidfJobClassifier().fit(texts, labels).save()
+    reset_job_classifier()
+    report["path"] = str(MODEL_PATHS["tfidf"])
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train or try the learned job-type classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="fit the TF-IDF model on WorkOrder descriptions")
+    train.add_argument("--holdout", type=float, default=0.2)
+    predict = commands.add_parser("predict", help="classify the given messages")
+    predict.add_argument("texts", nargs="+")
+    predict.add_argument("--kind", choices=sorted(CLASSIFIERS), default=JOB_CLASSIFIER)
+    args = parser.parse_args(argv)
+    
+    if args.command == "train":
+        for key, value in train_from_database(holdout=args.holdout).items():
+            print(f"{key:<18} {value}")
+        return 0
+    
+    classifier = get_job_classifier(args.kind)
+    if classifier is None:
+        print(f"No {args.kind} model at {MODEL_PATHS[args.kind]}")
+        return 1
+    for text, (job_type, confidence) in zip(args.texts, classifier.predict(args.texts)):
+        print(f"{confidence:.2f}  {job_type:<24} {text}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,85 @@
 """NLP service for job classification from customer requests"""
 import re
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, List, Sequence, Set, Tuple
+
+from config import JOB_CLASSIFIER_MIN_CONFIDENCE
+
+# Plural/tense endings a keyword may carry and still count ("installed", "breakers")
+KEYWORD_SUFFIX = r"(?:s|es|d|ed|ing)?"
+
+def _trie_pattern(words) -> str:
+    """Regex alternation factored by common prefix, so each position is tested once per character"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def render(node) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        optional = "" in node
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not optional else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if optional else body
+    
+    return render(trie)
+
+class KeywordMatcher:
+    """Keyword tables compiled into one word-bounded trie regex.
+    
+    Matching runs inside a lookahead so a match can start at every word, and
+    the greedy trie prefers the longest phrase; a phrase also credits the
+    shorter keywords inside it ("electrical repair" -> "electrical"). That
+    keeps the scoring of the old per-keyword substring checks without their
+    false hits ("ac" inside "vacation" or "furnace"). Each keyword maps to the
+    (table, category rank) pairs it scores, so scoring touches only the
+    keywords actually found.
+    """
+    
+    def __init__(self, tables: Tuple[Tuple[Tuple[str, Tuple[str, ...]], ...], ...]):
+        keywords = {keyword for table in tables for _, words in table for keyword in words}
+        self.pattern = re.compile(r"\b(?=(" + _trie_pattern(keywords) + ")" + KEYWORD_SUFFIX + r"\b)")
+        self.implied = {
+            keyword: frozenset(other for other in keywords if re.search(r"\b" + re.escape(other) + r"\b", keyword))
+            for keyword in keywords
+        }
+        self.categories = [[category for category, _ in table] for table in tables]
+        self.owners = {}
+        for table_index, table in enumerate(tables):
+            for rank, (_, words) in enumerate(table):
+                for keyword in set(words):
+                    self.owners.setdefault(keyword, []).append((table_index, rank))
+    
+    def scan(self, text_lower: str) -> Set[str]:
+        """Every keyword present in already-lowercased text, in a single pass"""
+        found = set()
+        for match in self.pattern.finditer(text_lower):
+            found |= self.implied[match.group(1)]
+        return found
+    
+    def scores(self, found: Set[str]) -> List[Dict[int, int]]:
+        """{category rank: distinct keywords found} for each table"""
+        scores = [{} for _ in self.categories]
+        for keyword in found:
+            for table_index, rank in self.owners[keyword]:
+                table_scores = scores[table_index]
+                table_scores[rank] = table_scores.get(rank, 0) + 1
+        return scores
+
+@lru_cache(maxsize=8)
+def compile_keywords(tables: Tuple[Tuple[Tuple[str, Tuple[str, ...]], ...], ...]) -> KeywordMatcher:
+    return KeywordMatcher(tables)
+
+# Canadian postal code (A1A 1A1), matched case-insensitively instead of upper-casing the text
+POSTAL_CODE = re.compile(r'\b[A-Z]\d[A-Z]\s?\d[A-Z]\d\b', re.IGNORECASE)
 
 class NLPBookingService:
     """Simple NLP-based booking intake and job classification"""
     
-    def __init__(self):
+    def __init__(self, classifier=None, use_model: bool = True):
         # Job type keywords for classification
         self.job_keywords = {
             "HVAC Repair": ["hvac", "heating", "cooling", "air conditioning", "ac", "furnace", "air conditioner"],
@@ -25,42 +99,53 @@ class NLPBookingService:
             "medium": ["next week", "when available", "scheduled"],
             "low": ["whenever", "flexible", "no rush"]
         }
+        
+        # The dicts above stay the source of truth; the matcher is compiled
+        # once per distinct set of tables and shared across instances
+        self.matcher = compile_keywords(tuple(
+            tuple((category, tuple(keywords)) for category, keywords in table.items())
+            for table in (self.job_keywords, self.urgency_keywords)
+        ))
+        
+        # Learned job-type model (see services.job_classifier), loaded once per
+        # process; None until one has been trained
+        if classifier is None and use_model:
+            from services.job_classifier import get_job_classifier
+            classifier = get_job_classifier()
+        self.classifier = classifier
+        self.min_confidence = JOB_CLASSIFIER_MIN_CONFIDENCE
+    
+    def _classify(self, text_lower: str) -> Tuple[str, str]:
+        """(job_type, priority) from a single scan of the text"""
+        job_scores, urgency_scores = self.matcher.scores(self.matcher.scan(text_lower))
+        job_types, priorities = self.matcher.categories
+        
+        # Highest score wins; ties go to the category listed first
+        job_type = job_types[max(job_scores, key=lambda rank: (job_scores[rank], -rank))] if job_scores else "General Repair"
+        # First urgency level (most urgent) with any keyword present
+        priority = priorities[min(urgency_scores)] if urgency_scores else "medium"
+        return job_type, priority
     
     def classify_job_type(self, text: str) -> str:
         """Classify job type from customer request text"""
-        text_lower = text.lower()
-        scores = {}
-        
-        for job_type, keywords in self.job_keywords.items():
-            score = sum([1 for keyword in keywords if keyword in text_lower])
-            if score > 0:
-                scores[job_type] = score
-        
-        if scores:
-            return max(scores, key=scores.get)
-        return "General Repair"
+        return self._classify(text.lower())[0]
     
     def extract_priority(self, text: str) -> str:
         """Extract urgency/priority from text"""
-        text_lower = text.lower()
-        
-        for priority, keywords in self.urgency_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                return priority
-        
-        return "medium"
+        return self._classify(text.lower())[1]
     
-    def extract_location(self, text: str) -> Dict:
+    def extract_location(self, text: str, text_lower: str = None) -> Dict:
         """Extract location information (simplified)"""
         # Look for postal codes (Canadian format: A1A 1A1)
-        postal_match = re.search(r'\b[A-Z]\d[A-Z]\s?\d[A-Z]\d\b', text.upper())
-        postal_code = postal_match.group(0).replace(" ", "") if postal_match else None
+        postal_match = POSTAL_CODE.search(text)
+        postal_code = postal_match.group(0).replace(" ", "").upper() if postal_match else None
         
         # Look for Toronto area mentions
+        text_lower = text_lower or text.lower()
         location = None
-        if "toronto" in text.lower():
+        if "toronto" in text_lower:
             location = "Toronto, ON"
-        elif "downtown" in text.lower():
+        elif "downtown" in text_lower:
             location = "Downtown Toronto, ON"
         
         return {
@@ -70,15 +155,33 @@ class NLPBookingService:
     
     def process_booking_request(self, text: str) -> Dict:
         """Process a customer booking request and extract structured data"""
-        job_type = self.classify_job_type(text)
-        priority = self.extract_priority(text)
-        location_info = self.extract_location(text)
+        return self.process_booking_requests([text])[0]
+    
+    def process_booking_requests(self, texts: Sequence[str]) -> List[Dict]:
+        """Batch form of process_booking_request; the job-type model scores all texts together"""
+        predictions = self.classifier.predict(texts) if self.classifier is not None and texts else None
+        results = []
         
-        return {
-            "job_type": job_type,
-            "priority": priority,
-            "location": location_info.get("location"),
-            "postal_code": location_info.get("postal_code"),
-            "original_text": text
-        }
+        for i, text in enumerate(texts):
+            text_lower = text.lower()
+            job_type, priority = self._classify(text_lower)
+            location_info = self.extract_location(text, text_lower)
+            source, confidence = "keywords", None
+            
+            if predictions is not None:
+                predicted_type, confidence = predictions[i]
+                if confidence >= self.min_confidence:
+                    job_type, source = predicted_type, "model"
+            
+            results.append({
+                "job_type": job_type,
+                "priority": priority,
+                "location": location_info.get("location"),
+                "postal_code": location_info.get("postal_code"),
+                "original_text": text,
+                "job_type_source": source,
+                "job_type_confidence": round(confidence, 3) if confidence is not None else None
+            })
+        
+        return results
 
@@ -0,0 +1,232 @@
+"""Incrementally maintained daily rollups for analytics trends
+
+Reads only ever query the rollups. They are brought up to date by a
+background thread in each API and dashboard process (every
+ROLLUP_REFRESH_SECONDS), after demo data is seeded, or from cron:
+
+    python -m services.rollups
+    python -m services.rollups --full
+
+Changes are found through work order and invoice updated_at and job part
+created_at, so rows written with timestamps older than the last refresh
+(bulk imports of history) are only seen by a --full refresh. The load
+generator drops the watermarks, which makes the next refresh a full one.
+"""
+import argparse
+import sys
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import func, case, delete, insert, select
+from sqlalchemy.orm import Session
+
+from config import ROLLUP_REFRESH_SECONDS
+from database.session import SessionLocal
+from database.models import (
+    WorkOrder, Invoice, JobPart,
+    DailyJobRollup, DailyRevenueRollup, DailyPartsRollup, RollupWatermark
+)
+
+# Days re-aggregated per statement, to stay well under SQL parameter limits
+DAY_CHUNK = 500
+
+def _as_date(value) -> date:
+    """func.date() returns strings on SQLite and dates on PostgreSQL"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+class RollupService:
+    """Daily job, revenue and parts rollups refreshed from a watermark.
+    
+    Each refresh finds the days touched by rows created or updated since the
+    previous refresh, deletes those days from the rollup and re-aggregates
+    them with INSERT ... SELECT, so the cost is proportional to the changed
+    days rather than the size of the raw tables.
+    """
+    
+    def __init__(self, db: Optional[Session] = None):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    def _watermark(self, name: str) -> Optional[datetime]:
+        row = self.db.get(RollupWatermark, name)
+        return row.refreshed_at if row else None
+    
+    def _set_watermark(self, name: str, refreshed_at: datetime):
+        row = self.db.get(RollupWatermark, name)
+        if row is None:
+            self.db.add(RollupWatermark(name=name, refreshed_at=refreshed_at))
+        else:
+            row.refreshed_at = refreshed_at
+    
+    def _touched_days(self, day_column, changed_filter) -> Set[date]:
+        query = self.db.query(func.date(day_column)).filter(day_column.isnot(None))
+        if changed_filter is not None:
+            query = query.filter(changed_filter)
+        return {_as_date(d) for (d,) in query.distinct()}
+    
+    def _rebuild_days(self, rollup, day_column, days: Set[date], select_columns, insert_columns,
+                      source_filter=None, group_by=()):
+        """Replace the rollup rows for days with freshly aggregated ones"""
+        ordered = sorted(days)
+        for i in range(0, len(ordered), DAY_CHUNK):
+            chunk = ordered[i:i + DAY_CHUNK]
+            self.db.execute(delete(rollup).where(rollup.day.in_(chunk)))
+            
+            day = func.date(day_column)
+            stmt = select(day, *select_columns).where(day.in_(chunk))
+            if source_filter is not None:
+                stmt = stmt.where(source_filter)
+            stmt = stmt.group_by(day, *group_by)
+            self.db.execute(insert(rollup).from_select(["day"] + insert_columns, stmt))
+    
+    def refresh_jobs(self, since: Optional[datetime]):
+        changed = WorkOrder.updated_at > since if since else None
+        days = self._touched_days(WorkOrder.scheduled_date, changed)
+        self._rebuild_days(
+            DailyJobRollup, WorkOrder.scheduled_date, days,
+            [WorkOrder.assigned_technician_id, WorkOrder.job_type,
+             func.count(WorkOrder.id), func.coalesce(func.sum(WorkOrder.actual_duration), 0.0)],
+            ["technician_id", "job_type", "jobs_completed", "actual_hours"],
+            source_filter=WorkOrder.status == "completed",
+            group_by=(WorkOrder.assigned_technician_id, WorkOrder.job_type)
+        )
+        return len(days)
+    
+    def refresh_revenue(self, since: Optional[datetime]):
+        changed = Invoice.updated_at > since if since else None
+        days = self._touched_days(Invoice.invoice_date, changed)
+        is_paid = Invoice.status == "paid"
+        self._rebuild_days(
+            DailyRevenueRollup, Invoice.invoice_date, days,
+            [func.count(Invoice.id),
+             func.coalesce(func.sum(Invoice.total_amount), 0.0),
+             func.count(case((is_paid, Invoice.id))),
+             func.coalesce(func.sum(case((is_paid, Invoice.total_amount), else_=0.0)), 0.0)],
+            ["invoices_billed", "revenue_billed", "invoices_paid", "revenue_paid"]
+        )
+        return len(days)
+    
+    def refresh_parts(self, since: Optional[datetime]):
+        changed = JobPart.created_at > since if since else None
+        days = self._touched_days(JobPart.created_at, changed)
+        self._rebuild_days(
+            DailyPartsRollup, JobPart.created_at, days,
+            [func.coalesce(func.sum(JobPart.quantity_used), 0),
+             func.coalesce(func.sum(JobPart.total_cost), 0.0)],
+            ["quantity_used", "parts_cost"]
+        )
+        return len(days)
+    
+    def refresh(self, full: bool = False) -> Dict[str, int]:
+        """Bring all rollups up to date; returns the number of days rebuilt per rollup"""
+        refreshers = {
+            "jobs": self.refresh_jobs,
+            "revenue": self.refresh_revenue,
+            "parts": self.refresh_parts
+        }
+        rebuilt = {}
+        try:
+            # Refreshers in other processes wait here rather than rebuild the same days at once
+            self.db.execute(select(RollupWatermark.name).with_for_update()).all()
+            for name, refresh in refreshers.items():
+                # Timestamps are written with utcnow; take the mark before reading
+                started = datetime.utcnow()
+                rebuilt[name] = refresh(None if full else self._watermark(name))
+                self._set_watermark(name, started)
+            self.db.commit()
+            return rebuilt
+        except Exception:
+            self.db.rollback()
+            raise
+    
+    def job_completion_trends(self, days: int = 30) -> List[Dict]:
+        """Completed jobs per day for the last `days` days, zero-filled"""
+        start = datetime.now().date() - timedelta(days=days - 1)
+        rows = self.db.query(DailyJobRollup.day, func.sum(DailyJobRollup.jobs_completed)).filter(
+            DailyJobRollup.day >= start
+        ).group_by(DailyJobRollup.day).all()
+        counts = {_as_date(day): total for day, total in rows}
+        
+        return [
+            {
+                "date": (start + timedelta(days=i)).strftime("%Y-%m-%d"),
+                "completed_jobs": int(counts.get(start + timedelta(days=i), 0))
+            }
+            for i in range(days)
+        ]
+    
+    def monthly_revenue(self) -> List[Dict]:
+        """Paid invoice totals per invoice month"""
+        rows = self.db.query(DailyRevenueRollup.day, DailyRevenueRollup.revenue_paid).order_by(
+            DailyRevenueRollup.day
+        ).all()
+        months = {}
+        for day, revenue in rows:
+            key = _as_date(day).strftime("%Y-%m")
+            months[key] = months.get(key, 0.0) + (revenue or 0.0)
+        return [{"Month": month, "Revenue": revenue} for month, revenue in months.items()]
+    
+    def daily_parts_cost(self, start: date, end: date) -> List[Dict]:
+        rows = self.db.query(DailyPartsRollup).filter(
+            DailyPartsRollup.day >= start,
+            DailyPartsRollup.day <= end
+        ).order_by(DailyPartsRollup.day).all()
+        return [
+            {"date": row.day.strftime("%Y-%m-%d"), "quantity_used": row.quantity_used, "parts_cost": row.parts_cost}
+            for row in rows
+        ]
+
+_refresher = None
+_refresher_stop = threading.Event()
+
+def _refresh_loop(interval: float):
+    while not _refresher_stop.is_set():
+        service = RollupService()
+        try:
+            service.refresh()
+        except Exception as error:
+            # Keep the thread alive; the next tick picks up from the same watermark
+            print(f"Rollup refresh failed: {error}", file=sys.stderr)
+        finally:
+            service.close()
+        _refresher_stop.wait(interval)
+
+def start_background_refresh(interval: float = ROLLUP_REFRESH_SECONDS) -> bool:
+    """Refresh the rollups now and then every `interval` seconds in a daemon thread, once per process"""
+    global _refresher
+    if interval <= 0 or (_refresher is not None and _refresher.is_alive()):
+        return False
+    _refresher_stop.clear()
+    _refresher = threading.Thread(target=_refresh_loop, args=(interval,), name="rollup-refresh", daemon=True)
+    _refresher.start()
+    return True
+
+def stop_background_refresh():
+    _refresher_stop.set()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bring the daily analytics rollups up to date")
+    parser.add_argument("--full", action="store_true", help="rebuild every day instead of those changed since the last refresh")
+    args = parser.parse_args(argv)
+    
+    service = RollupService()
+    try:
+        rebuilt = service.refresh(full=args.full)
+    finally:
+        service.close()
+    
+    for name, days in rebuilt.items():
+        print(f"{name:<10} {days} days rebuilt")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,268 @@
 """Scheduling and routing optimization service"""
-from ortools.constraint_solver import routing_enums_pb2
-from ortools.constraint_solver import pywrapcp
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Sequence, Tuple
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, time
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+import atexit
 import math
+import os
+import threading
+import numpy as np
+from sqlalchemy.orm import Session
 
+from config import (
+    VRP_TIME_LIMIT_SECONDS, VRP_FIRST_SOLUTION_STRATEGY, VRP_LOCAL_SEARCH_METAHEURISTIC,
+    SHIFT_START_HOUR, SHIFT_LENGTH_HOURS, AVERAGE_TRAVEL_SPEED_KMH, DISTANCE_MATRIX_TILE_SIZE,
+    TRAVEL_CACHE_ENABLED, TRAVEL_CACHE_PATH, TRAVEL_CACHE_MAX_LOCATIONS, TRAVEL_CACHE_PRECISION,
+    VRP_CANDIDATE_TECHNICIANS, SPATIAL_INDEX_CELL_KM, VRP_PARTITION_JOBS, VRP_PARTITION_WORKERS,
+    INCREMENTAL_SEARCH_MS
+)
 from database.session import SessionLocal
-from database.models import WorkOrder, Technician
+from database.models import WorkOrder, Technician, Timesheet
+from services.inventory import InventoryService
+from utils.cache import invalidate
+from utils.geo import haversine_matrix, haversine_cross, kmeans_regions, MISSING_DISTANCE_KM, SpatialIndex
+
+# Cost (in distance units) of leaving a job unassigned, scaled by priority
+DROP_PENALTY = 100000
+PRIORITY_WEIGHTS = {"low": 1, "medium": 2, "high": 4, "urgent": 10}
+
+# Single-job changes reoptimize_job accepts
+REOPTIMIZE_ACTIONS = ("insert", "remove", "cancel")
+
+class TravelMatrixCache:
+    """Persistent, incrementally grown distance matrix keyed by rounded coordinates.
+    
+    Each known location owns one row/column of a square int32 matrix. When a
+    request includes new locations only their rows are computed; everything
+    else is served from memory. Least-recently-used locations are evicted once
+    max_locations is exceeded. A single request with more locations than
+    that is still served in full: the matrix grows for that call and is
+    trimmed back to max_locations before it returns.
+    
+    New locations only mark the cache dirty; flush() writes the .npz file
+    outside the lookup lock, so a save never blocks other callers. The
+    scheduler flushes after each optimization, and the process at exit.
+    """
+    
+    def __init__(self, path: Optional[Path] = TRAVEL_CACHE_PATH,
+                 max_locations: int = TRAVEL_CACHE_MAX_LOCATIONS,
+                 precision: int = TRAVEL_CACHE_PRECISION):
+        self.path = Path(path) if path else None
+        self.max_locations = max_locations
+        self.precision = precision
+        self.index = OrderedDict()  # location key -> row, in LRU order
+        self.coords = np.zeros((0, 2), dtype=np.float64)
+        self.matrix = np.zeros((0, 0), dtype=np.int32)
+        self.hits = 0
+        self.misses = 0
+        self.pairs_computed = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.load()
+    
+    def location_key(self, lat, lng) -> Optional[Tuple[float, float]]:
+        """Round coordinates to the cache precision (None if missing)"""
+        if not lat or not lng:
+            return None
+        return (round(lat, self.precision), round(lng, self.precision))
+    
+    def get_matrix(self, lats: Sequence, lngs: Sequence) -> np.ndarray:
+        """Return the int32 distance matrix (km * 100) for the given locations"""
+        keys = [self.location_key(lat, lng) for lat, lng in zip(lats, lngs)]
+        
+        with self._lock:
+            new_keys = []
+            for key in dict.fromkeys(keys):
+                if key is None:
+                    continue
+                if key in self.index:
+                    self.hits += 1
+                    self.index.move_to_end(key)
+                else:
+                    self.misses += 1
+                    new_keys.append(key)
+            
+            if new_keys:
+                self._evict(len(self.index) + len(new_keys) - self.max_locations, protect=set(keys))
+                self._add(new_keys)
+                self.dirty = True
+            
+            rows = np.array([self.index[k] if k is not None else 0 for k in keys], dtype=np.intp)
+            result = self.matrix[np.ix_(rows, rows)] if len(self.index) else np.zeros((len(keys),) * 2, dtype=np.int32)
+            # A request larger than the cap was served from an oversized matrix; trim it back
+            self._evict(len(self.index) - self.max_locations, protect=set())
+        
+        missing = np.array([k is None for k in keys], dtype=bool)
+        if missing.any():
+            sentinel = int(MISSING_DISTANCE_KM * 100)
+            result[missing, :] = sentinel
+            result[:, missing] = sentinel
+            np.fill_diagonal(result, 0)
+        
+        return np.ascontiguousarray(result)
+    
+    def _add(self, new_keys: List[Tuple[float, float]]):
+        """Compute rows only for locations not yet in the matrix.
+        
+        Like _evict, this replaces self.matrix and self.coords rather than
+        writing into them, which is what lets save() write a snapshot unlocked.
+        """
+        size = len(self.index)
+        new_coords = np.array(new_keys, dtype=np.float64)
+        coords = np.vstack([self.coords[:size], new_coords])
+        
+        matrix = np.zeros((len(coords), len(coords)), dtype=np.int32)
+        matrix[:size, :size] = self.matrix[:size, :size]
+        new_rows = haversine_cross(new_coords[:, 0], new_coords[:, 1], coords[:, 0], coords[:, 1])
+        matrix[size:, :] = new_rows
+        matrix[:, size:] = new_rows.T
+        np.fill_diagonal(matrix, 0)
+        
+        for offset, key in enumerate(new_keys):
+            self.index[key] = size + offset
+        self.coords = coords
+        self.matrix = matrix
+        self.pairs_computed += new_rows.size
+    
+    def _evict(self, count: int, protect: set):
+        """Drop the least-recently-used locations, compacting the matrix"""
+        if count <= 0:
+            return
+        
+        evicted = []
+        for key in self.index:
+            if len(evicted) >= count:
+                break
+            if key not in protect:
+                evicted.append(key)
+        for key in evicted:
+            del self.index[key]
+        
+        keep = np.array(list(self.index.values()), dtype=np.intp)
+        self.coords = self.coords[keep]
+        self.matrix = self.matrix[np.ix_(keep, keep)]
+        for row, key in enumerate(self.index):
+            self.index[key] = row
+    
+    def load(self):
+        """Load a previously saved matrix, ignoring missing or unreadable files"""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with np.load(self.path) as data:
+                coords = data["coords"]
+                matrix = data["matrix"]
+        except (OSError, KeyError, ValueError):
+            return
+        
+        self.coords = coords
+        self.matrix = matrix
+        self.index = OrderedDict(
+            (self.location_key(lat, lng), row) for row, (lat, lng) in enumerate(coords)
+        )
+    
+    def save(self, only_if_dirty: bool = False):
+        """Persist the matrix in LRU order (oldest first) via an atomic rename.
+        
+        Only taking the snapshot holds the lookup lock; the write runs outside
+        it. Concurrent saves queue on their own lock.
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if only_if_dirty and not self.dirty:
+                    return
+                coords, matrix = self.coords, self.matrix
+                order = np.array(list(self.index.values()), dtype=np.intp)
+                self.dirty = False
+            try:
+                tmp_path = self.path.with_suffix(".tmp")
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, coords=coords[order], matrix=matrix[np.ix_(order, order)])
+                os.replace(tmp_path, self.path)
+            except Exception:
+                self.dirty = True
+                raise
+    
+    def flush(self):
+        """Save if locations were added since the last save"""
+        self.save(only_if_dirty=True)
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters (per location row) for monitoring cache savings"""
+        lookups = self.hits + self.misses
+        return {
+            "locations": len(self.index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "pairs_computed": self.pairs_computed
+        }
+
+_travel_cache = None
+_technician_indexes = {}
+_route_plans = {}  # date -> {tech_id: [job ids in visit order]} from the latest optimization
+_state_lock = threading.Lock()  # guards the two dicts above and syncs of the indexes in them
+
+def get_travel_cache() -> TravelMatrixCache:
+    """Process-wide travel matrix cache shared by SchedulingService instances"""
+    global _travel_cache
+    if _travel_cache is None:
+        _travel_cache = TravelMatrixCache()
+        atexit.register(_travel_cache.flush)
+    return _travel_cache
+
+def get_technician_index(name: str) -> SpatialIndex:
+    """Process-wide technician spatial index, one per position source; hold _state_lock to use it"""
+    if name not in _technician_indexes:
+        _technician_indexes[name] = SpatialIndex(cell_km=SPATIAL_INDEX_CELL_KM)
+    return _technician_indexes[name]
+
+TECHNICIAN_FIELDS = ("id", "name", "home_base_lat", "home_base_lng")
+JOB_FIELDS = ("id", "job_type", "lat", "lng", "estimated_duration", "priority",
+              "scheduled_start_time", "scheduled_end_time")
+
+def _plan_key(date) -> str:
+    return str(date)[:10]
+
+def _plain(obj, fields) -> SimpleNamespace:
+    """Detached, picklable copy of the ORM attributes the solver reads"""
+    return SimpleNamespace(**{field: getattr(obj, field) for field in fields})
+
+def _solve_partition(payload):
+    """Process-pool entry point: solve one region with a precomputed distance matrix"""
+    technicians, jobs, date, distance_matrix, options = payload
+    service = SchedulingService(use_travel_cache=False)
+    try:
+        return service.solve_vrp(technicians, jobs, date, distance_matrix=distance_matrix, **options)
+    finally:
+        service.close()
 
 class SchedulingService:
     """Vehicle Routing Problem (VRP) solver for technician scheduling"""
     
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Optional[Session] = None,
+                 travel_cache: Optional[TravelMatrixCache] = None,
+                 use_travel_cache: bool = TRAVEL_CACHE_ENABLED):
+        self.owns_session = db is None
+        self.db = db or SessionLocal()
+        if travel_cache is None and use_travel_cache:
+            travel_cache = get_travel_cache()
+        self.travel_cache = travel_cache
+    
+    def close(self):
+        if self.owns_session:
+            self.db.close()
+    
+    def flush_travel_cache(self):
+        if self.travel_cache is not None:
+            self.travel_cache.flush()
     
     def calculate_distance(self, lat1, lng1, lat2, lng2):
         """Calculate Haversine distance between two points (km)"""
@@ -28,8 +278,8 @@ class SchedulingService:
         c = 2 * math.asin(math.sqrt(a))
         return R * c
     
-    def create_distance_matrix(self, technicians: List[Technician], jobs: List[WorkOrder]):
-        """Create distance matrix for VRP"""
+    def build_locations(self, technicians: List[Technician], jobs: List[WorkOrder]) -> List[Dict]:
+        """Technician home bases followed by job locations, in matrix order"""
         locations = []
         
         # Add technician home bases
@@ -48,91 +298,777 @@ class SchedulingService:
                 'id': job.id,
                 'lat': job.lat,
                 'lng': job.lng,
-                'duration': job.estimated_duration or 2.0
+                'duration': job.estimated_duration or 2.0,
+                'job_type': job.job_type,
+                'priority': getattr(job.priority, 'value', job.priority),
+                'start_time': job.scheduled_start_time,
+                'end_time': job.scheduled_end_time
             })
         
-        n = len(locations)
-        distance_matrix = [[0 for _ in range(n)] for _ in range(n)]
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    dist = self.calculate_distance(
-                        locations[i]['lat'], locations[i]['lng'],
-                        locations[j]['lat'], locations[j]['lng']
-                    )
-                    distance_matrix[i][j] = int(dist * 100)  # Convert to meters (approx)
-                else:
-                    distance_matrix[i][j] = 0
+        return locations
+    
+    def create_distance_matrix(self, technicians: List[Technician], jobs: List[WorkOrder]):
+        """Create distance matrix for VRP (int32, km * 100)"""
+        locations = self.build_locations(technicians, jobs)
+        
+        lats = [loc['lat'] for loc in locations]
+        lngs = [loc['lng'] for loc in locations]
+        if self.travel_cache is not None:
+            distance_matrix = self.travel_cache.get_matrix(lats, lngs)
+        else:
+            distance_matrix = haversine_matrix(lats, lngs, tile_size=DISTANCE_MATRIX_TILE_SIZE)
         
         return distance_matrix, locations
     
-    def optimize_routes(self, date: datetime.date) -> Optional[Dict]:
-        """Optimize technician routes for a given date"""
+    def build_time_windows(self, locations: List[Dict], date: datetime.date, horizon: int):
+        """Convert job scheduled start/end times to minute offsets from shift start"""
+        shift_start = datetime.combine(date, time(hour=SHIFT_START_HOUR))
+        windows = []
+        
+        for loc in locations:
+            if loc['type'] != 'job':
+                windows.append((0, horizon))
+                continue
+            
+            service = loc['service_minutes']
+            earliest, latest = 0, max(horizon - service, 0)
+            
+            if loc.get('start_time'):
+                offset = int((loc['start_time'] - shift_start).total_seconds() // 60)
+                earliest = min(max(offset, 0), latest)
+            if loc.get('end_time'):
+                offset = int((loc['end_time'] - shift_start).total_seconds() // 60) - service
+                latest = min(max(offset, earliest), latest)
+            
+            windows.append((earliest, latest))
+        
+        return windows
+    
+    def build_route_model(self, technicians: List[Technician], jobs: List[WorkOrder],
+                          date: datetime.date, shift_hours: Optional[float] = None,
+                          distance_matrix: Optional[np.ndarray] = None) -> Dict:
+        """Collect locations, distance/travel-time matrices and time windows for routing"""
+        if distance_matrix is None:
+            distance_matrix, locations = self.create_distance_matrix(technicians, jobs)
+        else:
+            locations = self.build_locations(technicians, jobs)
+        horizon = int((shift_hours or SHIFT_LENGTH_HOURS) * 60)
+        
+        for loc in locations:
+            loc['service_minutes'] = int(round(loc.get('duration', 0) * 60))
+        
+        # Distance units are km * 100, travel time in whole minutes
+        minutes_per_unit = 60.0 / (AVERAGE_TRAVEL_SPEED_KMH * 100)
+        
+        return {
+            "date": date,
+            "locations": locations,
+            "distance": distance_matrix,
+            "travel": np.ceil(distance_matrix * minutes_per_unit).astype(np.int64),
+            "windows": self.build_time_windows(locations, date, horizon),
+            "horizon": horizon,
+            "tech_node": {tech.id: node for node, tech in enumerate(technicians)},
+            "job_node": {job.id: len(technicians) + n for n, job in enumerate(jobs)}
+        }
+    
+    def route_schedule(self, model: Dict, depot: int, nodes: List[int]) -> Optional[Tuple[List[int], int]]:
+        """Earliest start minute at each stop and the return time, or None if infeasible"""
+        travel = model["travel"]
+        windows = model["windows"]
+        locations = model["locations"]
+        clock = 0
+        prev = depot
+        starts = []
+        
+        for node in nodes:
+            earliest, latest = windows[node]
+            clock = max(clock + int(travel[prev, node]), earliest)
+            if clock > latest:
+                return None
+            starts.append(clock)
+            clock += locations[node]['service_minutes']
+            prev = node
+        
+        clock += int(travel[prev, depot])
+        if clock > model["horizon"]:
+            return None
+        return starts, clock
+    
+    def route_distance(self, model: Dict, depot: int, nodes: List[int]) -> int:
+        """Total distance (km * 100) of a depot -> stops -> depot tour"""
+        path = [depot] + list(nodes) + [depot]
+        distance = model["distance"]
+        return int(sum(distance[path[i], path[i + 1]] for i in range(len(path) - 1)))
+    
+    def best_insertion(self, model: Dict, plan: Dict[int, List[int]], node: int,
+                       tech_ids: Sequence[int]) -> Optional[Tuple[int, int, int]]:
+        """Cheapest feasible (added_distance, tech_id, position) for inserting node"""
+        distance = model["distance"]
+        best = None
+        
+        for tech_id in tech_ids:
+            depot = model["tech_node"][tech_id]
+            route = plan.get(tech_id, [])
+            path = [depot] + route + [depot]
+            for pos in range(len(route) + 1):
+                prev, nxt = path[pos], path[pos + 1]
+                delta = int(distance[prev, node] + distance[node, nxt] - distance[prev, nxt])
+                if best is not None and delta >= best[0]:
+                    continue
+                if self.route_schedule(model, depot, route[:pos] + [node] + route[pos:]) is None:
+                    continue
+                best = (delta, tech_id, pos)
+        
+        return best
+    
+    def plan_to_routes(self, model: Dict, technicians: List[Technician],
+                       plan: Dict[int, List[int]]) -> List[Dict]:
+        """Turn {tech_id: [job nodes]} into the ordered route dicts optimize_routes returns"""
+        shift_start = datetime.combine(model["date"], time(hour=SHIFT_START_HOUR))
+        locations = model["locations"]
+        routes = []
+        
+        for tech in technicians:
+            nodes = plan.get(tech.id)
+            if not nodes:
+                continue
+            depot = model["tech_node"][tech.id]
+            schedule = self.route_schedule(model, depot, nodes)
+            starts, end = schedule if schedule else ([None] * len(nodes), None)
+            
+            routes.append({
+                "technician_id": tech.id,
+                "technician_name": tech.name,
+                "stops": [
+                    {
+                        "job_id": locations[node]['id'],
+                        "job_type": locations[node]['job_type'],
+                        "eta": (shift_start + timedelta(minutes=start)).isoformat() if start is not None else None,
+                        "service_minutes": locations[node]['service_minutes']
+                    }
+                    for node, start in zip(nodes, starts)
+                ],
+                "total_distance_km": round(self.route_distance(model, depot, nodes) / 100.0, 2),
+                "total_time_minutes": end
+            })
+        
+        return routes
+    
+    def solve_vrp(self, technicians: List[Technician], jobs: List[WorkOrder], date: datetime.date,
+                  time_limit_seconds: Optional[int] = None,
+                  first_solution_strategy: Optional[str] = None,
+                  local_search_metaheuristic: Optional[str] = None,
+                  shift_hours: Optional[float] = None,
+                  candidates: Optional[Dict[int, List[int]]] = None,
+                  distance_matrix: Optional[np.ndarray] = None) -> Optional[List[Dict]]:
+        """Solve the multi-depot VRP with time windows and shift-length capacity.
+        
+        Each technician starts and ends at their own home base. candidates maps
+        job id to the technician ids allowed to serve it. Returns ordered routes,
+        or None when the solver finds no solution within its time limit.
+        """
+        # OR-Tools takes ~0.3s to import; only processes that actually solve pay for it
+        from ortools.constraint_solver import routing_enums_pb2
+        from ortools.constraint_solver import pywrapcp
+        
+        time_limit_seconds = time_limit_seconds or VRP_TIME_LIMIT_SECONDS
+        first_solution_strategy = first_solution_strategy or VRP_FIRST_SOLUTION_STRATEGY
+        local_search_metaheuristic = local_search_metaheuristic or VRP_LOCAL_SEARCH_METAHEURISTIC
+        
+        model = self.build_route_model(technicians, jobs, date, shift_hours, distance_matrix)
+        locations = model["locations"]
+        horizon = model["horizon"]
+        num_vehicles = len(technicians)
+        
+        manager = pywrapcp.RoutingIndexManager(
+            len(locations), num_vehicles, list(range(num_vehicles)), list(range(num_vehicles))
+        )
+        routing = pywrapcp.RoutingModel(manager)
+        
+        # Callbacks run millions of times, so index plain lists rather than numpy arrays
+        service = np.array([loc['service_minutes'] for loc in locations], dtype=np.int64)
+        time_matrix = (model["travel"] + service[:, None]).tolist()
+        distance_rows = model["distance"].tolist()
+        
+        def distance_callback(from_index, to_index):
+            return distance_rows[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+        
+        def time_callback(from_index, to_index):
+            return time_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+        
+        distance_index = routing.RegisterTransitCallback(distance_callback)
+        routing.SetArcCostEvaluatorOfAllVehicles(distance_index)
+        
+        time_index = routing.RegisterTransitCallback(time_callback)
+        routing.AddDimension(time_index, horizon, horizon, False, "Time")
+        time_dimension = routing.GetDimensionOrDie("Time")
+        vehicle_by_tech = {tech.id: vehicle for vehicle, tech in enumerate(technicians)}
+        
+        for node in range(num_vehicles, len(locations)):
+            index = manager.NodeToIndex(node)
+            earliest, latest = model["windows"][node]
+            time_dimension.CumulVar(index).SetRange(earliest, latest)
+            # Jobs that cannot fit in any shift are dropped instead of making the model infeasible
+            penalty = DROP_PENALTY * PRIORITY_WEIGHTS.get(locations[node]['priority'], 1)
+            routing.AddDisjunction([index], penalty)
+            
+            if candidates and locations[node]['id'] in candidates:
+                allowed = [vehicle_by_tech[t] for t in candidates[locations[node]['id']] if t in vehicle_by_tech]
+                routing.VehicleVar(index).SetValues([-1] + allowed)
+        
+        for vehicle in range(num_vehicles):
+            routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(routing.Start(vehicle)))
+            routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(routing.End(vehicle)))
+        
+        params = pywrapcp.DefaultRoutingSearchParameters()
+        params.first_solution_strategy = getattr(
+            routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy
+        )
+        params.local_search_metaheuristic = getattr(
+            routing_enums_pb2.LocalSearchMetaheuristic, local_search_metaheuristic
+        )
+        params.time_limit.FromMilliseconds(int(time_limit_seconds * 1000))
+        
+        solution = routing.SolveWithParameters(params)
+        if solution is None:
+            return None
+        
+        plan = {}
+        for vehicle, tech in enumerate(technicians):
+            index = solution.Value(routing.NextVar(routing.Start(vehicle)))
+            nodes = []
+            while not routing.IsEnd(index):
+                nodes.append(manager.IndexToNode(index))
+                index = solution.Value(routing.NextVar(index))
+            plan[tech.id] = nodes
+        
+        return self.plan_to_routes(model, technicians, plan)
+    
+    def partition_problem(self, technicians: List[Technician], jobs: List[WorkOrder],
+                          regions: int) -> List[Tuple[List[Technician], List[WorkOrder]]]:
+        """Split jobs into k-means regions and share technicians out by workload.
+        
+        Each region with jobs gets a technician quota proportional to its job
+        count, rounded by largest remainder so the quotas add up to exactly
+        len(technicians), and never less than one: a region that rounds to
+        zero takes a technician from the region with the most per job. If
+        there are more regions than technicians, the smallest regions are
+        folded into the nearest remaining ones first. Technicians are then
+        handed out closest-first until every quota is filled.
+        """
+        labels, centroids = kmeans_regions([j.lat for j in jobs], [j.lng for j in jobs], regions)
+        sizes = np.bincount(labels, minlength=len(centroids))
+        keep = [int(r) for r in np.argsort(-sizes, kind="stable") if sizes[r]][:len(technicians)]
+        keep.sort()
+        centroids = centroids[keep]
+        regions = len(keep)
+        
+        # Jobs of dropped regions go to the nearest kept centroid
+        region_of = {old: new for new, old in enumerate(keep)}
+        region_jobs = [[] for _ in range(regions)]
+        for job, label in zip(jobs, labels):
+            r = region_of.get(int(label))
+            if r is None:
+                r = int(haversine_cross([job.lat], [job.lng], centroids[:, 0], centroids[:, 1])[0].argmin())
+            region_jobs[r].append(job)
+        
+        sizes = np.array([len(r) for r in region_jobs])
+        shares = len(technicians) * sizes / len(jobs)
+        quotas = np.floor(shares).astype(int)
+        for r in np.argsort(quotas - shares, kind="stable")[:len(technicians) - int(quotas.sum())]:
+            quotas[r] += 1
+        for r in np.flatnonzero(quotas == 0):
+            donor = int(np.argmax(np.where(quotas > 1, quotas / sizes, -1)))
+            quotas[donor] -= 1
+            quotas[r] = 1
+        
+        tech_distances = haversine_cross(
+            [t.home_base_lat for t in technicians], [t.home_base_lng for t in technicians],
+            centroids[:, 0], centroids[:, 1]
+        )
+        region_techs = [[] for _ in range(regions)]
+        assigned = set()
+        
+        for flat in np.argsort(tech_distances, axis=None, kind="stable"):
+            t, r = divmod(int(flat), regions)
+            if t in assigned or len(region_techs[r]) >= quotas[r]:
+                continue
+            region_techs[r].append(technicians[t])
+            assigned.add(t)
+        
+        return list(zip(region_techs, region_jobs))
+    
+    def depot_neighbors(self, model: Dict, k: int = VRP_CANDIDATE_TECHNICIANS):
+        """Return a lookup of the k technicians whose home base is nearest a node"""
+        locations = model["locations"]
+        index = SpatialIndex(cell_km=SPATIAL_INDEX_CELL_KM)
+        for tech_id, node in model["tech_node"].items():
+            index.upsert(tech_id, locations[node]['lat'], locations[node]['lng'])
+        
+        def neighbors(node):
+            return [t for t, _ in index.nearest(locations[node]['lat'], locations[node]['lng'], k=k)]
+        
+        return neighbors
+    
+    def relocate_pass(self, model: Dict, plan: Dict[int, List[int]], tech_ids: Sequence[int],
+                      neighbors, deadline: Optional[float] = None):
+        """Move stops of the given routes to a neighboring route when that shortens total distance"""
+        distance = model["distance"]
+        
+        for tech_id in list(tech_ids):
+            depot = model["tech_node"][tech_id]
+            for node in list(plan.get(tech_id, [])):
+                if deadline is not None and perf_counter() > deadline:
+                    return
+                route = plan[tech_id]
+                pos = route.index(node)
+                path = [depot] + route + [depot]
+                saving = int(distance[path[pos], node] + distance[node, path[pos + 2]]
+                             - distance[path[pos], path[pos + 2]])
+                others = [t for t in neighbors(node) if t != tech_id]
+                best = self.best_insertion(model, plan, node, others)
+                if best is None or best[0] >= saving:
+                    continue
+                _, target, target_pos = best
+                route.remove(node)
+                plan.setdefault(target, []).insert(target_pos, node)
+    
+    def two_opt(self, model: Dict, depot: int, nodes: List[int],
+                deadline: Optional[float] = None) -> List[int]:
+        """Reverse route segments while that shortens the route and keeps it feasible"""
+        distance = model["distance"]
+        improved = True
+        
+        while improved:
+            improved = False
+            path = [depot] + nodes + [depot]
+            for i in range(len(nodes) - 1):
+                if deadline is not None and perf_counter() > deadline:
+                    return nodes
+                for j in range(i + 1, len(nodes)):
+                    before, first, last, after = path[i], path[i + 1], path[j + 1], path[j + 2]
+                    delta = (distance[before, last] + distance[first, after]
+                             - distance[before, first] - distance[last, after])
+                    if delta >= 0:
+                        continue
+                    candidate = nodes[:i] + nodes[i:j + 1][::-1] + nodes[j + 1:]
+                    if self.route_schedule(model, depot, candidate) is not None:
+                        nodes = candidate
+                        improved = True
+                        break
+                if improved:
+                    break
+        
+        return nodes
+    
+    def repair_boundaries(self, model: Dict, plan: Dict[int, List[int]], unassigned: List[int],
+                          k: int = VRP_CANDIDATE_TECHNICIANS) -> List[int]:
+        """Rebalance jobs across region borders after a partitioned solve.
+        
+        Jobs dropped by their region are inserted into the cheapest feasible
+        route among their k nearest technicians, then each job is relocated to
+        a neighboring technician when that shortens total distance. Returns the
+        nodes that still could not be placed.
+        """
+        locations = model["locations"]
+        neighbors = self.depot_neighbors(model, k)
+        
+        still_unassigned = []
+        by_priority = sorted(unassigned, key=lambda n: -PRIORITY_WEIGHTS.get(locations[n]['priority'], 1))
+        for node in by_priority:
+            best = self.best_insertion(model, plan, node, neighbors(node))
+            if best is None:
+                still_unassigned.append(node)
+                continue
+            _, tech_id, pos = best
+            plan.setdefault(tech_id, []).insert(pos, node)
+        
+        self.relocate_pass(model, plan, list(plan), neighbors)
+        
+        return still_unassigned
+    
+    def solve_partitioned(self, technicians: List[Technician], jobs: List[WorkOrder],
+                          date: datetime.date, regions: Optional[int] = None,
+                          max_workers: Optional[int] = None,
+                          time_limit_seconds: Optional[int] = None,
+                          first_solution_strategy: Optional[str] = None,
+                          local_search_metaheuristic: Optional[str] = None,
+                          shift_hours: Optional[float] = None) -> Optional[List[Dict]]:
+        """Solve region sub-problems in parallel processes, then repair boundaries"""
+        regions = regions or max(1, math.ceil(len(jobs) / VRP_PARTITION_JOBS))
+        regions = min(regions, len(technicians), len(jobs))
+        
+        # One matrix for the whole day, sliced per region, so workers never touch the cache
+        model = self.build_route_model(technicians, jobs, date, shift_hours)
+        options = {
+            "time_limit_seconds": time_limit_seconds,
+            "first_solution_strategy": first_solution_strategy,
+            "local_search_metaheuristic": local_search_metaheuristic,
+            "shift_hours": shift_hours
+        }
+        
+        payloads = []
+        for region_techs, region_jobs in self.partition_problem(technicians, jobs, regions):
+            nodes = ([model["tech_node"][t.id] for t in region_techs] +
+                     [model["job_node"][j.id] for j in region_jobs])
+            payloads.append((
+                [_plain(t, TECHNICIAN_FIELDS) for t in region_techs],
+                [_plain(j, JOB_FIELDS) for j in region_jobs],
+                date,
+                np.ascontiguousarray(model["distance"][np.ix_(nodes, nodes)]),
+                options
+            ))
+        
+        if len(payloads) == 1:
+            results = [_solve_partition(payloads[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers or VRP_PARTITION_WORKERS) as pool:
+                results = list(pool.map(_solve_partition, payloads))
+        
+        plan = {}
+        for payload, routes in zip(payloads, results):
+            if routes is None:
+                # Region timed out: its jobs go through the repair pass instead
+                continue
+            for route in routes:
+                plan[route["technician_id"]] = [model["job_node"][s["job_id"]] for s in route["stops"]]
+        
+        placed = {node for nodes in plan.values() for node in nodes}
+        unassigned = [node for node in model["job_node"].values() if node not in placed]
+        self.repair_boundaries(model, plan, unassigned)
+        
+        return self.plan_to_routes(model, technicians, plan)
+    
+    def technician_index(self, technicians: List[Technician],
+                         use_current_positions: bool = False) -> SpatialIndex:
+        """Shared spatial index over technician positions, synced incrementally.
+        
+        Positions are home bases, or with use_current_positions the location of
+        today's latest open check-in where one exists. Returns a copy taken
+        under the lock, so another request syncing a different technician
+        list cannot change it mid-query.
+        """
+        positions = {t.id: (t.home_base_lat, t.home_base_lng) for t in technicians}
+        
+        if use_current_positions and positions:
+            today = datetime.combine(datetime.now().date(), time())
+            open_checkins = self.db.query(Timesheet).filter(
+                Timesheet.technician_id.in_(list(positions)),
+                Timesheet.check_in_time >= today,
+                Timesheet.check_out_time.is_(None),
+                Timesheet.check_in_lat.isnot(None)
+            ).order_by(Timesheet.check_in_time).all()
+            for sheet in open_checkins:
+                positions[sheet.technician_id] = (sheet.check_in_lat, sheet.check_in_lng)
+        
+        with _state_lock:
+            index = get_technician_index("current" if use_current_positions else "home")
+            index.sync(positions)
+            return index.copy()
+    
+    def nearest_technicians(self, lat: float, lng: float, k: int = 5,
+                            radius_km: Optional[float] = None,
+                            use_current_positions: bool = True) -> List[Dict]:
+        """Find the k nearest active technicians to a point (e.g. emergency dispatch)"""
+        technicians = self.db.query(Technician).filter(
+            Technician.is_active == True
+        ).all()
+        by_id = {t.id: t for t in technicians}
+        index = self.technician_index(technicians, use_current_positions)
+        
+        return [
+            {
+                "technician_id": tech_id,
+                "technician_name": by_id[tech_id].name,
+                "distance_km": round(dist, 2)
+            }
+            for tech_id, dist in index.nearest(lat, lng, k=k, max_distance_km=radius_km)
+        ]
+    
+    def candidate_technicians(self, technicians: List[Technician], jobs: List[WorkOrder],
+                              k: int) -> Dict[int, List[int]]:
+        """Map each job to the ids of its k nearest technicians"""
+        index = self.technician_index(technicians)
+        return {
+            job.id: [tech_id for tech_id, _ in index.nearest(job.lat, job.lng, k=k)]
+            for job in jobs
+        }
+    
+    def greedy_routes(self, technicians: List[Technician], jobs: List[WorkOrder]) -> List[Dict]:
+        """Assign each job to the technician with the nearest home base"""
+        by_id = {tech.id: tech for tech in technicians}
+        index = self.technician_index(technicians)
+        routes = {}
+        
+        for job in jobs:
+            nearest = index.nearest(job.lat, job.lng, k=1)
+            
+            if nearest:
+                tech_id, min_distance = nearest[0]
+                best_tech = by_id[tech_id]
+                route = routes.setdefault(best_tech.id, {
+                    "technician_id": best_tech.id,
+                    "technician_name": best_tech.name,
+                    "stops": [],
+                    "total_distance_km": 0.0
+                })
+                route["stops"].append({
+                    "job_id": job.id,
+                    "job_type": job.job_type,
+                    "distance_km": round(min_distance, 2)
+                })
+                route["total_distance_km"] = round(route["total_distance_km"] + min_distance, 2)
+        
+        return list(routes.values())
+    
+    def load_day(self, date: datetime.date) -> Tuple[List[Technician], List[WorkOrder]]:
+        """Active technicians with a home base and routable open jobs for a date"""
+        jobs = self.db.query(WorkOrder).filter(
+            WorkOrder.scheduled_date == date,
+            WorkOrder.status.in_(["pending", "scheduled"])
+        ).all()
+        jobs = [job for job in jobs if job.lat and job.lng]
+        
+        technicians = self.db.query(Technician).filter(
+            Technician.is_active == True
+        ).all()
+        technicians = [t for t in technicians if t.home_base_lat and t.home_base_lng]
+        
+        return technicians, jobs
+    
+    def current_plan(self, date: datetime.date, jobs: List[WorkOrder],
+                     routes: Optional[List[Dict]] = None) -> Dict[int, List[int]]:
+        """Starting {tech_id: [job ids]} for incremental changes.
+        
+        Uses the routes passed in, else the last plan optimize_routes produced in
+        this process, else the jobs' assigned technicians in id order.
+        """
+        with _state_lock:
+            latest = _route_plans.get(_plan_key(date))
+        if routes is not None:
+            plan = {r["technician_id"]: [s["job_id"] for s in r["stops"]] for r in routes}
+        elif latest is not None:
+            plan = {tech_id: list(ids) for tech_id, ids in latest.items()}
+        else:
+            plan = {}
+            for job in sorted(jobs, key=lambda j: j.id):
+                if job.assigned_technician_id and job.status == "scheduled":
+                    plan.setdefault(job.assigned_technician_id, []).append(job.id)
+        
+        # Drop jobs that were cancelled, completed or moved to another day meanwhile
+        open_ids = {job.id for job in jobs}
+        return {tech_id: [j for j in ids if j in open_ids] for tech_id, ids in plan.items()}
+    
+    def reoptimize_job(self, date: datetime.date, job_id: int, action: str = "insert",
+                       routes: Optional[List[Dict]] = None,
+                       search_ms: int = INCREMENTAL_SEARCH_MS,
+                       shift_hours: Optional[float] = None) -> Dict:
+        """Apply a single-job change to the current routes without a full re-solve.
+        
+        action is "insert" (new or emergency job), "remove" (unassign) or
+        "cancel" (unassign and mark cancelled); re-inserting a job whose time
+        window moved handles delays. Only pending or scheduled jobs qualify;
+        inserting one from another day moves it to this date, while remove and
+        cancel need the job to be on this date. The job goes to its cheapest feasible
+        position among nearby technicians, then the touched routes get a short
+        2-opt/relocate search bounded by search_ms. Only WorkOrder rows whose
+        technician actually changed are written. Any other action raises
+        ValueError before anything is read or changed.
+        """
+        if action not in REOPTIMIZE_ACTIONS:
+            raise ValueError(f"Unknown action {action!r}; expected one of {', '.join(REOPTIMIZE_ACTIONS)}")
+        try:
+            deadline = perf_counter() + search_ms / 1000.0
+            technicians, jobs = self.load_day(date)
+            if not technicians:
+                return {"message": "No active technicians"}
+            
+            job = self.db.query(WorkOrder).filter(WorkOrder.id == job_id).first()
+            if job is None:
+                return {"error": f"Work order {job_id} not found"}
+            if job.status not in ("pending", "scheduled"):
+                return {"error": f"Work order {job_id} is {getattr(job.status, 'value', job.status)}"}
+            if job not in jobs:
+                if action != "insert":
+                    return {"error": f"Work order {job_id} is not scheduled on {_plan_key(date)}"}
+                if not job.lat or not job.lng:
+                    return {"error": f"Work order {job_id} has no coordinates"}
+                jobs.append(job)
+            
+            plan = self.current_plan(date, jobs, routes)
+            plan = {t.id: plan.get(t.id, []) for t in technicians}
+            before = {j: tech_id for tech_id, ids in plan.items() for j in ids}
+            
+            model = self.build_route_model(technicians, jobs, date, shift_hours)
+            node_plan = {tech_id: [model["job_node"][j] for j in ids] for tech_id, ids in plan.items()}
+            original = {tech_id: list(nodes) for tech_id, nodes in node_plan.items()}
+            node = model["job_node"].get(job_id)
+            
+            if node is not None:
+                for nodes in node_plan.values():
+                    if node in nodes:
+                        nodes.remove(node)
+            
+            if action == "insert":
+                neighbors = self.depot_neighbors(model)
+                best = self.best_insertion(model, node_plan, node, neighbors(node))
+                if best is None:
+                    best = self.best_insertion(model, node_plan, node, list(node_plan))
+                if best is not None:
+                    _, tech_id, pos = best
+                    node_plan[tech_id].insert(pos, node)
+                    self.relocate_pass(model, node_plan, [tech_id], neighbors, deadline)
+            
+            touched = [t for t, nodes in node_plan.items() if nodes != original[t]]
+            for tech_id in touched:
+                depot = model["tech_node"][tech_id]
+                node_plan[tech_id] = self.two_opt(model, depot, node_plan[tech_id], deadline)
+            
+            locations = model["locations"]
+            after = {locations[n]['id']: tech_id for tech_id, nodes in node_plan.items() for n in nodes}
+            jobs_by_id = {j.id: j for j in jobs}
+            changed = []
+            
+            for j_id, j in jobs_by_id.items():
+                if after.get(j_id) == before.get(j_id) and not (j_id == job_id and action == "cancel"):
+                    continue
+                if j_id in after:
+                    j.assigned_technician_id = after[j_id]
+                    j.status = "scheduled"
+                    # An inserted job may come from another day
+                    j.scheduled_date = date
+                else:
+                    j.assigned_technician_id = None
+                    j.status = "cancelled" if (j_id == job_id and action == "cancel") else "pending"
+                changed.append(j_id)
+            
+            if action == "cancel":
+                # Hands the job's reserved parts back; commits together with the route changes
+                InventoryService(self.db).release([job_id])
+            else:
+                self.db.commit()
+            invalidate("jobs")
+            self.flush_travel_cache()
+            
+            with _state_lock:
+                _route_plans[_plan_key(date)] = {
+                    tech_id: [locations[n]['id'] for n in nodes] for tech_id, nodes in node_plan.items() if nodes
+                }
+            
+            return {
+                "date": str(date),
+                "action": action,
+                "job_id": job_id,
+                "assigned_technician_id": after.get(job_id),
+                "changed_jobs": changed,
+                "routes": self.plan_to_routes(model, technicians, node_plan)
+            }
+            
+        except Exception as e:
+            self.db.rollback()
+            return {"error": str(e)}
+    
+    def optimize_routes(self, date: datetime.date, method: str = "vrp",
+                        time_limit_seconds: Optional[int] = None,
+                        first_solution_strategy: Optional[str] = None,
+                        local_search_metaheuristic: Optional[str] = None,
+                        shift_hours: Optional[float] = None,
+                        candidate_k: Optional[int] = VRP_CANDIDATE_TECHNICIANS,
+                        regions: Optional[int] = None,
+                        max_workers: Optional[int] = None) -> Optional[Dict]:
+        """Optimize technician routes for a given date.
+        
+        method="vrp" runs the OR-Tools solver and falls back to the greedy
+        nearest-home-base assignment if no solution is found within the time
+        limit; method="greedy" skips the solver entirely. With candidate_k set,
+        each job may only go to one of its candidate_k nearest technicians and
+        technicians near no job are left out of the model.
+        
+        method="partitioned" splits the day into geographic regions solved in a
+        process pool (see solve_partitioned) for city-wide job volumes.
+        """
         try:
-            # Get scheduled jobs for date
-            jobs = self.db.query(WorkOrder).filter(
-                WorkOrder.scheduled_date == date,
-                WorkOrder.status.in_(["pending", "scheduled"])
-            ).all()
+            technicians, jobs = self.load_day(date)
             
             if not jobs:
                 return {"message": "No jobs to schedule"}
             
-            # Get active technicians
-            technicians = self.db.query(Technician).filter(
-                Technician.is_active == True
-            ).all()
-            
             if not technicians:
                 return {"message": "No active technicians"}
             
-            # Simple assignment: assign jobs to nearest technicians
-            # (Full VRP would require more complex setup)
+            routes = None
+            if method == "vrp":
+                candidates = None
+                vrp_technicians = technicians
+                if candidate_k and candidate_k < len(technicians):
+                    candidates = self.candidate_technicians(technicians, jobs, candidate_k)
+                    needed = {tech_id for ids in candidates.values() for tech_id in ids}
+                    vrp_technicians = [t for t in technicians if t.id in needed]
+                
+                routes = self.solve_vrp(
+                    vrp_technicians, jobs, date,
+                    time_limit_seconds=time_limit_seconds,
+                    first_solution_strategy=first_solution_strategy,
+                    local_search_metaheuristic=local_search_metaheuristic,
+                    shift_hours=shift_hours,
+                    candidates=candidates
+                )
+            elif method == "partitioned":
+                routes = self.solve_partitioned(
+                    technicians, jobs, date,
+                    regions=regions,
+                    max_workers=max_workers,
+                    time_limit_seconds=time_limit_seconds,
+                    first_solution_strategy=first_solution_strategy,
+                    local_search_metaheuristic=local_search_metaheuristic,
+                    shift_hours=shift_hours
+                )
+            
+            if routes is None:
+                method = "greedy"
+                routes = self.greedy_routes(technicians, jobs)
+            
+            jobs_by_id = {job.id: job for job in jobs}
             assignments = []
             
-            for job in jobs:
-                if not job.lat or not job.lng:
-                    continue
-                
-                best_tech = None
-                min_distance = float('inf')
-                
-                for tech in technicians:
-                    if not tech.home_base_lat or not tech.home_base_lng:
-                        continue
-                    
-                    dist = self.calculate_distance(
-                        tech.home_base_lat, tech.home_base_lng,
-                        job.lat, job.lng
-                    )
-                    
-                    if dist < min_distance:
-                        min_distance = dist
-                        best_tech = tech
-                
-                if best_tech:
-                    job.assigned_technician_id = best_tech.id
+            for route in routes:
+                for stop in route["stops"]:
+                    job = jobs_by_id[stop["job_id"]]
+                    job.assigned_technician_id = route["technician_id"]
                     job.status = "scheduled"
                     assignments.append({
-                        "technician_id": best_tech.id,
-                        "technician_name": best_tech.name,
+                        "technician_id": route["technician_id"],
+                        "technician_name": route["technician_name"],
                         "job_id": job.id,
-                        "job_type": job.job_type,
-                        "distance_km": round(min_distance, 2)
+                        "job_type": job.job_type
                     })
             
+            # Jobs the solver dropped lose any assignment from an earlier plan
+            assigned_ids = {a["job_id"] for a in assignments}
+            for job in jobs:
+                if job.id not in assigned_ids:
+                    job.assigned_technician_id = None
+                    job.status = "pending"
+            
             self.db.commit()
+            invalidate("jobs")
+            self.flush_travel_cache()
+            
+            with _state_lock:
+                _route_plans[_plan_key(date)] = {
+                    route["technician_id"]: [stop["job_id"] for stop in route["stops"]] for route in routes
+                }
             
             return {
                 "date": str(date),
+                "method": method,
                 "jobs_assigned": len(assignments),
-                "assignments": assignments
+                "routes": routes,
+                "assignments": assignments,
+                "unassigned_jobs": [job.id for job in jobs if job.id not in assigned_ids],
+                "travel_cache": self.travel_cache.stats() if self.travel_cache is not None else None
             }
             
         except Exception as e:
             self.db.rollback()
             return {"error": str(e)}
-        finally:
-            self.db.close()
-
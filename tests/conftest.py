@@ -0,0 +1,35 @@
+"""Shared fixtures: every test runs against a throwaway SQLite database.
+
+config reads the environment at import time, so it is set here before any
+application module is imported.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_tmp = tempfile.mkdtemp(prefix="fieldops-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["TRAVEL_CACHE_ENABLED"] = "0"
+os.environ["TRAVEL_CACHE_PATH"] = f"{_tmp}/travel_cache.npz"
+os.environ["ROLLUP_REFRESH_SECONDS"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from database import models  # noqa: F401  (registers the tables)
+from database.session import Base, SessionLocal, engine
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables, dropped again afterwards"""
+    from services import scheduler
+    Base.metadata.create_all(bind=engine)
+    scheduler._route_plans.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,136 @@
+"""Route optimization, single-job re-optimization, the spatial index and the travel cache"""
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database.models import InventoryItem, Technician, WorkOrder
+from services.inventory import InventoryService
+from services.scheduler import SchedulingService, TravelMatrixCache
+from utils.geo import SpatialIndex, haversine_km
+
+DAY = datetime(2026, 1, 6)
+
+def add_technicians(db, homes):
+    technicians = [
+        Technician(name=f"Tech {i}", home_base_lat=lat, home_base_lng=lng, is_active=True)
+        for i, (lat, lng) in enumerate(homes)
+    ]
+    db.add_all(technicians)
+    db.commit()
+    return technicians
+
+def add_jobs(db, coords, technician=None, hours=1.0, day=DAY):
+    jobs = [
+        WorkOrder(
+            job_type="HVAC Repair", location=f"Site {i}", lat=lat, lng=lng,
+            status="scheduled" if technician else "pending",
+            assigned_technician_id=technician.id if technician else None,
+            scheduled_date=day, estimated_duration=hours
+        )
+        for i, (lat, lng) in enumerate(coords)
+    ]
+    db.add_all(jobs)
+    db.commit()
+    return jobs
+
+def test_optimize_routes_unassigns_dropped_jobs(db):
+    (tech,) = add_technicians(db, [(43.65, -79.38)])
+    # Five 3-hour jobs cannot fit one 8-hour shift; the solver has to drop some
+    jobs = add_jobs(db, [(43.65 + i * 0.01, -79.38) for i in range(5)], technician=tech, hours=3.0)
+    
+    result = SchedulingService(db, use_travel_cache=False).optimize_routes(DAY, shift_hours=8, time_limit_seconds=1)
+    
+    assert result["method"] == "vrp"
+    assert result["unassigned_jobs"]
+    db.expire_all()
+    for job in jobs:
+        if job.id in result["unassigned_jobs"]:
+            assert (job.status, job.assigned_technician_id) == ("pending", None)
+        else:
+            assert (job.status, job.assigned_technician_id) == ("scheduled", tech.id)
+
+def test_reoptimize_inserts_a_job_from_another_day(db):
+    technicians = add_technicians(db, [(43.65, -79.38), (43.75, -79.30)])
+    add_jobs(db, [(43.66, -79.37), (43.74, -79.31)])
+    service = SchedulingService(db, use_travel_cache=False)
+    service.optimize_routes(DAY, time_limit_seconds=1)
+    (job,) = add_jobs(db, [(43.70, -79.35)], day=DAY + timedelta(days=3))
+    
+    result = service.reoptimize_job(DAY, job.id, action="insert")
+    
+    assert "error" not in result
+    db.refresh(job)
+    assert job.status == "scheduled"
+    assert job.assigned_technician_id in {t.id for t in technicians}
+    assert job.scheduled_date == DAY
+    assert any(stop["job_id"] == job.id for route in result["routes"] for stop in route["stops"])
+
+def test_reoptimize_cancel_releases_reserved_parts(db):
+    add_technicians(db, [(43.65, -79.38)])
+    jobs = add_jobs(db, [(43.66, -79.37), (43.67, -79.36)])
+    item = InventoryItem(name="Filter", quantity=10, reorder_level=2, unit_price=5.0)
+    db.add(item)
+    db.commit()
+    service = SchedulingService(db, use_travel_cache=False)
+    service.optimize_routes(DAY, time_limit_seconds=1)
+    InventoryService(db).reserve(jobs[0].id, [(item.id, 3)])
+    
+    result = service.reoptimize_job(DAY, jobs[0].id, action="cancel")
+    
+    assert "error" not in result
+    db.expire_all()
+    assert (jobs[0].status, jobs[0].assigned_technician_id) == ("cancelled", None)
+    assert item.reserved == 0
+    assert jobs[1].status == "scheduled"
+
+def test_reoptimize_rejects_unknown_actions_without_changes(db):
+    (tech,) = add_technicians(db, [(43.65, -79.38)])
+    (job,) = add_jobs(db, [(43.66, -79.37)], technician=tech)
+    
+    with pytest.raises(ValueError):
+        SchedulingService(db, use_travel_cache=False).reoptimize_job(DAY, job.id, action="delay")
+    
+    db.expire_all()
+    assert (job.status, job.assigned_technician_id) == ("scheduled", tech.id)
+
+@pytest.mark.parametrize("base_lat", [1.0, 43.65, 64.8, -33.9])
+def test_spatial_index_matches_brute_force(base_lat):
+    rng = random.Random(7)
+    points = {i: (base_lat + rng.gauss(0, 0.3), 10 + rng.gauss(0, 0.6)) for i in range(300)}
+    index = SpatialIndex(cell_km=3)
+    # Start from a subset so the index has to re-bucket as farther points arrive
+    index.sync(dict(list(points.items())[:20]))
+    index.sync(points)
+    
+    for _ in range(100):
+        lat, lng = base_lat + rng.gauss(0, 0.3), 10 + rng.gauss(0, 0.6)
+        expected = sorted(points, key=lambda key: haversine_km(lat, lng, *points[key]))
+        assert [key for key, _ in index.nearest(lat, lng, k=5)] == expected[:5]
+        within = {key for key, _ in index.within(lat, lng, 10)}
+        assert within == {key for key in points if haversine_km(lat, lng, *points[key]) <= 10}
+
+def test_travel_cache_round_trip(tmp_path):
+    path = tmp_path / "travel_cache.npz"
+    lats = [43.6 + 0.01 * i for i in range(10)]
+    lngs = [-79.4 + 0.02 * i for i in range(10)]
+    cache = TravelMatrixCache(path=path, max_locations=100)
+    first = cache.get_matrix(lats, lngs)
+    assert cache.dirty and not path.exists()
+    cache.flush()
+    
+    reloaded = TravelMatrixCache(path=path, max_locations=100)
+    np.testing.assert_array_equal(reloaded.get_matrix(lats, lngs), first)
+    assert (reloaded.hits, reloaded.misses) == (10, 0)
+
+def test_travel_cache_serves_oversized_requests_then_trims_to_cap():
+    lats = [43.6 + 0.01 * i for i in range(8)]
+    lngs = [-79.4] * 8
+    expected = TravelMatrixCache(path=None, max_locations=100).get_matrix(lats, lngs)
+    cache = TravelMatrixCache(path=None, max_locations=5)
+    
+    np.testing.assert_array_equal(cache.get_matrix(lats, lngs), expected)
+    assert len(cache.index) == 5
+    np.testing.assert_array_equal(cache.get_matrix(lats[:3], lngs[:3]), expected[:3, :3])
+    assert len(cache.index) == 5
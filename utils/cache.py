@@ -0,0 +1,88 @@
+"""In-process TTL cache with tag-based invalidation"""
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL or when a tag is invalidated.
+    
+    Readers tag entries with the data they depend on ("jobs", "invoices", ...)
+    and writers call invalidate() with the tags they touched after committing,
+    so cached panels are never staler than their TTL and usually fresher.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+    
+    def set(self, key: Hashable, value: Any, ttl: float, tags: Iterable[str] = ()):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of the given tags; returns how many were dropped"""
+        wanted = set(tags)
+        with self._lock:
+            stale = [key for key, (_, entry_tags, _) in self._entries.items() if entry_tags & wanted]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+cache = TTLCache()
+
+def cached(ttl: float, tags: Iterable[str] = (), store: Optional[TTLCache] = None) -> Callable:
+    """Memoize a function's result per argument tuple for ttl seconds"""
+    tags = tuple(tags)
+    
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            target = store or cache
+            key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            found, value = target.get(key)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            target.set(key, value, ttl, tags)
+            return value
+        return wrapper
+    
+    return decorator
+
+def invalidate(*tags: str) -> int:
+    """Invalidate cached entries that depend on the given tags"""
+    return cache.invalidate(*tags)
@@ -4,8 +4,11 @@ from random import choice, randint, uniform, sample
 from datetime import datetime, timedelta
 import random
 
+from sqlalchemy import func
+
 from database.session import SessionLocal
 from database.models import *
+from utils.cache import cache
 
 fake = Faker()
 
@@ -100,13 +103,16 @@ def generate_inventory():
         
         for category, parts in INVENTORY_CATEGORIES.items():
             for part_name in parts:
+                quantity = randint(5, 100)
+                reorder_level = randint(5, 25)
                 item = InventoryItem(
                     name=part_name,
                     sku=f"SKU-{sku_counter:06d}",
                     category=category,
-                    quantity=randint(5, 100),
+                    quantity=quantity,
                     unit_price=uniform(10.0, 500.0),
-                    reorder_level=randint(5, 25),
+                    reorder_level=reorder_level,
+                    low_stock=quantity <= reorder_level,
                     supplier=fake.company()
                 )
                 items.append(item)
@@ -292,6 +298,13 @@ def generate_invoices():
         invoices = []
         invoice_counter = 1000
         
+        # Parts cost for every job in one grouped query
+        materials_by_job = dict(
+            db.query(JobPart.work_order_id, func.sum(JobPart.total_cost))
+            .group_by(JobPart.work_order_id)
+            .all()
+        )
+        
         for job in completed_jobs[:len(completed_jobs)//2]:  # Invoice ~50% of jobs
             # Calculate costs
             labor_hours = job.actual_duration or job.estimated_duration
@@ -299,9 +312,7 @@ def generate_invoices():
             labor_rate = technician.hourly_rate if technician else 75.0
             labor_cost = labor_hours * labor_rate
             
-            # Get parts cost
-            parts = db.query(JobPart).filter(JobPart.work_order_id == job.id).all()
-            materials_cost = sum([p.total_cost for p in parts])
+            materials_cost = materials_by_job.get(job.id) or 0
             
             subtotal = labor_cost + materials_cost
             tax_amount = subtotal * 0.13  # 13% HST
@@ -345,6 +356,7 @@ def load_demo_data():
     generate_technicians(12)
     generate_inventory()
     generate_work_orders(50)
+    cache.clear()
     print("Demo data loaded successfully!")
 
 if __name__ == "__main__":
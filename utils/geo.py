@@ -0,0 +1,274 @@
+"""Vectorized geographic distance helpers and spatial index"""
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from collections import defaultdict
+import heapq
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+MISSING_DISTANCE_KM = 9999.0  # Same sentinel SchedulingService.calculate_distance uses
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Scalar Haversine distance between two points (km)"""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+def _prepare(values: Sequence) -> np.ndarray:
+    """Convert coordinates to radians, marking None/0 as missing (NaN)"""
+    arr = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    arr[arr == 0] = np.nan
+    return np.radians(arr)
+
+def _haversine_block(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Broadcasted Haversine distance (km) between two sets of points"""
+    dlat = lat2[None, :] - lat1[:, None]
+    dlng = lng2[None, :] - lng1[:, None]
+    a = (np.sin(dlat / 2) ** 2 +
+         np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlng / 2) ** 2)
+    dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return np.where(np.isnan(dist), MISSING_DISTANCE_KM, dist)
+
+def haversine_cross(lats1: Sequence, lngs1: Sequence, lats2: Sequence, lngs2: Sequence,
+                    scale: float = 100.0) -> np.ndarray:
+    """Distances (int32, km * scale) from every point in set 1 to every point in set 2"""
+    block = _haversine_block(_prepare(lats1), _prepare(lngs1), _prepare(lats2), _prepare(lngs2))
+    return (block * scale).astype(np.int32)
+
+def haversine_matrix(lats: Sequence, lngs: Sequence, scale: float = 100.0,
+                     tile_size: Optional[int] = None) -> np.ndarray:
+    """Build a symmetric int32 distance matrix in units of km * scale.
+    
+    With tile_size set, only the upper-triangle tiles are computed and
+    mirrored, so peak temporary memory is bounded by tile_size**2 instead
+    of n**2 float64 values.
+    """
+    lat = _prepare(lats)
+    lng = _prepare(lngs)
+    n = len(lat)
+    matrix = np.zeros((n, n), dtype=np.int32)
+    
+    if n == 0:
+        return matrix
+    
+    if not tile_size or tile_size >= n:
+        matrix[:] = _haversine_block(lat, lng, lat, lng) * scale
+    else:
+        for i in range(0, n, tile_size):
+            rows = slice(i, min(i + tile_size, n))
+            for j in range(i, n, tile_size):
+                cols = slice(j, min(j + tile_size, n))
+                tile = (_haversine_block(lat[rows], lng[rows], lat[cols], lng[cols]) * scale).astype(np.int32)
+                matrix[rows, cols] = tile
+                if i != j:
+                    matrix[cols, rows] = tile.T
+    
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+class SpatialIndex:
+    """Grid-bucket index over points for k-nearest and radius queries.
+    
+    Points are bucketed into roughly square cells of cell_km. Queries scan
+    rings of cells outward from the query point and stop as soon as no
+    unvisited cell can hold a closer point, so lookups touch a handful of
+    cells instead of every point. Inserts, moves and removals are O(1),
+    which lets callers keep the index in sync as technicians change.
+    
+    Cell width in longitude is sized at reference_lat. Unless the caller
+    fixes it, that is the indexed latitude farthest from the equator, so no
+    cell is narrower than cell_km and the early stop in nearest() holds; the
+    index re-buckets its points when a new one lies farther out.
+    """
+    
+    def __init__(self, cell_km: float = 5.0, reference_lat: Optional[float] = None):
+        self.cell_km = cell_km
+        self.lat_step = cell_km / 111.32
+        self.fixed_reference = reference_lat is not None
+        self.cells = defaultdict(dict)  # cell -> {key: (lat, lng)}
+        self.points = {}  # key -> (lat, lng)
+        self.bounds = None  # (min_i, max_i, min_j, max_j) of cells ever occupied
+        self._set_reference(reference_lat or 0.0)
+    
+    def __len__(self):
+        return len(self.points)
+    
+    def __contains__(self, key):
+        return key in self.points
+    
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.lat_step), math.floor(lng / self.lng_step))
+    
+    def _set_reference(self, lat: float):
+        """Size cells for lat and re-bucket every point"""
+        self.reference_lat = lat
+        self.lng_step = self.cell_km / (111.32 * math.cos(math.radians(min(abs(lat), 89.0))))
+        points = self.points
+        self.cells = defaultdict(dict)
+        self.points = {}
+        self.bounds = None
+        for key, (plat, plng) in points.items():
+            self._insert(key, plat, plng)
+    
+    def _follow_reference(self, lats: Iterable[float]):
+        """Move the reference out to the farthest of lats from the equator, if not fixed"""
+        farthest = max((abs(lat) for lat in lats), default=0.0)
+        if not self.fixed_reference and farthest > abs(self.reference_lat):
+            self._set_reference(farthest)
+    
+    def upsert(self, key: Hashable, lat: Optional[float], lng: Optional[float]):
+        """Insert or move a point; points without coordinates are removed"""
+        if not lat or not lng:
+            self.remove(key)
+            return
+        if self.points.get(key) == (lat, lng):
+            return
+        self.remove(key)
+        self._follow_reference([lat])
+        self._insert(key, lat, lng)
+    
+    def _insert(self, key: Hashable, lat: float, lng: float):
+        self.points[key] = (lat, lng)
+        i, j = self._cell(lat, lng)
+        self.cells[(i, j)][key] = (lat, lng)
+        if self.bounds is None:
+            self.bounds = (i, i, j, j)
+        else:
+            min_i, max_i, min_j, max_j = self.bounds
+            self.bounds = (min(min_i, i), max(max_i, i), min(min_j, j), max(max_j, j))
+    
+    def remove(self, key: Hashable):
+        """Remove a point if present"""
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        bucket = self.cells[cell]
+        bucket.pop(key, None)
+        if not bucket:
+            del self.cells[cell]
+        if not self.points:
+            self.bounds = None
+    
+    def sync(self, points: Dict[Hashable, Tuple[Optional[float], Optional[float]]]):
+        """Bring the index in line with points, touching only what changed"""
+        for key in [k for k in self.points if k not in points]:
+            self.remove(key)
+        self._follow_reference(lat for lat, lng in points.values() if lat and lng)
+        for key, (lat, lng) in points.items():
+            self.upsert(key, lat, lng)
+    
+    def copy(self) -> "SpatialIndex":
+        """Independent copy, e.g. to query while the original keeps being synced"""
+        clone = SpatialIndex.__new__(SpatialIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.cells = defaultdict(dict, {cell: dict(bucket) for cell, bucket in self.cells.items()})
+        clone.points = dict(self.points)
+        return clone
+    
+    def _ring(self, center: Tuple[int, int], radius: int):
+        """Occupied cells at Chebyshev distance radius from center"""
+        ci, cj = center
+        if radius == 0:
+            if center in self.cells:
+                yield center
+            return
+        for di in range(-radius, radius + 1):
+            for dj in (-radius, radius) if abs(di) != radius else range(-radius, radius + 1):
+                cell = (ci + di, cj + dj)
+                if cell in self.cells:
+                    yield cell
+    
+    def _max_ring(self, center: Tuple[int, int]) -> int:
+        """Ring radius beyond which no occupied cell exists"""
+        if self.bounds is None:
+            return 0
+        ci, cj = center
+        min_i, max_i, min_j, max_j = self.bounds
+        return max(abs(min_i - ci), abs(max_i - ci), abs(min_j - cj), abs(max_j - cj))
+    
+    def nearest(self, lat: float, lng: float, k: int = 1,
+                max_distance_km: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """Return up to k (key, distance_km) pairs ordered by distance"""
+        if not self.points or k <= 0:
+            return []
+        
+        center = self._cell(lat, lng)
+        max_ring = self._max_ring(center)
+        best = []  # max-heap of (-distance, key)
+        
+        for radius in range(max_ring + 1):
+            for cell in self._ring(center, radius):
+                for key, (plat, plng) in self.cells[cell].items():
+                    dist = haversine_km(lat, lng, plat, plng)
+                    if max_distance_km is not None and dist > max_distance_km:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist, key))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, key))
+            
+            # Anything in outer rings is at least radius full cells away
+            reach = radius * self.cell_km * 0.99
+            if len(best) == k and -best[0][0] <= reach:
+                break
+            if max_distance_km is not None and reach > max_distance_km:
+                break
+        
+        return [(key, dist) for dist, key in sorted((-d, key) for d, key in best)]
+    
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[Hashable, float]]:
+        """Return all (key, distance_km) pairs within radius_km, nearest first"""
+        center = self._cell(lat, lng)
+        rings = min(int(math.ceil(radius_km / (self.cell_km * 0.99))) + 1, self._max_ring(center))
+        found = []
+        
+        for radius in range(rings + 1):
+            for cell in self._ring(center, radius):
+                for key, (plat, plng) in self.cells[cell].items():
+                    dist = haversine_km(lat, lng, plat, plng)
+                    if dist <= radius_km:
+                        found.append((key, dist))
+        
+        return sorted(found, key=lambda item: item[1])
+
+def kmeans_regions(lats: Sequence[float], lngs: Sequence[float], k: int,
+                   iterations: int = 25, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster points into k regions with k-means on an equirectangular projection.
+    
+    Returns (labels, centroids) where centroids are (lat, lng) rows.
+    """
+    lat = np.asarray(lats, dtype=np.float64)
+    lng = np.asarray(lngs, dtype=np.float64)
+    n = len(lat)
+    k = max(1, min(k, n))
+    lng_scale = math.cos(math.radians(lat.mean())) if n else 1.0
+    points = np.column_stack([lat, lng * lng_scale])
+    rng = np.random.default_rng(seed)
+    
+    # k-means++ seeding
+    centers = [points[rng.integers(n)]]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        choice = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centers.append(points[choice])
+        closest = np.minimum(closest, ((points - points[choice]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+    
+    labels = np.zeros(n, dtype=np.intp)
+    for iteration in range(iterations):
+        dist = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if iteration > 0 and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for c in range(k):
+            members = points[labels == c]
+            if len(members):
+                centers[c] = members.mean(axis=0)
+    
+    centroids = np.column_stack([centers[:, 0], centers[:, 1] / lng_scale])
+    return labels, centroids
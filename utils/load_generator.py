@@ -0,0 +1,364 @@
+"""Bulk load-test data generator.
+
+Streams synthetic history for a company of configurable size straight into
+the database with Core ``insert()`` executemany batches instead of ORM
+objects. History is split into week-long partitions (DAYS_PER_PARTITION);
+each partition draws from its own RNG seeded with (seed, partition), and every
+work order gets an id computed from its day and slot. Dates are laid out
+around an anchor day (--today, default the current date), so the same seed
+and anchor produce the same rows no matter how many worker processes share
+the partitions. Job part, timesheet and invoice ids are assigned by the
+database on insert, so with --workers > 1 they follow the order in which
+partitions finish; join on work_order_id rather than comparing those ids.
+
+    python -m utils.load_generator --technicians 2000 --days 365 --workers 4
+    python -m utils.load_generator --technicians 50 --days 90 --today 2026-01-05
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from faker import Faker
+from sqlalchemy import delete, func, insert, select, update
+
+from database.session import engine, init_db
+from database.models import (
+    Customer, Technician, InventoryItem, WorkOrder, JobPart, Timesheet, Invoice, RollupWatermark, LOW_STOCK
+)
+from utils.cache import cache
+from utils.data_generator import (
+    JOB_TYPES, TECHNICIAN_SPECIALTIES, INVENTORY_CATEGORIES, TORONTO_LAT, TORONTO_LNG
+)
+
+CHUNK_SIZE = 10000          # work orders per transaction
+DAYS_PER_PARTITION = 7      # unit of work handed to a worker process
+ADDRESS_POOL_SIZE = 5000    # Faker is too slow to call per row
+FUTURE_DAYS = 7
+TAX_RATE = 0.13
+
+def _rng(seed: int, *parts) -> random.Random:
+    return random.Random(":".join(str(p) for p in (seed,) + parts))
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _insert(conn, model, rows: List[Dict]):
+    if rows:
+        conn.execute(insert(model.__table__), rows)
+
+def create_reference_data(technicians: int, customers: int, seed: int, now: datetime) -> Dict:
+    """Bulk-insert customers and technicians (and the demo parts catalogue if empty), created at `now`.
+
+    Returns the id ranges and lookup data the partition workers need.
+    """
+    fake = Faker()
+    Faker.seed(seed)
+    rng = _rng(seed, "reference")
+
+    with engine.begin() as conn:
+        first_customer = _next_id(conn, Customer)
+        first_technician = _next_id(conn, Technician)
+
+        if not conn.execute(select(func.count(InventoryItem.id))).scalar():
+            part_names = [(category, name) for category, names in INVENTORY_CATEGORIES.items() for name in names]
+            _insert(conn, InventoryItem, [
+                {
+                    "name": name,
+                    "sku": f"SKU-{1000 + i:06d}",
+                    "category": category,
+                    "quantity": rng.randint(5, 100),
+                    "unit_price": round(rng.uniform(10.0, 500.0), 2),
+                    "reorder_level": rng.randint(5, 25),
+                    "supplier": fake.company(),
+                    "created_at": now
+                }
+                for i, (category, name) in enumerate(part_names)
+            ])
+            conn.execute(update(InventoryItem).values(low_stock=LOW_STOCK))
+
+        for start in range(0, customers, CHUNK_SIZE):
+            _insert(conn, Customer, [
+                {
+                    "id": first_customer + i,
+                    "name": fake.company(),
+                    "email": fake.email(),
+                    "phone": fake.phone_number(),
+                    "address": fake.street_address(),
+                    "city": "Toronto",
+                    "province": "ON",
+                    "postal_code": fake.postalcode(),
+                    "created_at": now
+                }
+                for i in range(start, min(start + CHUNK_SIZE, customers))
+            ])
+
+        technician_rows = [
+            {
+                "id": first_technician + i,
+                "name": fake.name(),
+                "email": fake.email(),
+                "phone": fake.phone_number(),
+                "specialty": rng.choice(TECHNICIAN_SPECIALTIES),
+                "hourly_rate": rng.uniform(65.0, 95.0),
+                "home_base_lat": TORONTO_LAT + rng.uniform(-0.3, 0.3),
+                "home_base_lng": TORONTO_LNG + rng.uniform(-0.3, 0.3),
+                "rating": rng.uniform(4.2, 5.0),
+                "is_active": True,
+                "created_at": now
+            }
+            for i in range(technicians)
+        ]
+        for start in range(0, technicians, CHUNK_SIZE):
+            _insert(conn, Technician, technician_rows[start:start + CHUNK_SIZE])
+
+        parts = [tuple(row) for row in conn.execute(select(InventoryItem.id, InventoryItem.unit_price).order_by(InventoryItem.id))]
+        first_work_order = _next_id(conn, WorkOrder)
+
+    return {
+        "customer_ids": (first_customer, first_customer + customers),
+        "technicians": [(row["id"], row["hourly_rate"]) for row in technician_rows],
+        "parts": parts,
+        "addresses": [f"{fake.street_address()}, Toronto, ON" for _ in range(ADDRESS_POOL_SIZE)],
+        "first_work_order": first_work_order
+    }
+
+def _job_status(day: datetime, today: datetime, rng: random.Random) -> str:
+    if day < today:
+        return "completed" if rng.random() < 0.92 else "cancelled"
+    if day == today:
+        return rng.choice(["scheduled", "in_progress", "completed"])
+    return "scheduled" if rng.random() < 0.6 else "pending"
+
+def generate_partition_rows(partition: int, settings: Dict, reference: Dict) -> Iterator[Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]]:
+    """Yield (work_orders, job_parts, timesheets, invoices) chunks for one partition of DAYS_PER_PARTITION days"""
+    rng = _rng(settings["seed"], "partition", partition)
+    jobs_per_day = settings["jobs_per_day"]
+    today = settings["today"]
+    first_day = today - timedelta(days=settings["days"])
+    customer_lo, customer_hi = reference["customer_ids"]
+    technicians = reference["technicians"]
+    parts = reference["parts"]
+    addresses = reference["addresses"]
+    parts_per_job = settings["parts_per_job"]
+
+    work_orders, job_parts, timesheets, invoices = [], [], [], []
+    day_lo = partition * DAYS_PER_PARTITION
+    day_hi = min(day_lo + DAYS_PER_PARTITION, settings["days"] + FUTURE_DAYS)
+
+    for day_index in range(day_lo, day_hi):
+        day = first_day + timedelta(days=day_index)
+        for slot in range(jobs_per_day):
+            work_order_id = reference["first_work_order"] + day_index * jobs_per_day + slot
+            status = _job_status(day, today, rng)
+            technician_id, hourly_rate = rng.choice(technicians)
+            assigned = status != "pending" or rng.random() < 0.3
+            job_type = rng.choice(JOB_TYPES)
+            lat = TORONTO_LAT + rng.uniform(-0.2, 0.2)
+            lng = TORONTO_LNG + rng.uniform(-0.2, 0.2)
+            estimated_duration = rng.uniform(2.0, 8.0)
+            rate = hourly_rate if assigned else 75.0
+            row = {
+                "id": work_order_id,
+                "customer_id": rng.randrange(customer_lo, customer_hi),
+                "assigned_technician_id": technician_id if assigned else None,
+                "job_type": job_type,
+                "description": f"{job_type} service",
+                "location": rng.choice(addresses),
+                "lat": lat,
+                "lng": lng,
+                "status": status,
+                "priority": rng.choice(["low", "medium", "high", "urgent"]),
+                "scheduled_date": day,
+                "estimated_duration": estimated_duration,
+                "estimated_cost": estimated_duration * rate * rng.uniform(1.2, 1.8),
+                "actual_start_time": None,
+                "actual_end_time": None,
+                "actual_duration": None,
+                "actual_cost": None,
+                "created_at": day - timedelta(days=rng.randint(1, 14)),
+                "updated_at": day
+            }
+            work_orders.append(row)
+
+            if status == "completed":
+                actual_duration = estimated_duration * rng.uniform(0.8, 1.2)
+                start = day.replace(hour=rng.randint(8, 15), minute=rng.choice((0, 15, 30, 45)))
+                end = start + timedelta(hours=actual_duration)
+                row.update(
+                    actual_duration=actual_duration,
+                    actual_cost=row["estimated_cost"] * rng.uniform(0.9, 1.1),
+                    actual_start_time=start,
+                    actual_end_time=end,
+                    updated_at=end
+                )
+
+                materials_cost = 0.0
+                for inventory_item_id, unit_price in rng.sample(parts, min(rng.randint(1, 2 * parts_per_job - 1), len(parts))):
+                    quantity = rng.randint(1, 5)
+                    materials_cost += unit_price * quantity
+                    job_parts.append({
+                        "work_order_id": work_order_id,
+                        "inventory_item_id": inventory_item_id,
+                        "quantity_used": quantity,
+                        "unit_cost": unit_price,
+                        "total_cost": unit_price * quantity,
+                        "created_at": end
+                    })
+
+                timesheets.append({
+                    "technician_id": technician_id,
+                    "work_order_id": work_order_id,
+                    "check_in_time": start,
+                    "check_in_lat": lat + rng.uniform(-0.01, 0.01),
+                    "check_in_lng": lng + rng.uniform(-0.01, 0.01),
+                    "check_out_time": end,
+                    "check_out_lat": lat + rng.uniform(-0.01, 0.01),
+                    "check_out_lng": lng + rng.uniform(-0.01, 0.01),
+                    "hours_worked": actual_duration,
+                    "is_verified": True,
+                    "has_anomaly": rng.random() < 0.1,
+                    "created_at": end,
+                    "updated_at": end
+                })
+
+                if rng.random() < settings["invoice_rate"]:
+                    labor_cost = actual_duration * hourly_rate
+                    subtotal = labor_cost + materials_cost
+                    is_paid = rng.random() < 0.6
+                    paid_date = day + timedelta(days=rng.randint(1, 30)) if is_paid else None
+                    invoices.append({
+                        "customer_id": row["customer_id"],
+                        "work_order_id": work_order_id,
+                        "invoice_number": f"INV-{work_order_id:09d}",
+                        "invoice_date": day + timedelta(days=1),
+                        "due_date": day + timedelta(days=30),
+                        "labor_hours": actual_duration,
+                        "labor_rate": hourly_rate,
+                        "labor_cost": labor_cost,
+                        "materials_cost": materials_cost,
+                        "other_charges": 0.0,
+                        "subtotal": subtotal,
+                        "tax_rate": TAX_RATE,
+                        "tax_amount": subtotal * TAX_RATE,
+                        "total_amount": subtotal * (1 + TAX_RATE),
+                        "status": "paid" if is_paid else "pending",
+                        "paid_date": paid_date,
+                        "created_at": day + timedelta(days=1),
+                        "updated_at": paid_date or day + timedelta(days=1)
+                    })
+
+            if len(work_orders) >= settings["chunk_size"]:
+                yield work_orders, job_parts, timesheets, invoices
+                work_orders, job_parts, timesheets, invoices = [], [], [], []
+
+    if work_orders:
+        yield work_orders, job_parts, timesheets, invoices
+
+def load_partition(partition: int, settings: Dict, reference: Dict) -> Dict[str, int]:
+    """Generate and insert one partition, one transaction per chunk"""
+    counts = {"work_orders": 0, "job_parts": 0, "timesheets": 0, "invoices": 0}
+    for work_orders, job_parts, timesheets, invoices in generate_partition_rows(partition, settings, reference):
+        with engine.begin() as conn:
+            _insert(conn, WorkOrder, work_orders)
+            _insert(conn, JobPart, job_parts)
+            _insert(conn, Timesheet, timesheets)
+            _insert(conn, Invoice, invoices)
+        counts["work_orders"] += len(work_orders)
+        counts["job_parts"] += len(job_parts)
+        counts["timesheets"] += len(timesheets)
+        counts["invoices"] += len(invoices)
+    return counts
+
+def _init_worker():
+    engine.dispose(close=False)
+
+def generate_load_data(technicians: int = 200, customers: Optional[int] = None, days: int = 365,
+                       jobs_per_technician: int = 5, parts_per_job: int = 4, invoice_rate: float = 0.2,
+                       seed: int = 42, workers: int = 1, chunk_size: int = CHUNK_SIZE,
+                       today: Optional[date] = None) -> Dict:
+    """Stream `days` of history before `today` (plus a week of upcoming jobs) for a company of `technicians`.
+
+    Work orders total technicians * jobs_per_technician * (days + 7); completed
+    jobs average parts_per_job part rows, and invoice_rate of them are invoiced.
+    today defaults to the current date; pass it to reproduce a dataset exactly.
+    With workers > 1 partitions are generated and inserted in parallel
+    processes (SQLite serialises the writes; server databases don't), and
+    job part, timesheet and invoice ids follow the order partitions finish in.
+    """
+    started = time.perf_counter()
+    customers = customers or technicians * 25
+    today = datetime.combine(today or date.today(), datetime.min.time())
+    reference = create_reference_data(technicians, customers, seed, today)
+    settings = {
+        "seed": seed,
+        "days": days,
+        "jobs_per_day": technicians * jobs_per_technician,
+        "parts_per_job": max(parts_per_job, 1),
+        "invoice_rate": invoice_rate,
+        "chunk_size": chunk_size,
+        "today": today
+    }
+    partitions = range(-(-(days + FUTURE_DAYS) // DAYS_PER_PARTITION))
+    totals = {"customers": customers, "technicians": technicians,
+              "work_orders": 0, "job_parts": 0, "timesheets": 0, "invoices": 0}
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = pool.map(load_partition, partitions, [settings] * len(partitions), [reference] * len(partitions))
+            for counts in results:
+                for name, count in counts.items():
+                    totals[name] += count
+                print(f"  {totals['work_orders']:,} work orders loaded")
+    else:
+        for partition in partitions:
+            for name, count in load_partition(partition, settings, reference).items():
+                totals[name] += count
+            print(f"  {totals['work_orders']:,} work orders loaded")
+
+    # The history is stamped in the past, behind any rollup watermark; without
+    # watermarks the next refresh rebuilds every day
+    with engine.begin() as conn:
+        conn.execute(delete(RollupWatermark))
+    cache.clear()
+    totals["seconds"] = round(time.perf_counter() - started, 1)
+    return totals
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic FieldOps history for load testing")
+    parser.add_argument("--technicians", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=None, help="defaults to 25 per technician")
+    parser.add_argument("--days", type=int, default=365, help="days of history before today")
+    parser.add_argument("--jobs-per-technician", type=int, default=5, help="work orders per technician per day")
+    parser.add_argument("--parts-per-job", type=int, default=4, help="average part rows per completed job")
+    parser.add_argument("--invoice-rate", type=float, default=0.2, help="fraction of completed jobs invoiced")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--today", type=date.fromisoformat, help="anchor date for the history (default: the current date)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    totals = generate_load_data(
+        technicians=args.technicians,
+        customers=args.customers,
+        days=args.days,
+        jobs_per_technician=args.jobs_per_technician,
+        parts_per_job=args.parts_per_job,
+        invoice_rate=args.invoice_rate,
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        today=args.today
+    )
+    seconds = totals.pop("seconds")
+    for name, count in totals.items():
+        print(f"{name:<12} {count:>12,}")
+    print(f"Loaded in {seconds}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())